@@ -0,0 +1,333 @@
+"""Benchmark the parse, construct, synth and validate phases
+
+Every phase runs over a set of representative inputs with AWS replaced by a local
+stubbed backend. The results can be saved as a baseline and compared against one;
+a phase whose fastest run got slower than the threshold is reported as a
+regression. Timings depend on the machine, so the comparison is informational
+unless --fail-on-regression is given.
+
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
+
+import argparse
+import copy
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from botocore.stub import Stubber
+from cdktf import Testing
+from external_resources_io.input import parse_model
+from external_resources_io.terraform import TerraformJsonPlanParser
+from validate_plan import AWSApi, ElasticachePlanValidator
+
+from er_aws_elasticache.__main__ import init_cdktf_app  # noqa: PLC2701
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.parameter_catalog import family_catalog
+from er_aws_elasticache.renderer import synth as render
+from er_aws_elasticache.stack import ElasticacheStack
+
+DEFAULT_REPEAT = 10
+# relative slowdown reported as a regression; the fastest run is compared, the
+# median is too noisy for the JSII round trips
+DEFAULT_THRESHOLD = 0.5
+# ignore slowdowns within the noise of the fast phases
+MIN_REGRESSION_MS = 5.0
+
+SMALL_INPUT: dict[str, Any] = {
+    "data": {
+        "replication_group_id": "benchmark-01",
+        "replication_group_description": "benchmark instance",
+        "node_type": "cache.t4g.micro",
+        "automatic_failover_enabled": True,
+        "auto_minor_version_upgrade": False,
+        "engine": "redis",
+        "at_rest_encryption_enabled": True,
+        "transit_encryption_enabled": True,
+        "engine_version": "6.2",
+        "apply_immediately": True,
+        "security_group_ids": ["sg-123456789"],
+        "maintenance_window": "wed:10:00-wed:11:00",
+        "snapshot_window": "03:30-05:30",
+        "snapshot_retention_limit": 2,
+        "subnet_group_name": "default",
+        "number_cache_clusters": 2,
+        "identifier": "benchmark",
+        "parameter_group": {
+            "family": "redis6.x",
+            "description": "benchmark parameter group",
+            "parameters": [{"name": "tcp-keepalive", "value": "300"}],
+            "name": "benchmark-01-pg",
+        },
+        "output_resource_name": "benchmark",
+        "output_prefix": "benchmark-elasticache",
+        "tags": {"managed_by_integration": "external_resources", "app": "benchmark"},
+        "default_tags": [{"tags": {"app": "app-sre-infra"}}],
+        "region": "us-east-1",
+        "parameter_group_name": "benchmark-01-pg",
+    },
+    "provision": {
+        "provision_provider": "aws",
+        "provisioner": "benchmark-account",
+        "provider": "elasticache",
+        "identifier": "benchmark",
+        "target_cluster": "benchmark-cluster",
+        "target_namespace": "benchmark-namespace",
+        "target_secret_name": "benchmark",
+        "module_provision_data": {
+            "tf_state_bucket": "external-resources-terraform-state-dev",
+            "tf_state_region": "us-east-1",
+            "tf_state_dynamodb_table": "external-resources-terraform-lock",
+            "tf_state_key": "aws/benchmark-account/elasticache/benchmark/terraform.tfstate",
+        },
+    },
+}
+
+
+def variant(data: Mapping[str, Any]) -> dict[str, Any]:
+    """SMALL_INPUT with some data attributes replaced."""
+    raw = copy.deepcopy(SMALL_INPUT)
+    raw["data"] |= data
+    return raw
+
+
+INPUTS: dict[str, dict[str, Any]] = {
+    "small": SMALL_INPUT,
+    "cluster-mode": variant({
+        "number_cache_clusters": None,
+        "num_node_groups": 8,
+        "replicas_per_node_group": 2,
+        "multi_az_enabled": True,
+        "security_group_ids": [f"sg-{i:09}" for i in range(5)],
+    }),
+    "large-parameter-group": variant({
+        "parameter_group": {
+            "family": "redis6.x",
+            "description": "benchmark parameter group",
+            # every modifiable parameter of the family, all checked by the catalog
+            "parameters": [
+                {"name": name, "value": spec.default}
+                for name, spec in family_catalog("redis6.x").parameters.items()  # type: ignore[union-attr]
+                if spec.modifiable and spec.default is not None
+            ],
+            "name": "benchmark-01-pg",
+        },
+    }),
+}
+
+
+def plan_data(ai_input: AppInterfaceInput) -> dict[str, Any]:
+    """A terraform plan creating the replication and parameter group of an input."""
+    changes: list[dict[str, Any]] = [
+        {
+            "address": f"aws_elasticache_replication_group.{ai_input.data.identifier}",
+            "type": "aws_elasticache_replication_group",
+            "name": ai_input.data.identifier,
+            "change": {
+                "actions": ["create"],
+                "after": {
+                    "replication_group_id": ai_input.data.replication_group_id,
+                    "subnet_group_name": ai_input.data.subnet_group_name,
+                    "security_group_ids": ai_input.data.security_group_ids,
+                },
+                "after_unknown": {},
+            },
+        }
+    ]
+    if ai_input.data.parameter_group:
+        changes.append({
+            "address": f"aws_elasticache_parameter_group.{ai_input.data.parameter_group.name}",
+            "type": "aws_elasticache_parameter_group",
+            "name": ai_input.data.parameter_group.name,
+            "change": {
+                "actions": ["create"],
+                "after": {"name": ai_input.data.parameter_group.name},
+                "after_unknown": {},
+            },
+        })
+    return {"format_version": "1.2", "resource_changes": changes}
+
+
+def add_responses(
+    elasticache: Stubber, ec2: Stubber, ai_input: AppInterfaceInput
+) -> None:
+    """Queue the responses of a successful validation to the stubbed backend."""
+    subnets = [f"subnet-{i}" for i in range(3)]
+    elasticache.add_client_error(
+        "describe_replication_groups",
+        service_error_code="ReplicationGroupNotFoundFault",
+    )
+    elasticache.add_response(
+        "describe_cache_subnet_groups",
+        {
+            "CacheSubnetGroups": [
+                {"Subnets": [{"SubnetIdentifier": subnet} for subnet in subnets]}
+            ]
+        },
+    )
+    ec2.add_response(
+        "describe_subnets",
+        {"Subnets": [{"SubnetId": subnet, "VpcId": "vpc-1"} for subnet in subnets]},
+    )
+    ec2.add_response(
+        "describe_security_groups",
+        {
+            "SecurityGroups": [
+                {"GroupId": sg, "VpcId": "vpc-1"}
+                for sg in ai_input.data.security_group_ids or []
+            ]
+        },
+    )
+    if ai_input.data.parameter_group:
+        elasticache.add_client_error(
+            "describe_cache_parameter_groups",
+            service_error_code="CacheParameterGroupNotFound",
+        )
+
+
+def aws_clients(ai_input: AppInterfaceInput) -> AWSApi:
+    """An AWSApi with its clients created."""
+    aws_api = AWSApi(config_options={"region_name": ai_input.data.region})
+    _ = aws_api.client, aws_api.ec2_client
+    return aws_api
+
+
+def validator(
+    ai_input: AppInterfaceInput, plan: TerraformJsonPlanParser
+) -> Callable[[], None]:
+    """Validate the plan against a stubbed backend, without memoized lookups.
+
+    The AWSApi, its clients and the stubbers are created once, see the aws-clients
+    phase; every run only clears the memoized lookups.
+    """
+    aws_api = aws_clients(ai_input)
+    elasticache = Stubber(aws_api.client)
+    ec2 = Stubber(aws_api.ec2_client)
+    elasticache.activate()
+    ec2.activate()
+
+    def validate() -> None:
+        aws_api._cache.clear()  # noqa: SLF001
+        add_responses(elasticache, ec2, ai_input)
+        if not ElasticachePlanValidator(plan, ai_input, aws_api=aws_api).validate():
+            raise RuntimeError("The benchmark plan must be valid")
+        elasticache.assert_no_pending_responses()
+        ec2.assert_no_pending_responses()
+
+    return validate
+
+
+def phases(raw: dict[str, Any], tmp: Path) -> dict[str, Callable[[], object]]:
+    """The benchmarked phases of an input."""
+    ai_input = parse_model(AppInterfaceInput, raw)
+    plan_json = tmp / "plan.json"
+    plan_json.write_text(json.dumps(plan_data(ai_input)))
+    plan = TerraformJsonPlanParser(plan_path=str(plan_json))
+    stack = ElasticacheStack(Testing.app(), "CDKTF", ai_input)
+    return {
+        "parse": lambda: parse_model(AppInterfaceInput, raw),
+        "construct": lambda: ElasticacheStack(Testing.app(), "CDKTF", ai_input),
+        "testing-synth": lambda: Testing.synth(stack),
+        "app-synth": lambda: init_cdktf_app(
+            ai_input, outdir=str(tmp / "cdktf")
+        ).synth(),
+        "python-synth": lambda: render(ai_input, outdir=str(tmp / "python")),
+        "aws-clients": lambda: aws_clients(ai_input),
+        "validate": validator(ai_input, plan),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Time a phase after a warm-up run, in milliseconds."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+    }
+
+
+def run(inputs: Mapping[str, dict[str, Any]], repeat: int) -> dict[str, Any]:
+    """Benchmark all phases of all inputs."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for input_name, raw in inputs.items():
+            for phase, func in phases(raw, Path(tmp)).items():
+                results[f"{input_name}/{phase}"] = measure(func, repeat)
+    return {
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "benchmarks": results,
+    }
+
+
+def compare(
+    results: Mapping[str, Any], baseline: Mapping[str, Any], threshold: float
+) -> list[str]:
+    """The benchmarks slower than the baseline by more than threshold."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        if not (base := baseline["benchmarks"].get(name)):
+            continue
+        fastest, base_fastest = result["min_ms"], base["min_ms"]
+        if (
+            fastest > base_fastest * (1 + threshold)
+            and fastest - base_fastest > MIN_REGRESSION_MS
+        ):
+            regressions.append(
+                f"{name}: {fastest:.3f} ms, baseline {base_fastest:.3f} ms (+{fastest / base_fastest - 1:.0%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    """Run the benchmarks"""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--input", action="append", choices=INPUTS, help="benchmark only these inputs"
+    )
+    parser.add_argument("--save", type=Path, help="write the results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="report regressions against this baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="exit with an error on regressions, for a baseline of the same machine",
+    )
+    args = parser.parse_args()
+    logging.getLogger("validate_plan").setLevel(logging.WARNING)
+
+    inputs = {name: INPUTS[name] for name in args.input or INPUTS}
+    results = run(inputs, args.repeat)
+    for name, result in results["benchmarks"].items():
+        print(f"{name:40} {result['min_ms']:10.3f} ms {result['median_ms']:10.3f} ms")  # noqa: T201
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if regressions := compare(results, baseline, args.threshold):
+            print("Regressions:", *regressions, sep="\n  ")  # noqa: T201
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,125 @@
+import logging
 import os
+from importlib import import_module
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from cdktf import App
-from external_resources_io.input import parse_model, read_input_from_file
+from .app_interface_input import StackInput, parse_input
+from .instrumentation import Metrics, metrics_enabled, profiling
+from .synth_cache import SynthCache, cache_key
 
-from .app_interface_input import AppInterfaceInput
-from .stack import ElasticacheStack
+if TYPE_CHECKING:
+    from cdktf import App
 
+ENGINES = ("cdktf", "python")
 
-def get_ai_input() -> AppInterfaceInput:
-    """Get the AppInterfaceInput from the input file."""
-    return parse_model(
-        AppInterfaceInput,
-        read_input_from_file(
-            file_path=os.environ.get("ER_INPUT_FILE", "/inputs/input.json"),
-        ),
+
+def synth_engine() -> str:
+    """The engine selected by ER_SYNTH_ENGINE, cdktf by default."""
+    engine = os.environ.get("ER_SYNTH_ENGINE", "cdktf")
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Unknown ER_SYNTH_ENGINE {engine!r}, supported engines: {', '.join(ENGINES)}"
+        )
+    return engine
+
+
+def get_ai_input() -> StackInput:
+    """Get the single or multi-cluster input from the input file."""
+    return parse_input(
+        Path(os.environ.get("ER_INPUT_FILE", "/inputs/input.json")).read_bytes()
     )
 
 
-def init_cdktf_app(ai_input: AppInterfaceInput, id_: str = "CDKTF") -> App:
+def init_cdktf_app(
+    ai_input: StackInput, id_: str = "CDKTF", outdir: str | None = None
+) -> "App":
     """Initialize the CDKTF app and all the stacks."""
-    app = App(outdir=os.environ.get("ER_OUTDIR", None))
+    # importing cdktf starts the JSII runtime, which the python engine doesn't need
+    from cdktf import App  # noqa: PLC0415
+
+    from .stack import ElasticacheStack  # noqa: PLC0415
+
+    app = App(outdir=outdir or os.environ.get("ER_OUTDIR", None))
     ElasticacheStack(app, id_, ai_input)
     return app
 
 
+def synth(
+    ai_input: StackInput,
+    engine: str,
+    outdir: str,
+    metrics: Metrics | None = None,
+) -> None:
+    """Synthesize the stack with the given engine."""
+    metrics = metrics or Metrics()
+    if engine == "python":
+        from .renderer import synth as render  # noqa: PLC0415
+
+        with metrics.span("render"):
+            render(ai_input, outdir=outdir)
+        return
+    with metrics.span("jsii_startup"):
+        # load the JSII assemblies of cdktf and the providers
+        for module in (
+            "cdktf",
+            "cdktf_cdktf_provider_aws",
+            "cdktf_cdktf_provider_random",
+        ):
+            import_module(module)
+    with metrics.span("construct"):
+        app = init_cdktf_app(ai_input, outdir=outdir)
+    with metrics.span("app_synth"):
+        app.synth()
+
+
+def synth_cached(
+    ai_input: StackInput,
+    engine: str,
+    outdir: str,
+    metrics: Metrics | None = None,
+) -> None:
+    """Synthesize the stack, or restore it from the synth cache."""
+    metrics = metrics or Metrics()
+    if not (synth_cache := SynthCache.from_env()):
+        synth(ai_input, engine, outdir, metrics)
+        return
+
+    key = cache_key(ai_input, engine)
+    with metrics.span("cache_restore"):
+        restored = synth_cache.restore(key, Path(outdir))
+    if not restored:
+        synth(ai_input, engine, outdir, metrics)
+        with metrics.span("cache_store"):
+            synth_cache.store(key, Path(outdir))
+
+
+def run(engine: str, outdir: str, metrics: Metrics) -> None:
+    """Synthesize the input, or restore it from the synth cache."""
+    with metrics.span("parse_input"):
+        ai_input = get_ai_input()
+    synth_cached(ai_input, engine, outdir, metrics)
+
+
 def main() -> None:
-    """Proper entry point for the CDKTF app."""
-    app = init_cdktf_app(get_ai_input())
-    app.synth()
+    """Proper entry point for the CDKTF app.
+
+    ER_SYNTH_ENGINE=python renders the stack with the pure-Python renderer
+    instead of CDKTF. With ER_SYNTH_CACHE_DIR, an unchanged input is restored
+    from the synth cache. ER_METRICS=1 writes the phase timings to metrics.json in
+    the outdir.
+    """
+    logging.basicConfig(level=logging.INFO)
+    engine = synth_engine()
+    # the default outdir of cdktf.App
+    outdir = (
+        os.environ.get("ER_OUTDIR") or os.environ.get("CDKTF_OUTDIR") or "cdktf.out"
+    )
+    metrics = Metrics()
+    with profiling():
+        run(engine, outdir, metrics)
+    if metrics_enabled():
+        metrics.write(Path(outdir) / "metrics.json", engine=engine)
 
 
 if __name__ == "__main__":
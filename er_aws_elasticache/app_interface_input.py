@@ -1,8 +1,31 @@
+import difflib
+import logging
+from collections import Counter
 from collections.abc import Sequence
-from typing import Any, Literal, Self
+from typing import TYPE_CHECKING, Annotated, Any, Literal, Self
 
 from external_resources_io.input import AppInterfaceProvision
-from pydantic import BaseModel, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    Discriminator,
+    Field,
+    Tag,
+    TypeAdapter,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+
+from . import capacity as planner
+from . import monitoring
+from .capacity import CapacityPlan
+from .engine_catalog import engine_catalog, version_key
+from .parameter_catalog import family_catalog
+
+if TYPE_CHECKING:
+    from pydantic_core import InitErrorDetails
+
+logger = logging.getLogger(__name__)
 
 
 class ElasticacheLogDeliveryConfiguration(BaseModel):
@@ -36,6 +59,202 @@ class ParameterGroup(BaseModel):
     description: str
     parameters: Sequence[Parameter]
 
+    @model_validator(mode="after")
+    def parameters_in_catalog(self) -> Self:
+        """The parameters must be valid for the family, see parameter_catalog"""
+        if catalog := family_catalog(self.family):
+            for param in self.parameters:
+                if warning := catalog.unknown(param.name):
+                    # the catalog may miss valid parameters
+                    logger.warning(warning)
+            errors = [
+                error
+                for param in self.parameters
+                if (error := catalog.check(param.name, param.value, param.apply_method))
+            ]
+            if errors:
+                raise ValueError("; ".join(errors))
+        return self
+
+
+class Capacity(BaseModel):
+    """Workload targets of the capacity planner, see capacity"""
+
+    dataset_gib: float = Field(gt=0)
+    peak_ops_per_second: int = Field(ge=0)
+    # the share of reads in the operations
+    read_ratio: float = Field(default=0.8, ge=0, le=1)
+    headroom_percent: int = Field(default=25, ge=0, le=100)
+    # the most shards the planner may choose
+    max_shards: int = Field(default=planner.MAX_SHARDS, ge=1)
+
+
+class GlobalDatastoreSecondary(BaseModel):
+    """A secondary replication group of a global datastore
+
+    The engine, node type, parameter group, encryption and shards are those of the
+    primary replication group.
+    """
+
+    region: str
+    replication_group_id: str
+    replication_group_description: str = "elasticache global datastore secondary"
+    # defaults to the layout of the primary replication group
+    number_cache_clusters: int | None = None
+    replicas_per_node_group: int | None = None
+    security_group_ids: Sequence[str] | None = None
+    subnet_group_name: str | None = None
+
+
+class GlobalDatastore(BaseModel):
+    """aws_elasticache_global_replication_group with the replication group as primary"""
+
+    global_replication_group_id_suffix: str
+    description: str = "elasticache global datastore"
+    secondaries: Sequence[GlobalDatastoreSecondary] = Field(min_length=1, max_length=2)
+
+
+class Serverless(BaseModel):
+    """aws_elasticache_serverless_cache instead of a replication group
+
+    The cache scales within the usage limits, in GB of data and ElastiCache
+    Processing Units (ECPUs) per second.
+    """
+
+    max_data_storage_gb: int | None = Field(default=None, ge=1, le=5000)
+    min_data_storage_gb: int | None = Field(default=None, ge=1, le=5000)
+    max_ecpu_per_second: int | None = Field(default=None, ge=1000, le=15_000_000)
+    min_ecpu_per_second: int | None = Field(default=None, ge=1000, le=15_000_000)
+    # the start of the daily snapshot, in UTC
+    daily_snapshot_time: str | None = Field(default=None, pattern=r"^\d{2}:\d{2}$")
+    snapshot_arns_to_restore: Sequence[str] | None = None
+    kms_key_id: str | None = None
+    subnet_ids: Sequence[str] | None = None
+    user_group_id: str | None = None
+
+    @model_validator(mode="after")
+    def usage_limits(self) -> Self:
+        """The minimum of a usage limit must not exceed its maximum"""
+        for name, minimum, maximum in (
+            ("data_storage_gb", self.min_data_storage_gb, self.max_data_storage_gb),
+            ("ecpu_per_second", self.min_ecpu_per_second, self.max_ecpu_per_second),
+        ):
+            if minimum and maximum and minimum > maximum:
+                raise ValueError(
+                    f"min_{name} ({minimum}) must not exceed max_{name} ({maximum})"
+                )
+        return self
+
+
+class ScalingTarget(BaseModel):
+    """Target tracking of the engine CPU or memory usage for a scalable dimension"""
+
+    min_capacity: int = Field(ge=0)
+    max_capacity: int = Field(ge=1)
+    metric: Literal["cpu", "memory"]
+    # percent of the metric
+    target_value: float = Field(gt=0, le=100)
+    scale_in_cooldown: int | None = Field(default=None, ge=0)
+    scale_out_cooldown: int | None = Field(default=None, ge=0)
+    disable_scale_in: bool | None = None
+
+    @model_validator(mode="after")
+    def capacity_range(self) -> Self:
+        """The minimum capacity must not exceed the maximum capacity"""
+        if self.min_capacity > self.max_capacity:
+            raise ValueError(
+                f"min_capacity ({self.min_capacity}) must not exceed max_capacity ({self.max_capacity})"
+            )
+        return self
+
+
+# the replication group attribute, the scalable dimension and the predefined
+# metrics of the shards and the replicas
+SCALED_ATTRIBUTES = {"shards": "num_node_groups", "replicas": "replicas_per_node_group"}
+SCALABLE_DIMENSIONS = {
+    "shards": "elasticache:replication-group:NodeGroups",
+    "replicas": "elasticache:replication-group:Replicas",
+}
+PREDEFINED_METRICS = {
+    ("shards", "cpu"): "ElastiCachePrimaryEngineCPUUtilization",
+    ("shards", "memory"): "ElastiCacheDatabaseMemoryUsageCountedForEvictPercentage",
+    ("replicas", "cpu"): "ElastiCacheReplicaEngineCPUUtilization",
+    ("replicas", "memory"): "ElastiCacheDatabaseCapacityUsageCountedForEvictPercentage",
+}
+
+
+class Autoscaling(BaseModel):
+    """Application Auto Scaling of the shards and replicas of a cluster-mode enabled group"""
+
+    shards: ScalingTarget | None = None
+    replicas: ScalingTarget | None = None
+
+    @property
+    def targets(self) -> dict[str, ScalingTarget]:
+        """The configured scaling targets, by dimension"""
+        targets = {"shards": self.shards, "replicas": self.replicas}
+        return {dimension: t for dimension, t in targets.items() if t}
+
+
+class Monitoring(BaseModel):
+    """CloudWatch alarms of every member cluster and a dashboard, see monitoring
+
+    An alarm fires when its metric is above the threshold for evaluation_periods
+    periods; a threshold of null disables the alarm.
+    """
+
+    # default: the notification_topic_arn
+    alarm_actions: Sequence[str] | None = None
+    period_seconds: int = Field(default=300, ge=60, multiple_of=60)
+    evaluation_periods: int = Field(default=3, ge=1)
+    cpu_percent: float | None = Field(default=90, gt=0, le=100)
+    memory_percent: float | None = Field(default=90, gt=0, le=100)
+    evictions: int | None = Field(default=1000, ge=0)
+    connections: int | None = Field(default=50000, ge=0)
+    replication_lag_seconds: float | None = Field(default=30, ge=0)
+    network_bandwidth_in_allowance_exceeded: int | None = Field(default=0, ge=0)
+    network_bandwidth_out_allowance_exceeded: int | None = Field(default=0, ge=0)
+    network_packets_per_second_allowance_exceeded: int | None = Field(default=0, ge=0)
+    dashboard: bool = True
+
+
+PolicyAction = Literal["allow", "warn", "fail"]
+
+
+class ChangePolicy(BaseModel):
+    """How validate_plan.py treats the changes of a plan by impact, see change_impact"""
+
+    online: PolicyAction = "allow"
+    pending_reboot: PolicyAction = "warn"
+    # a deleted or replaced replication group loses its data
+    destroy: PolicyAction = "fail"
+
+
+# attributes of replication groups, which don't apply to serverless caches
+REPLICATION_GROUP_ATTRIBUTES = (
+    "automatic_failover_enabled",
+    "autoscaling",
+    "availability_zones",
+    "capacity",
+    "data_tiering_enabled",
+    "global_datastore",
+    "log_delivery_configuration",
+    "maintenance_window",
+    "monitoring",
+    "multi_az_enabled",
+    "notification_topic_arn",
+    "num_node_groups",
+    "number_cache_clusters",
+    "parameter_group",
+    "parameter_group_name",
+    "port",
+    "replicas_per_node_group",
+    "reset_password",
+    "snapshot_window",
+    "subnet_group_name",
+    "transit_encryption_mode",
+)
+
 
 class ElasticacheData(BaseModel):
     """Data model for AWS Elasticache"""
@@ -53,6 +272,7 @@ class ElasticacheData(BaseModel):
     at_rest_encryption_enabled: bool | None = None
     auto_minor_version_upgrade: bool | None = None
     automatic_failover_enabled: bool | None = None
+    data_tiering_enabled: bool | None = None
     reset_password: str | None = None
     replication_group_description: str = "elasticache replication group"
     engine: str
@@ -62,7 +282,8 @@ class ElasticacheData(BaseModel):
     )
     maintenance_window: str | None = None
     multi_az_enabled: bool | None = None
-    node_type: str
+    # unset for serverless caches
+    node_type: str | None = None
     notification_topic_arn: str | None = None
     number_cache_clusters: int | None = None
     num_node_groups: int | None = None
@@ -78,6 +299,84 @@ class ElasticacheData(BaseModel):
     subnet_group_name: str | None = None
     transit_encryption_enabled: bool | None = None
     transit_encryption_mode: str | None = None
+    capacity: Capacity | None = None
+    global_datastore: GlobalDatastore | None = None
+    serverless: Serverless | None = None
+    autoscaling: Autoscaling | None = None
+    monitoring: Monitoring | None = None
+    change_policy: ChangePolicy = Field(default_factory=ChangePolicy)
+
+    @property
+    def resource_ids(self) -> list[str]:
+        """The IDs of the resources the stack creates for this cluster"""
+        ids = [self.identifier]
+        if self.transit_encryption_enabled and not self.serverless:
+            ids.append(f"{self.identifier}-password")
+        if self.parameter_group:
+            ids.append(self.parameter_group.name)
+        if self.global_datastore:
+            ids.append(f"{self.identifier}-global")
+            ids += [
+                f"{self.identifier}-{s.region}"
+                for s in self.global_datastore.secondaries
+            ]
+        if self.autoscaling:
+            for dimension in self.autoscaling.targets:
+                ids += [
+                    f"{self.identifier}-{dimension}-target",
+                    f"{self.identifier}-{dimension}-policy",
+                ]
+        if self.monitoring:
+            ids += list(monitoring.alarms(self))
+            if self.monitoring.dashboard:
+                ids.append(f"{self.identifier}-dashboard")
+        return ids
+
+    @property
+    def regions(self) -> list[str]:
+        """The region of the replication group and of its global datastore secondaries"""
+        if not self.global_datastore:
+            return [self.region]
+        return [self.region] + [s.region for s in self.global_datastore.secondaries]
+
+    @model_validator(mode="before")
+    @classmethod
+    def layout_from_planner(cls, data: Any) -> Any:  # noqa: ANN401
+        """Without a layout, the capacity planner chooses one before the layout rules are checked"""
+        if (
+            not isinstance(data, dict)
+            or not data.get("capacity")
+            or data.get("num_node_groups")
+            or data.get("number_cache_clusters")
+        ):
+            return data
+        if data.get("replicas_per_node_group") is not None:
+            raise ValueError(
+                "replicas_per_node_group needs cluster_mode.num_node_groups, or leave the whole layout to the capacity planner."
+            )
+        if not (node := engine_catalog().node_type(data.get("node_type") or "")):
+            return data
+        try:
+            capacity = Capacity.model_validate(data["capacity"])
+        except ValidationError:
+            # reported by the field validation
+            return data
+        min_replicas = int(bool(data.get("automatic_failover_enabled")))
+        needed = planner.plan(capacity, node, min_replicas=min_replicas)
+        if error := planner.too_many_shards(
+            capacity,
+            needed,
+            data.get("engine") or "",
+            data.get("engine_version") or "",
+            min_replicas=min_replicas,
+        ):
+            raise ValueError(error)
+        if needed.shards == 1:
+            return data | {"number_cache_clusters": needed.nodes}
+        return data | {
+            "num_node_groups": needed.shards,
+            "replicas_per_node_group": needed.replicas_per_shard,
+        }
 
     @model_validator(mode="after")
     def automatic_failover(self) -> Self:
@@ -90,18 +389,9 @@ class ElasticacheData(BaseModel):
             raise ValueError(
                 "Automatic failover is not supported for clusters with less than 2 nodes. Set number_cache_clusters to 2 or more."
             )
-        return self
-
-    @model_validator(mode="after")
-    def no_auto_minor_version_upgrade_for_redis_five(self) -> Self:
-        """Auto minor version upgrade is not supported for Redis 5.x"""
-        if (
-            self.engine == "redis"
-            and self.engine_version.startswith("5.")
-            and self.auto_minor_version_upgrade
-        ):
+        if self.num_node_groups and self.automatic_failover_enabled is False:
             raise ValueError(
-                "Auto minor version upgrade is not supported for Redis 5.x"
+                "Automatic failover must be enabled for cluster mode (cluster_mode.num_node_groups)."
             )
         return self
 
@@ -133,12 +423,235 @@ class ElasticacheData(BaseModel):
         return self
 
     @model_validator(mode="after")
-    def no_snapshot_retention_limit_for_cache_t1_micro(self) -> Self:
-        """Snapshot retention limit is not supported for cache.t1.micro"""
-        if self.node_type == "cache.t1.micro" and self.snapshot_retention_limit:
+    def node_type_or_serverless(self) -> Self:
+        """A replication group needs a node type, a serverless cache has none"""
+        if self.serverless and self.node_type:
             raise ValueError(
-                "Snapshot retention limit is not supported for cache.t1.micro"
+                "node_type and serverless are mutually exclusive. Serverless caches scale within their usage limits."
             )
+        if not self.serverless and not self.node_type:
+            raise ValueError("node_type is required for replication groups.")
+        return self
+
+    @model_validator(mode="after")
+    def node_type_in_catalog(self) -> Self:
+        """The node type must be supported and capable of the configuration, see engine_catalog"""
+        if not self.node_type:
+            return self
+        catalog = engine_catalog()
+        if not (node := catalog.node_type(self.node_type)):
+            message = f"Unknown node type {self.node_type}"
+            if matches := difflib.get_close_matches(
+                self.node_type, catalog.node_types, n=1
+            ):
+                message += f", did you mean {matches[0]}?"
+            raise ValueError(message)
+        if node.deprecated:
+            raise ValueError(
+                f"Node type {self.node_type} is deprecated. Use a current generation node type."
+            )
+        if not node.snapshots and self.snapshot_retention_limit:
+            raise ValueError(
+                f"Snapshot retention limit is not supported for {self.node_type}"
+            )
+        if not node.cluster_mode and self.num_node_groups:
+            raise ValueError(
+                f"Cluster mode (cluster_mode.num_node_groups) is not supported for {self.node_type}"
+            )
+        min_version = node.min_engine_version.get(self.engine)
+        if min_version and version_key(self.engine_version) < version_key(min_version):
+            raise ValueError(
+                f"Node type {self.node_type} needs {self.engine} {min_version} or later"
+            )
+        if node.data_tiering and not self.data_tiering_enabled:
+            raise ValueError(
+                f"Data tiering is mandatory for {self.node_type}. Set data_tiering_enabled to true."
+            )
+        if self.data_tiering_enabled and not node.data_tiering:
+            raise ValueError(
+                f"Data tiering is not supported for {self.node_type}. Use a data tiering node type like cache.r6gd.xlarge."
+            )
+        return self
+
+    @property
+    def data_tiering_capacity(self) -> tuple[float, float] | None:
+        """The memory and SSD (GiB) of the primaries, if data tiering is enabled"""
+        if (
+            not self.data_tiering_enabled
+            or not self.node_type
+            or not (node := engine_catalog().node_type(self.node_type))
+        ):
+            return None
+        shards = self.num_node_groups or 1
+        return round(shards * node.memory_gib, 2), round(shards * node.ssd_gib, 2)
+
+    @property
+    def capacity_plan(self) -> CapacityPlan | None:
+        """What the configured layout serves, if a capacity block is set"""
+        if (
+            not self.capacity
+            or not self.node_type
+            or not (node := engine_catalog().node_type(self.node_type))
+        ):
+            return None
+        if self.num_node_groups:
+            return planner.layout(
+                node, self.num_node_groups, self.replicas_per_node_group or 0
+            )
+        return planner.layout(node, 1, (self.number_cache_clusters or 1) - 1)
+
+    @model_validator(mode="after")
+    def engine_version_in_catalog(self) -> Self:
+        """The engine version must be supported, see engine_catalog"""
+        catalog = engine_catalog()
+        if self.engine not in catalog.engines:
+            raise ValueError(
+                f"Unknown engine {self.engine}, supported engines: {', '.join(catalog.engines)}"
+            )
+        version = catalog.engine_version(self.engine, self.engine_version)
+        if not version:
+            raise ValueError(
+                f"Unsupported {self.engine} engine version {self.engine_version}, supported versions: {', '.join(catalog.engines[self.engine])}"
+            )
+        if version.deprecated:
+            raise ValueError(
+                f"{self.engine} {self.engine_version} is deprecated. Upgrade to a supported engine version."
+            )
+        if self.auto_minor_version_upgrade and not version.auto_minor_version_upgrade:
+            raise ValueError(
+                f"Auto minor version upgrade is not supported for {self.engine} {self.engine_version}"
+            )
+        if self.parameter_group and self.parameter_group.family != version.family:
+            raise ValueError(
+                f"The parameter group family must be {version.family} for {self.engine} {self.engine_version}"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def capacity_layout(self) -> Self:
+        """The layout must serve the capacity block, see layout_from_planner"""
+        if (
+            not self.capacity
+            or not (configured := self.capacity_plan)
+            or not (missing := planner.shortfalls(self.capacity, configured))
+        ):
+            return self
+        node = engine_catalog().node_type(configured.node_type)
+        assert node  # mypy
+        needed = planner.plan(
+            self.capacity, node, min_replicas=int(bool(self.automatic_failover_enabled))
+        )
+        raise ValueError(
+            f"{configured.shards} shard(s) with {configured.replicas_per_shard} replica(s) of {self.node_type} don't serve the capacity targets ({', '.join(missing)}). The planner recommends {needed.shards} shard(s) with {needed.replicas_per_shard} replica(s)."
+        )
+
+    @model_validator(mode="after")
+    def global_datastore_supported(self) -> Self:
+        """The node type and engine version must support global datastores, one secondary per region"""
+        if not self.global_datastore:
+            return self
+        catalog = engine_catalog()
+        node = catalog.node_type(self.node_type) if self.node_type else None
+        if node and not node.global_datastore:
+            raise ValueError(
+                f"Global datastores are not supported for {self.node_type}"
+            )
+        version = catalog.engine_version(self.engine, self.engine_version)
+        if version and not version.global_datastore:
+            raise ValueError(
+                f"Global datastores are not supported for {self.engine} {self.engine_version}"
+            )
+        if len(set(self.regions)) < len(self.regions):
+            raise ValueError(
+                "The secondaries of a global datastore must be in distinct regions other than the primary region."
+            )
+        ids = [self.replication_group_id] + [
+            s.replication_group_id for s in self.global_datastore.secondaries
+        ]
+        if len(set(ids)) < len(ids):
+            raise ValueError(
+                "The secondaries of a global datastore need their own replication_group_id."
+            )
+        return self
+
+    @model_validator(mode="after")
+    def global_datastore_layout(self) -> Self:
+        """The secondaries have the replicas of the primary unless configured"""
+        for secondary in (
+            self.global_datastore.secondaries if self.global_datastore else []
+        ):
+            if self.num_node_groups and secondary.number_cache_clusters:
+                raise ValueError(
+                    "number_cache_clusters of a global datastore secondary is not supported in cluster mode, use replicas_per_node_group."
+                )
+            if not self.num_node_groups and secondary.replicas_per_node_group:
+                raise ValueError(
+                    "replicas_per_node_group of a global datastore secondary needs cluster mode, use number_cache_clusters."
+                )
+            if self.num_node_groups:
+                if secondary.replicas_per_node_group is None:
+                    secondary.replicas_per_node_group = self.replicas_per_node_group
+            elif secondary.number_cache_clusters is None:
+                secondary.number_cache_clusters = self.number_cache_clusters
+        return self
+
+    @model_validator(mode="after")
+    def serverless_supported(self) -> Self:
+        """The engine version must support serverless caches, replication group attributes are not supported"""
+        if not self.serverless:
+            return self
+        version = engine_catalog().engine_version(self.engine, self.engine_version)
+        if version and not version.serverless:
+            raise ValueError(
+                f"Serverless caches are not supported for {self.engine} {self.engine_version}"
+            )
+        if unsupported := [a for a in REPLICATION_GROUP_ATTRIBUTES if getattr(self, a)]:
+            raise ValueError(
+                f"{', '.join(unsupported)} not supported for serverless caches"
+            )
+        if self.transit_encryption_enabled is False:
+            raise ValueError("Serverless caches are always encrypted in transit.")
+        return self
+
+    @model_validator(mode="after")
+    def autoscaling_supported(self) -> Self:
+        """Autoscaling needs cluster mode, a capable node type and engine version and a layout within the capacity range"""
+        if not self.autoscaling or not self.node_type:
+            return self
+        if not self.num_node_groups:
+            raise ValueError(
+                "Autoscaling is only supported for cluster-mode enabled replication groups (cluster_mode.num_node_groups)."
+            )
+        if self.global_datastore:
+            raise ValueError("Autoscaling is not supported for global datastores.")
+        if self.monitoring:
+            # the alarms cover the configured members, not the scaled ones
+            raise ValueError(
+                "Autoscaling is not supported together with monitoring, the alarms only cover the configured member clusters."
+            )
+        catalog = engine_catalog()
+        node = catalog.node_type(self.node_type)
+        if node and not node.autoscaling:
+            raise ValueError(f"Autoscaling is not supported for {self.node_type}")
+        version = catalog.engine_version(self.engine, self.engine_version)
+        if version and not version.autoscaling:
+            raise ValueError(
+                f"Autoscaling is not supported for {self.engine} {self.engine_version}"
+            )
+        if (
+            self.autoscaling.replicas
+            and self.autoscaling.replicas.max_capacity > planner.MAX_REPLICAS
+        ):
+            raise ValueError(
+                f"Autoscaling supports at most {planner.MAX_REPLICAS} replicas per shard"
+            )
+        for dimension, target in self.autoscaling.targets.items():
+            attribute = SCALED_ATTRIBUTES[dimension]
+            value = getattr(self, attribute) or 0
+            if not target.min_capacity <= value <= target.max_capacity:
+                raise ValueError(
+                    f"{attribute} ({value}) must be within the {dimension} capacity range {target.min_capacity}-{target.max_capacity}"
+                )
         return self
 
 
@@ -147,3 +660,101 @@ class AppInterfaceInput(BaseModel):
 
     data: ElasticacheData
     provision: AppInterfaceProvision
+
+    @property
+    def clusters(self) -> list[ElasticacheData]:
+        """The clusters of the stack"""
+        return [self.data]
+
+
+class MultiClusterInput(BaseModel):
+    """Input model for many AWS Elasticache clusters in one stack
+
+    The clusters share the terraform state, the region and the AWS provider.
+    """
+
+    data: Sequence[ElasticacheData] = Field(min_length=1)
+    provision: AppInterfaceProvision
+
+    @property
+    def clusters(self) -> list[ElasticacheData]:
+        """The clusters of the stack"""
+        return list(self.data)
+
+    @model_validator(mode="after")
+    def shared_provider(self) -> Self:
+        """All clusters share one AWS provider"""
+        if len({c.region for c in self.data}) > 1:
+            raise ValueError("All clusters of a stack must be in the same region.")
+        if any(c.default_tags != self.data[0].default_tags for c in self.data):
+            raise ValueError("All clusters of a stack must have the same default_tags.")
+        return self
+
+    @model_validator(mode="after")
+    def unique_clusters(self) -> Self:
+        """Resource IDs, replication group IDs and outputs must not collide"""
+        for attribute, values in {
+            "resource IDs": [id_ for c in self.data for id_ in c.resource_ids],
+            "replication_group_id": [c.replication_group_id for c in self.data],
+            "output_prefix": [c.output_prefix for c in self.data],
+        }.items():
+            if duplicates := sorted(v for v, n in Counter(values).items() if n > 1):
+                raise ValueError(
+                    f"Duplicate {attribute} in the stack: {', '.join(duplicates)}"
+                )
+        return self
+
+
+StackInput = AppInterfaceInput | MultiClusterInput
+
+
+def input_kind(document: Any) -> str:  # noqa: ANN401
+    """A list of clusters as data makes a multi-cluster input"""
+    data = (
+        document.get("data")
+        if isinstance(document, dict)
+        else getattr(document, "data", None)
+    )
+    return "multi" if isinstance(data, list) else "single"
+
+
+INPUT_KINDS = {"single": "AppInterfaceInput", "multi": "MultiClusterInput"}
+STACK_INPUT: TypeAdapter[StackInput] = TypeAdapter(
+    Annotated[
+        Annotated[AppInterfaceInput, Tag("single")]
+        | Annotated[MultiClusterInput, Tag("multi")],
+        Discriminator(input_kind),
+    ]
+)
+
+
+def untagged(error: ValidationError) -> ValidationError:
+    """The error with locations in the document, without the tag of the input kind"""
+    details: list[InitErrorDetails] = []
+    title = error.title
+    for e in error.errors():
+        loc = e["loc"]
+        if loc and loc[0] in INPUT_KINDS:
+            title = INPUT_KINDS[str(loc[0])]
+            loc = loc[1:]
+        detail: InitErrorDetails = {"type": e["type"], "loc": loc, "input": e["input"]}
+        if "ctx" in e:
+            detail["ctx"] = e["ctx"]
+        details.append(detail)
+    return ValidationError.from_exception_data(title, details)
+
+
+def validate_input(document: Any) -> StackInput:  # noqa: ANN401
+    """Validate a single or, with a list of clusters as data, a multi-cluster input."""
+    try:
+        return STACK_INPUT.validate_python(document)
+    except ValidationError as e:
+        raise untagged(e) from None
+
+
+def parse_input(raw: bytes | str) -> StackInput:
+    """Parse a single or a multi-cluster input JSON document, without a dict round-trip."""
+    try:
+        return STACK_INPUT.validate_json(raw)
+    except ValidationError as e:
+        raise untagged(e) from None
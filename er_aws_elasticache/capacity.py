@@ -0,0 +1,196 @@
+"""Capacity planner for the shard and replica layout of a cluster.
+
+The `capacity` block of an input describes the workload: the dataset size, the
+peak operations per second, the share of reads and the headroom to keep. With
+the node memory and the estimated node throughput of the engine catalog, the
+planner derives the smallest layout of a node type which serves the workload:
+
+* every shard keeps its part of the dataset, in the node memory less the reserved
+  memory (and, for data tiering node types, on the SSD),
+* the primary of a shard serves all writes of the shard,
+* the reads are spread over the primary and the replicas of the shard.
+
+The input validators check a configured layout against the workload, or fill in
+the layout if none is configured. A planned layout with more than `max_shards`
+shards is rejected with larger node types to use instead. Recommend node types for the capacity block of
+an input with:
+
+    python -m er_aws_elasticache.capacity input.json
+"""
+
+import argparse
+import json
+from math import ceil
+from operator import itemgetter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from .engine_catalog import NodeType, engine_catalog, version_key
+
+if TYPE_CHECKING:
+    from .app_interface_input import Capacity
+
+# the default reserved-memory-percent of the parameter groups
+RESERVED_MEMORY = 0.25
+MAX_REPLICAS = 5
+# the default max_shards of the capacity block, a sanity bound of the planner
+MAX_SHARDS = 15
+RECOMMENDATIONS = 5
+
+
+class CapacityPlan(BaseModel):
+    """A layout of a node type and what it serves"""
+
+    node_type: str
+    shards: int
+    replicas_per_shard: int
+    # usable memory for the dataset
+    memory_gib: float
+    # throughput of all nodes and of the primaries
+    ops_per_second: int
+    write_ops_per_second: int
+
+    @property
+    def nodes(self) -> int:
+        """The number of nodes"""
+        return self.shards * (1 + self.replicas_per_shard)
+
+
+def node_memory(node: NodeType) -> float:
+    """The memory one node has for the dataset."""
+    return (node.memory_gib + node.ssd_gib) * (1 - RESERVED_MEMORY)
+
+
+def layout(node: NodeType, shards: int, replicas_per_shard: int) -> CapacityPlan:
+    """What a layout of a node type serves."""
+    return CapacityPlan(
+        node_type=node.name,
+        shards=shards,
+        replicas_per_shard=replicas_per_shard,
+        memory_gib=round(shards * node_memory(node), 2),
+        ops_per_second=shards * (1 + replicas_per_shard) * node.ops_per_second,
+        write_ops_per_second=shards * node.ops_per_second,
+    )
+
+
+def targets(capacity: "Capacity") -> tuple[float, float, float]:
+    """The memory, operations and writes per second to serve, with headroom."""
+    headroom = 1 + capacity.headroom_percent / 100
+    return (
+        capacity.dataset_gib * headroom,
+        capacity.peak_ops_per_second * headroom,
+        capacity.peak_ops_per_second * (1 - capacity.read_ratio) * headroom,
+    )
+
+
+def shortfalls(capacity: "Capacity", plan: CapacityPlan) -> list[str]:
+    """Which targets of the capacity block the layout misses."""
+    memory, ops, writes = targets(capacity)
+    missing = []
+    if plan.memory_gib < memory:
+        missing.append(f"{plan.memory_gib} GiB memory < {memory:.2f} GiB")
+    if plan.write_ops_per_second < writes:
+        missing.append(f"{plan.write_ops_per_second} writes/s < {writes:.0f} writes/s")
+    if plan.ops_per_second < ops:
+        missing.append(f"{plan.ops_per_second} ops/s < {ops:.0f} ops/s")
+    return missing
+
+
+def plan(capacity: "Capacity", node: NodeType, min_replicas: int = 0) -> CapacityPlan:
+    """The smallest layout of a node type which serves the capacity block."""
+    memory, ops, writes = targets(capacity)
+    shards = max(
+        1,
+        ceil(memory / node_memory(node)),
+        ceil(writes / node.ops_per_second),
+        # a shard has at most MAX_REPLICAS replicas to spread the reads over
+        ceil(ops / ((1 + MAX_REPLICAS) * node.ops_per_second)),
+    )
+    replicas = max(min_replicas, ceil(ops / shards / node.ops_per_second) - 1)
+    return layout(node, shards, replicas)
+
+
+def recommend(
+    capacity: "Capacity", engine: str, engine_version: str, min_replicas: int = 0
+) -> list[CapacityPlan]:
+    """The layouts of the current node types, fewest total node memory first."""
+    catalog = engine_catalog()
+    candidates = []
+    for name in catalog.node_types:
+        node = catalog.node_type(name)
+        assert node  # mypy
+        min_version = node.min_engine_version.get(engine)
+        if (
+            node.previous_generation
+            or node.deprecated
+            or (min_version and version_key(engine_version) < version_key(min_version))
+        ):
+            continue
+        p = plan(capacity, node, min_replicas)
+        candidates.append((p.nodes * node.memory_gib, p.nodes, p))
+    return [p for _, _, p in sorted(candidates, key=itemgetter(0, 1))]
+
+
+def too_many_shards(
+    capacity: "Capacity",
+    needed: CapacityPlan,
+    engine: str,
+    engine_version: str,
+    min_replicas: int = 0,
+) -> str | None:
+    """Why the planned layout has too many shards, with node types needing fewer."""
+    if needed.shards <= capacity.max_shards:
+        return None
+    message = f"The capacity planner needs {needed.shards} shards of {needed.node_type}, more than max_shards ({capacity.max_shards})."
+    catalog = engine_catalog()
+    planned = catalog.node_type(needed.node_type)
+    assert planned  # mypy
+    larger = []
+    for p in recommend(capacity, engine, engine_version, min_replicas):
+        node = catalog.node_type(p.node_type)
+        assert node  # mypy
+        if (
+            p.shards <= capacity.max_shards
+            and node.memory_gib > planned.memory_gib
+            # data tiering needs data_tiering_enabled
+            and bool(node.ssd_gib) == bool(planned.ssd_gib)
+        ):
+            larger.append(p.node_type)
+    if larger := larger[:3]:
+        message += f" Use a larger node type, e.g. {', '.join(larger)}."
+    return message
+
+
+def main() -> None:
+    """Print the recommended layouts for the capacity blocks of an input."""
+    # the input isn't parsed, its layout may not serve the capacity block yet
+    from .app_interface_input import Capacity  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", type=Path, help="app-interface input JSON file")
+    parser.add_argument("--top", type=int, default=RECOMMENDATIONS)
+    args = parser.parse_args()
+    clusters = json.loads(args.input.read_bytes())["data"]
+    for data in clusters if isinstance(clusters, list) else [clusters]:
+        if not data.get("capacity"):
+            continue
+        recommendations = recommend(
+            Capacity.model_validate(data["capacity"]),
+            data["engine"],
+            data["engine_version"],
+            min_replicas=int(bool(data.get("automatic_failover_enabled"))),
+        )
+        for recommendation in recommendations[: args.top]:
+            print(  # noqa: T201
+                json.dumps(
+                    {"identifier": data["identifier"]} | recommendation.model_dump()
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
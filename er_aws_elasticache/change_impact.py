@@ -0,0 +1,272 @@
+"""Impact of the updates, deletes and replaces of a terraform plan.
+
+Every change of a replication group, serverless cache or parameter group which
+isn't a plain create is classified by what it does to the cache:
+
+* online: applied in place while the cache serves, e.g. node type scaling,
+  resharding, engine upgrades or parameters which apply immediately,
+* pending-reboot: changed parameters which only apply after the nodes are
+  rebooted, see parameter_catalog, and changes of attributes with an unknown
+  impact,
+* destroy: the replication group or serverless cache is deleted or replaced, its
+  data is lost and the clients reconnect to a cold cache.
+
+The `change_policy` of the input decides whether `validate_plan.py` allows an
+impact, logs a warning or fails.
+"""
+
+from collections.abc import Iterable, Mapping
+from enum import StrEnum
+from typing import Any
+
+from external_resources_io.terraform import Action, ResourceChange
+from pydantic import BaseModel
+
+from .parameter_catalog import family_catalog
+
+REPLICATION_GROUP = "aws_elasticache_replication_group"
+SERVERLESS_CACHE = "aws_elasticache_serverless_cache"
+PARAMETER_GROUP = "aws_elasticache_parameter_group"
+
+# what an online update of a replication group attribute does, the updates of
+# all other attributes may need a reboot
+ONLINE_OPERATIONS = {
+    "apply_immediately": "plan only",
+    "auth_token": "online auth token rotation",
+    "auth_token_update_strategy": "online auth token rotation",
+    "auto_minor_version_upgrade": "online update",
+    "automatic_failover_enabled": "online update",
+    "description": "online update",
+    "engine_version": "online engine upgrade",
+    "log_delivery_configuration": "online update",
+    "maintenance_window": "online update",
+    "multi_az_enabled": "online update",
+    "node_type": "online vertical scaling",
+    "notification_topic_arn": "online update",
+    "num_cache_clusters": "replicas added or removed online",
+    "num_node_groups": "online resharding",
+    # the parameters of both groups are compared
+    "parameter_group_name": "parameter group switched",
+    "replicas_per_node_group": "replicas added or removed online",
+    "security_group_ids": "online update",
+    "snapshot_retention_limit": "online update",
+    "snapshot_window": "online update",
+    "tags": "online update",
+    "tags_all": "online update",
+    "user_group_ids": "online update",
+}
+
+# the same for a serverless cache, which scales by itself
+SERVERLESS_ONLINE_OPERATIONS = {
+    "cache_usage_limits": "online update of the usage limits",
+    "daily_snapshot_time": "online update",
+    "description": "online update",
+    "major_engine_version": "online engine upgrade",
+    "security_group_ids": "online update",
+    "snapshot_retention_limit": "online update",
+    "tags": "online update",
+    "tags_all": "online update",
+    "user_group_id": "online update",
+}
+
+
+class Impact(StrEnum):
+    """The impact of a change, from least to most disruptive"""
+
+    ONLINE = "online"
+    PENDING_REBOOT = "pending-reboot"
+    DESTROY = "destroy"
+
+
+def most_disruptive(*impacts: Impact) -> Impact:
+    """The most disruptive of the impacts."""
+    return max(impacts, key=list(Impact).index)
+
+
+class ChangeImpact(BaseModel):
+    """The impact of a resource change and why"""
+
+    address: str
+    # the replication_group_id, the serverless cache or the parameter group name
+    resource_id: str
+    impact: Impact
+    reasons: list[str]
+
+    def __str__(self) -> str:
+        """E.g. aws_elasticache_replication_group.x: destroy (replaced, ...)"""
+        return f"{self.address}: {self.impact} ({'; '.join(self.reasons)})"
+
+
+def changed_attributes(
+    before: Mapping[str, Any], after: Mapping[str, Any]
+) -> list[str]:
+    """The known attributes whose value changes."""
+    return sorted(k for k, v in after.items() if before.get(k) != v)
+
+
+def parameters(values: Mapping[str, Any] | None) -> dict[str, str]:
+    """The parameters of a parameter group, by name."""
+    return {p["name"]: p["value"] for p in (values or {}).get("parameter") or []}
+
+
+def reboot_parameters(family: str | None, names: Iterable[str]) -> list[str]:
+    """The parameters which need a reboot; unknown parameters are assumed to."""
+    catalog = family_catalog(family) if family else None
+    return sorted(
+        name
+        for name in names
+        if not catalog
+        or not (spec := catalog.parameters.get(name))
+        or spec.change_type == "requires-reboot"
+    )
+
+
+def parameter_changes(
+    family: str | None, before: Mapping[str, str], after: Mapping[str, str]
+) -> tuple[Impact, list[str]]:
+    """The impact of changed, added and removed parameters."""
+    changed = {n for n in before.keys() | after.keys() if before.get(n) != after.get(n)}
+    if reboot := reboot_parameters(family, changed):
+        return Impact.PENDING_REBOOT, [
+            f"parameters which apply after a reboot: {', '.join(reboot)}"
+        ]
+    if changed:
+        return Impact.ONLINE, [
+            f"parameters which apply immediately: {', '.join(sorted(changed))}"
+        ]
+    return Impact.ONLINE, []
+
+
+def cache_destroy(change: ResourceChange) -> tuple[Impact, list[str]] | None:
+    """The impact of a delete or replace of a cache, None for an update."""
+    assert change.change  # mypy
+    actions = change.change.actions
+    if Action.ActionDelete not in actions:
+        return None
+    if Action.ActionCreate not in actions:
+        return Impact.DESTROY, ["deleted, its data is lost"]
+    # only read by plan_reader, the diff may list computed attributes too
+    replace_paths = getattr(change.change, "replace_paths", None)
+    attributes = (
+        sorted({str(path[0]) for path in replace_paths if path})
+        if replace_paths
+        else changed_attributes(change.change.before or {}, change.change.after or {})
+    )
+    return Impact.DESTROY, [
+        f"replaced because of {', '.join(attributes) or 'unknown'}, the new cache starts empty"
+    ]
+
+
+def attribute_updates(
+    operations: Mapping[str, str], before: Mapping[str, Any], after: Mapping[str, Any]
+) -> tuple[Impact, list[str]]:
+    """The impact of the in-place updates of a cache."""
+    impact, reasons = Impact.ONLINE, []
+    for attribute in changed_attributes(before, after):
+        change = f"{attribute} {before.get(attribute)} -> {after[attribute]}"
+        if operation := operations.get(attribute):
+            reasons.append(f"{change}: {operation}")
+        else:
+            impact = Impact.PENDING_REBOOT
+            reasons.append(f"{change}: unknown impact, it may need a reboot")
+    return impact, reasons
+
+
+def serverless_cache_change(change: ResourceChange) -> tuple[Impact, list[str]]:
+    """The impact of an update, delete or replace of a serverless cache."""
+    assert change.change  # mypy
+    if destroy := cache_destroy(change):
+        return destroy
+    return attribute_updates(
+        SERVERLESS_ONLINE_OPERATIONS,
+        change.change.before or {},
+        change.change.after or {},
+    )
+
+
+def parameter_group_change(change: ResourceChange) -> tuple[Impact, list[str]]:
+    """The impact of an update, delete or replace of a parameter group."""
+    assert change.change  # mypy
+    if not change.change.after:
+        return Impact.ONLINE, ["deleted, it's not used anymore"]
+    return parameter_changes(
+        change.change.after.get("family"),
+        parameters(change.change.before),
+        parameters(change.change.after),
+    )
+
+
+class ChangeAnalyzer:
+    """Classifies the cache and parameter group changes of a plan
+
+    The parameter groups of the plan are indexed first, so switching a
+    replication group to another parameter group is classified by the parameters
+    which differ between the groups.
+    """
+
+    def __init__(self, changes: Iterable[ResourceChange]) -> None:
+        self.changes = {
+            c.address or f"{c.type}.{c.name}": c
+            for c in changes
+            if c.type in {REPLICATION_GROUP, SERVERLESS_CACHE, PARAMETER_GROUP}
+            and c.change
+        }
+        self.parameter_groups: dict[str, Mapping[str, Any]] = {}
+        for c in self.changes.values():
+            if c.type != PARAMETER_GROUP:
+                continue
+            assert c.change  # mypy
+            for values in (c.change.before, c.change.after):
+                if values and values.get("name"):
+                    self.parameter_groups.setdefault(values["name"], values)
+
+    def _replication_group(self, change: ResourceChange) -> tuple[Impact, list[str]]:
+        assert change.change  # mypy
+        if destroy := cache_destroy(change):
+            return destroy
+        before, after = change.change.before or {}, change.change.after or {}
+        impact, reasons = attribute_updates(ONLINE_OPERATIONS, before, after)
+        if "parameter_group_name" in after and before.get(
+            "parameter_group_name"
+        ) != after.get("parameter_group_name"):
+            old = self.parameter_groups.get(before.get("parameter_group_name") or "")
+            new = self.parameter_groups.get(after["parameter_group_name"] or "")
+            if old is None or new is None:
+                impact = most_disruptive(impact, Impact.PENDING_REBOOT)
+                reasons.append(
+                    "the parameters of the parameter groups are unknown, they may apply after a reboot"
+                )
+            else:
+                parameter_impact, parameter_reasons = parameter_changes(
+                    new.get("family"), parameters(old), parameters(new)
+                )
+                impact = most_disruptive(impact, parameter_impact)
+                reasons += parameter_reasons
+        return impact, reasons
+
+    def analyze(self) -> list[ChangeImpact]:
+        """The impacts of all updates, deletes and replaces, in plan order."""
+        impacts = []
+        for address, c in self.changes.items():
+            assert c.change  # mypy
+            if not {Action.ActionUpdate, Action.ActionDelete} & set(c.change.actions):
+                continue
+            values = c.change.after or c.change.before or {}
+            if c.type == REPLICATION_GROUP:
+                impact, reasons = self._replication_group(c)
+                resource_id = values.get("replication_group_id", c.name)
+            elif c.type == SERVERLESS_CACHE:
+                impact, reasons = serverless_cache_change(c)
+                resource_id = values.get("name", c.name)
+            else:
+                impact, reasons = parameter_group_change(c)
+                resource_id = values.get("name", c.name)
+            impacts.append(
+                ChangeImpact(
+                    address=address,
+                    resource_id=resource_id,
+                    impact=impact,
+                    reasons=reasons,
+                )
+            )
+        return impacts
@@ -0,0 +1,134 @@
+"""Offline catalog of the Elasticache node types and engine versions.
+
+`node_type` and `engine_version` are free-form strings in the input. The catalog
+in data/engine_catalog.json describes the node families (memory, vCPUs, network
+class and estimated throughput per size, Graviton, data tiering, global datastore,
+autoscaling and cluster mode support, snapshots, the minimum engine version) and
+the supported engine versions with their parameter group family, global datastore,
+serverless and autoscaling support, so the input validators can reject
+unsupported or deprecated combinations when the input is parsed. It is maintained by hand from the
+Elasticache documentation and loaded on first use.
+"""
+
+from functools import cache
+from pathlib import Path
+
+from pydantic import BaseModel
+
+CATALOG_FILE = Path(__file__).parent / "data" / "engine_catalog.json"
+
+
+class NodeSize(BaseModel):
+    """The resources of a node size"""
+
+    memory_gib: float
+    vcpus: int
+    network: str
+    # estimated sustained GET/SET throughput of one node
+    ops_per_second: int
+    # the SSD of the data tiering node types
+    ssd_gib: float = 0.0
+
+
+class NodeFamily(BaseModel):
+    """The capabilities of a node family, e.g. r6g"""
+
+    graviton: bool = False
+    data_tiering: bool = False
+    global_datastore: bool = False
+    autoscaling: bool = False
+    cluster_mode: bool = True
+    snapshots: bool = True
+    previous_generation: bool = False
+    deprecated: bool = False
+    # the lowest supported version per engine
+    min_engine_version: dict[str, str] = {}
+    sizes: dict[str, NodeSize]
+
+
+class NodeType(NodeSize):
+    """A node type, e.g. cache.r6g.large, with the capabilities of its family"""
+
+    name: str
+    family: str
+    graviton: bool
+    data_tiering: bool
+    global_datastore: bool
+    autoscaling: bool
+    cluster_mode: bool
+    snapshots: bool
+    previous_generation: bool
+    deprecated: bool
+    min_engine_version: dict[str, str]
+
+
+class EngineVersion(BaseModel):
+    """A supported engine version"""
+
+    family: str
+    auto_minor_version_upgrade: bool = True
+    global_datastore: bool = True
+    serverless: bool = False
+    autoscaling: bool = False
+    deprecated: bool = False
+
+
+class EngineCatalog(BaseModel):
+    """The node families and the engine versions"""
+
+    version: str
+    node_families: dict[str, NodeFamily]
+    engines: dict[str, dict[str, EngineVersion]]
+
+    @property
+    def node_types(self) -> list[str]:
+        """All node type names"""
+        return [
+            f"cache.{family}.{size}"
+            for family, node_family in self.node_families.items()
+            for size in node_family.sizes
+        ]
+
+    def node_type(self, name: str) -> NodeType | None:
+        """Look up a node type like cache.r6g.large."""
+        prefix, _, rest = name.partition(".")
+        family, _, size = rest.partition(".")
+        if prefix != "cache" or not (node_family := self.node_families.get(family)):
+            return None
+        if not (node_size := node_family.sizes.get(size)):
+            return None
+        return NodeType(
+            name=name,
+            family=family,
+            **node_family.model_dump(exclude={"sizes"}),
+            **node_size.model_dump(),
+        )
+
+    def engine_version(self, engine: str, version: str) -> EngineVersion | None:
+        """Look up a version of an engine; a patch version like 6.2.6 matches 6.2."""
+        versions = self.engines.get(engine, {})
+        if found := versions.get(version):
+            return found
+        major_minor = version_key(version)[:2]
+        return next(
+            (
+                v
+                for name, v in versions.items()
+                # 6.x is a version of its own, not any 6 version
+                if name.count(".") == 1
+                and name[-1].isdigit()
+                and version_key(name) == major_minor
+            ),
+            None,
+        )
+
+
+def version_key(version: str) -> tuple[int, ...]:
+    """Sort key of an engine version; 6.x sorts like 6.0."""
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
+
+
+@cache
+def engine_catalog() -> EngineCatalog:
+    """The bundled catalog."""
+    return EngineCatalog.model_validate_json(CATALOG_FILE.read_bytes())
@@ -0,0 +1,105 @@
+"""Phase timings and profiling of a run.
+
+`Metrics` records how long the named phases (spans) of a synth or validation run
+took. With ER_METRICS set, the entry points write them as a metrics JSON file next
+to their outputs.
+
+For deep dives, `profiling()` captures a cProfile profile into the ER_PROFILE file
+(read it with `python -m pstats`) and the top memory allocations, traced with
+tracemalloc, into the ER_TRACEMALLOC file.
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC_TOP = 25
+
+
+def metrics_enabled() -> bool:
+    """Whether the metrics JSON file should be written."""
+    return os.environ.get("ER_METRICS", "").lower() in {"1", "true", "yes"}
+
+
+class Metrics:
+    """Durations of the named phases of a run
+
+    A span entered more than once accumulates its durations.
+    """
+
+    def __init__(self) -> None:
+        self.spans: dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.spans[name] = self.spans.get(name, 0) + duration
+            logger.debug(f"{name} took {duration:.3f}s")
+
+    def as_dict(self) -> dict[str, Any]:
+        """The span durations and the total run time in milliseconds."""
+        return {
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "spans_ms": {
+                name: round(duration * 1000, 3) for name, duration in self.spans.items()
+            },
+        }
+
+    def write(self, path: Path, **extra: Any) -> None:  # noqa: ANN401
+        """Write the metrics JSON file, with extra top-level entries."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.as_dict() | extra, indent=2, sort_keys=True) + "\n",
+            encoding="utf-8",
+        )
+        logger.info(f"Metrics written to {path}")
+
+
+@contextmanager
+def profiling() -> Iterator[None]:
+    """Profile the enclosed code as configured by ER_PROFILE and ER_TRACEMALLOC."""
+    profile_file = os.environ.get("ER_PROFILE")
+    tracemalloc_file = os.environ.get("ER_TRACEMALLOC")
+    if not profile_file and not tracemalloc_file:
+        yield
+        return
+
+    # only imported for deep dives
+    import cProfile  # noqa: PLC0415
+    import tracemalloc  # noqa: PLC0415
+
+    profiler = cProfile.Profile() if profile_file else None
+    if tracemalloc_file:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler and profile_file:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+            logger.info(f"cProfile profile written to {profile_file}")
+        if tracemalloc_file:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"Peak traced memory: {peak / 1024:.1f} KiB"]
+            lines += [
+                str(stat) for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]
+            ]
+            Path(tracemalloc_file).write_text("\n".join(lines) + "\n", encoding="utf-8")
+            logger.info(f"tracemalloc statistics written to {tracemalloc_file}")
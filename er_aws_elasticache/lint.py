@@ -0,0 +1,132 @@
+"""Offline linter for app-interface input documents.
+
+The `ElasticacheData` validators otherwise only run when a single resource is
+synthesized. The linter validates a whole fleet of single and multi-cluster input
+documents across a process pool, without terraform, cdktf or AWS, and writes one
+JSON line per document in input order:
+
+    {"input": "path/input.json", "valid": false, "errors": [{"loc": "data", ...}]}
+
+It exits non-zero if any document is invalid.
+
+    er-aws-elasticache-lint inputs/ other/input.json --output lint.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, TextIO
+
+from pydantic import ValidationError
+
+from .app_interface_input import parse_input
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERN = "input.json"
+# documents per task sent to a worker process; a single document validates in
+# microseconds, so one task each would be dominated by the pickling round trips
+MAX_CHUNK_SIZE = 64
+SUMMARY_TOP = 10
+
+
+def find_inputs(paths: Iterable[str], pattern: str = DEFAULT_PATTERN) -> list[Path]:
+    """Expand the arguments into input documents
+
+    An argument is either a file or a directory, which is searched recursively for
+    files matching pattern.
+    """
+    inputs: list[Path] = []
+    for path in map(Path, paths):
+        inputs += sorted(path.rglob(pattern)) if path.is_dir() else [path]
+    return inputs
+
+
+def lint(input_file: Path) -> dict[str, Any]:
+    """Validate one input document and return its result record"""
+    errors: list[dict[str, Any]]
+    try:
+        parse_input(input_file.read_bytes())
+        errors = []
+    except ValidationError as e:
+        errors = [
+            {
+                "loc": ".".join(map(str, error["loc"])),
+                "msg": error["msg"],
+                "type": error["type"],
+            }
+            for error in e.errors(include_url=False)
+        ]
+    except OSError as e:
+        errors = [{"loc": "", "msg": str(e), "type": e.__class__.__name__}]
+    return {"input": str(input_file), "valid": not errors, "errors": errors}
+
+
+def lint_all(inputs: Sequence[Path], max_workers: int) -> Iterator[dict[str, Any]]:
+    """Validate all input documents and yield their results in input order"""
+    if max_workers <= 1 or len(inputs) <= 1:
+        yield from map(lint, inputs)
+        return
+    chunksize = max(1, min(MAX_CHUNK_SIZE, len(inputs) // (max_workers * 4)))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(lint, inputs, chunksize=chunksize)
+
+
+def run(inputs: Sequence[Path], output: TextIO, max_workers: int) -> bool:
+    """Lint all input documents, write the JSON lines and log a summary"""
+    invalid = 0
+    messages: Counter[str] = Counter()
+    for result in lint_all(inputs, max_workers):
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        if not result["valid"]:
+            invalid += 1
+            messages.update(error["msg"] for error in result["errors"])
+    logger.info(f"Linted {len(inputs)} input documents, {invalid} invalid")
+    for message, count in messages.most_common(SUMMARY_TOP):
+        logger.info(f"{count:6} x {message}")
+    return not invalid
+
+
+def main() -> None:
+    """Entry point of the input linter."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="input document or directory searched recursively for --pattern",
+    )
+    parser.add_argument(
+        "--pattern",
+        default=DEFAULT_PATTERN,
+        help=f"input document file name pattern (default: {DEFAULT_PATTERN})",
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="results file (default: stdout)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("ER_LINT_MAX_WORKERS", os.cpu_count() or 1)),
+        help="worker processes (default: ER_LINT_MAX_WORKERS or the CPU count)",
+    )
+    args = parser.parse_args()
+    if not run(find_inputs(args.paths, args.pattern), args.output, args.workers):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""CloudWatch alarms and dashboard of a replication group.
+
+Elasticache publishes the host and engine metrics per member cluster
+(`CacheClusterId`), so every member gets its own alarms and dashboard lines. The
+member cluster IDs are known before the apply, Elasticache names them after the
+replication group: `<replication_group_id>-<node>` without and
+`<replication_group_id>-<shard>-<node>` with cluster mode. Autoscaling changes
+the members without an apply, so the input model rejects monitoring together
+with autoscaling.
+
+The alarms and the dashboard are built as terraform attributes here, for both
+`ElasticacheStack` and the renderer.
+"""
+
+import json
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .app_interface_input import ElasticacheData
+
+NAMESPACE = "AWS/ElastiCache"
+
+# per threshold of the monitoring block: the metric, its statistic and whether
+# missing data breaches (e.g. there is no replication lag on a primary)
+ALARM_METRICS: dict[str, tuple[str, str, str]] = {
+    "cpu_percent": ("EngineCPUUtilization", "Average", "missing"),
+    "memory_percent": ("DatabaseMemoryUsagePercentage", "Average", "missing"),
+    "evictions": ("Evictions", "Sum", "notBreaching"),
+    "connections": ("CurrConnections", "Maximum", "missing"),
+    "replication_lag_seconds": ("ReplicationLag", "Maximum", "notBreaching"),
+    "network_bandwidth_in_allowance_exceeded": (
+        "NetworkBandwidthInAllowanceExceeded",
+        "Sum",
+        "notBreaching",
+    ),
+    "network_bandwidth_out_allowance_exceeded": (
+        "NetworkBandwidthOutAllowanceExceeded",
+        "Sum",
+        "notBreaching",
+    ),
+    "network_packets_per_second_allowance_exceeded": (
+        "NetworkPacketsPerSecondAllowanceExceeded",
+        "Sum",
+        "notBreaching",
+    ),
+}
+
+
+def member_clusters(data: "ElasticacheData") -> list[str]:
+    """The member cluster IDs of the configured layout."""
+    if data.num_node_groups:
+        return [
+            f"{data.replication_group_id}-{shard:04d}-{node:03d}"
+            for shard in range(1, data.num_node_groups + 1)
+            for node in range(1, (data.replicas_per_node_group or 0) + 2)
+        ]
+    return [
+        f"{data.replication_group_id}-{node:03d}"
+        for node in range(1, (data.number_cache_clusters or 1) + 1)
+    ]
+
+
+def thresholds(data: "ElasticacheData") -> dict[str, float]:
+    """The enabled thresholds of the monitoring block."""
+    assert data.monitoring  # mypy
+    return {
+        name: threshold
+        for name in ALARM_METRICS
+        if (threshold := getattr(data.monitoring, name)) is not None
+    }
+
+
+def alarms(data: "ElasticacheData") -> dict[str, dict[str, Any]]:
+    """The attributes of the aws_cloudwatch_metric_alarm resources, by ID."""
+    assert data.monitoring  # mypy
+    actions = data.monitoring.alarm_actions or (
+        [data.notification_topic_arn] if data.notification_topic_arn else None
+    )
+    return {
+        f"{data.identifier}-{member}-{name}": {
+            "alarm_actions": actions,
+            "alarm_description": f"{metric} of {member} above {threshold}",
+            "alarm_name": f"{member}-{name}",
+            "comparison_operator": "GreaterThanThreshold",
+            "dimensions": {"CacheClusterId": member},
+            "evaluation_periods": data.monitoring.evaluation_periods,
+            "metric_name": metric,
+            "namespace": NAMESPACE,
+            "ok_actions": actions,
+            "period": data.monitoring.period_seconds,
+            "statistic": statistic,
+            "tags": data.tags,
+            "threshold": threshold,
+            "treat_missing_data": treat_missing_data,
+        }
+        for member in member_clusters(data)
+        for name, threshold in thresholds(data).items()
+        for metric, statistic, treat_missing_data in [ALARM_METRICS[name]]
+    }
+
+
+def dashboard_body(data: "ElasticacheData") -> str:
+    """The CloudWatch dashboard with a graph of all members per alarm metric."""
+    assert data.monitoring  # mypy
+    members = member_clusters(data)
+    widgets = []
+    for i, (name, threshold) in enumerate(thresholds(data).items()):
+        metric, statistic, _ = ALARM_METRICS[name]
+        widgets.append({
+            "type": "metric",
+            "x": (i % 2) * 12,
+            "y": (i // 2) * 6,
+            "width": 12,
+            "height": 6,
+            "properties": {
+                "title": metric,
+                "region": data.region,
+                "stat": statistic,
+                "period": data.monitoring.period_seconds,
+                "metrics": [
+                    [NAMESPACE, metric, "CacheClusterId", member] for member in members
+                ],
+                "annotations": {"horizontal": [{"label": "alarm", "value": threshold}]},
+            },
+        })
+    return json.dumps({"widgets": widgets})
@@ -0,0 +1,182 @@
+"""Offline catalog of the Elasticache engine parameters.
+
+A typo or an invalid value in a parameter group otherwise only fails when the
+Elasticache API rejects it during apply. The catalog bundles the parameters of
+each parameter group family, with their allowed values or ranges, whether they
+are modifiable and whether a change requires a reboot, as one compact JSON file
+per family in data/parameters. A family is loaded on first use.
+
+Families which aren't in the catalog are not checked. A catalog may miss valid
+parameters, the bundled ones were compiled from the Elasticache documentation,
+so unknown parameter names are only warned about. Regenerate the catalogs from
+the engine defaults of the AWS API, which also records the date in `generated`:
+
+    python -m er_aws_elasticache.parameter_catalog redis5.0 redis6.x redis7 valkey7 valkey8
+"""
+
+import argparse
+import datetime
+import difflib
+import json
+import re
+from collections.abc import Mapping
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from mypy_boto3_elasticache.client import ElastiCacheClient
+
+CATALOG_DIR = Path(__file__).parent / "data" / "parameters"
+FAMILY_RE = re.compile(r"^[a-z]+[0-9][a-z0-9.]*$")
+# an AllowedValues integer range: 5, 1-75, 20- or -5--1
+RANGE_RE = re.compile(r"^(-?\d+)(?:-(-?\d*))?$")
+
+
+class ParameterSpec(BaseModel):
+    """The allowed values of an engine parameter"""
+
+    type: Literal["string", "integer"]
+    allowed: list[str] | None = None
+    min: int | None = None
+    max: int | None = None
+    modifiable: bool = True
+    change_type: Literal["immediate", "requires-reboot"] = "immediate"
+    default: str | None = None
+
+    def check(self, value: str) -> str | None:
+        """Why the value isn't allowed, if it isn't."""
+        if self.allowed is not None and value not in self.allowed:
+            return f"allowed values are {', '.join(self.allowed)}"
+        if self.type == "integer":
+            try:
+                number = int(value)
+            except ValueError:
+                return "must be an integer"
+            if self.min is not None and number < self.min:
+                return f"must be at least {self.min}"
+            if self.max is not None and number > self.max:
+                return f"must be at most {self.max}"
+        return None
+
+
+class FamilyCatalog(BaseModel):
+    """The parameters of a parameter group family"""
+
+    family: str
+    # the date of the DescribeEngineDefaultParameters the catalog was generated from
+    generated: str | None = None
+    parameters: dict[str, ParameterSpec]
+
+    def unknown(self, name: str) -> str | None:
+        """Why the parameter may be a typo, if it isn't in the catalog."""
+        if name in self.parameters:
+            return None
+        message = f"Unknown parameter {name} for family {self.family}"
+        if matches := difflib.get_close_matches(name, self.parameters, n=1):
+            message += f", did you mean {matches[0]}?"
+        return message
+
+    def check(self, name: str, value: str, apply_method: str | None) -> str | None:
+        """Why the parameter can't be set, if it can't; unknown ones aren't checked."""
+        if not (spec := self.parameters.get(name)):
+            return None
+        if not spec.modifiable:
+            return f"Parameter {name} is not modifiable in family {self.family}"
+        if reason := spec.check(value):
+            return f"Invalid value {value!r} for parameter {name}: {reason}"
+        if spec.change_type == "requires-reboot" and apply_method == "immediate":
+            return f"Parameter {name} requires a reboot, set apply_method to pending-reboot"
+        return None
+
+
+@cache
+def family_catalog(family: str) -> FamilyCatalog | None:
+    """The catalog of a parameter group family, None for an unknown family."""
+    path = CATALOG_DIR / f"{family}.json"
+    if not FAMILY_RE.match(family) or not path.is_file():
+        return None
+    return FamilyCatalog.model_validate_json(path.read_bytes())
+
+
+def spec_from_aws(parameter: Mapping[str, Any]) -> ParameterSpec:
+    """Convert a parameter of DescribeEngineDefaultParameters.
+
+    AllowedValues is a comma separated list of values or, for integers, of
+    ranges like 0,20- or 1-10000; the catalog keeps the lowest and highest bound.
+    """
+    allowed = parameter.get("AllowedValues")
+    spec = ParameterSpec(
+        type="integer" if parameter.get("DataType") == "integer" else "string",
+        modifiable=parameter.get("IsModifiable", True),
+        change_type=parameter.get("ChangeType", "immediate"),
+        default=parameter.get("ParameterValue"),
+    )
+    if not allowed:
+        return spec
+    if spec.type == "string":
+        spec.allowed = allowed.split(",")
+        return spec
+    lows: list[int] = []
+    highs: list[int] = []
+    bounded = True
+    for part in allowed.split(","):
+        if not (match := RANGE_RE.match(part.strip())):
+            continue
+        low, high = match.groups()
+        lows.append(int(low))
+        if high is None:
+            highs.append(int(low))
+        elif high:
+            highs.append(int(high))
+        else:
+            # an open range like 20-
+            bounded = False
+    spec.min = min(lows, default=None)
+    spec.max = max(highs, default=None) if bounded else None
+    return spec
+
+
+def update(family: str, client: "ElastiCacheClient | None" = None) -> Path:
+    """Regenerate the catalog of a family from the engine defaults of the AWS API."""
+    if client is None:
+        import boto3  # noqa: PLC0415
+
+        client = boto3.client("elasticache")
+    paginator = client.get_paginator("describe_engine_default_parameters")
+    parameters: dict[str, ParameterSpec] = {}
+    for page in paginator.paginate(CacheParameterGroupFamily=family):
+        for parameter in page["EngineDefaults"].get("Parameters", []):
+            parameters[parameter["ParameterName"]] = spec_from_aws(parameter)
+    catalog = FamilyCatalog(
+        family=family,
+        generated=datetime.datetime.now(tz=datetime.UTC).date().isoformat(),
+        parameters=dict(sorted(parameters.items())),
+    )
+    path = CATALOG_DIR / f"{family}.json"
+    path.write_text(
+        json.dumps(
+            catalog.model_dump(mode="json", exclude_none=True),
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def main() -> None:
+    """Regenerate the catalog of the given families."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("families", nargs="+", metavar="FAMILY")
+    for family in parser.parse_args().families:
+        print(f"{family}: {update(family)}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Streaming reader for the resource changes of a terraform plan.
+
+A `terraform show -json` plan contains the prior state, the planned values and
+the configuration next to the resource changes, and it grows with the whole
+workspace. `read_resource_changes` streams the plan file and models only the
+resource changes of the requested resource types. All other values are skipped
+without being decoded, so memory and parse time scale with the changes which are
+actually validated.
+"""
+
+import json
+import re
+from collections import defaultdict
+from collections.abc import Collection, Iterable
+from pathlib import Path
+from typing import Any, TextIO
+
+from external_resources_io.terraform import Action, Change, ResourceChange
+
+CHUNK_SIZE = 1 << 16
+
+_DECODER = json.JSONDecoder()
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+# everything but brackets, including complete strings, in a single match
+_NON_BRACKETS = re.compile(r'(?:[^"{}\[\]]+|"(?:[^"\\]|\\.)*")*', re.DOTALL)
+
+
+class PlannedChange(Change):
+    """A change with the attributes which force its replacement"""
+
+    # e.g. [["transit_encryption_enabled"]], unset for all but replaces
+    replace_paths: list[list[str | int]] | None = None
+
+
+class PlannedResourceChange(ResourceChange):
+    """A resource change with the replace_paths of the plan"""
+
+    change: PlannedChange | None = None
+
+
+def unexpected_end() -> ValueError:
+    """The error of a truncated document."""
+    return ValueError("Unexpected end of the JSON document")
+
+
+class JSONStream:
+    """Scans a JSON document read in chunks
+
+    Only the consumed prefix of the buffer is dropped, so a value which spans
+    several chunks is read completely before it is decoded or skipped.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> None:
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        """Read more of the file; returns whether there was more."""
+        # grow the reads with the buffer, a large value is not rescanned too often
+        chunk = self._file.read(max(self._chunk_size, len(self._buffer)))
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """The next non-whitespace character."""
+        while not (match := _NON_WHITESPACE.search(self._buffer, self._pos)):
+            self._pos = len(self._buffer)
+            if not self._fill():
+                raise unexpected_end()
+        self._pos = match.start()
+        return match.group()
+
+    def expect(self, chars: str) -> str:
+        """Consume the next non-whitespace character, one of chars."""
+        if (char := self.peek()) not in chars:
+            raise ValueError(f"Expected one of {chars!r}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def string(self) -> str:
+        """Decode the next string."""
+        self.peek()
+        while not (match := _STRING.match(self._buffer, self._pos)):
+            if not self._fill():
+                raise unexpected_end()
+        self._pos = match.end()
+        return json.loads(match.group())
+
+    def value(self) -> Any:  # noqa: ANN401
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                pass
+            else:
+                # a number could continue in the next chunk
+                if end < len(self._buffer) or not self._fill():
+                    self._pos = end
+                    return value
+                continue
+            if not self._fill():
+                raise unexpected_end()
+
+    def skip(self) -> None:
+        """Skip the next value; objects and arrays are not decoded."""
+        if self.peek() not in "{[":
+            self.value()
+            return
+        depth = 0
+        while True:
+            # only the brackets are looked at one by one
+            if match := _NON_BRACKETS.match(self._buffer, self._pos):
+                self._pos = match.end()
+            # at the end of the buffer or of its last complete string
+            if self._pos == len(self._buffer) or self._buffer[self._pos] == '"':
+                if not self._fill():
+                    raise unexpected_end()
+                continue
+            depth += 1 if self._buffer[self._pos] in "{[" else -1
+            self._pos += 1
+            if depth == 0:
+                return
+
+
+def _read_changes(
+    stream: JSONStream, resource_types: Collection[str]
+) -> list[ResourceChange]:
+    """Read the changes of the given types from the resource_changes array."""
+    changes: list[ResourceChange] = []
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return changes
+    while True:
+        # a single change is small, only the plan as a whole is large
+        change = stream.value()
+        if change.get("type") in resource_types:
+            changes.append(PlannedResourceChange.model_validate(change))
+        if stream.expect(",]") == "]":
+            return changes
+
+
+def read_resource_changes(
+    plan_file: Path, resource_types: Collection[str], chunk_size: int = CHUNK_SIZE
+) -> list[ResourceChange]:
+    """Read the resource changes of the given types from a plan JSON file."""
+    changes: list[ResourceChange] = []
+    with plan_file.open(encoding="utf-8") as f:
+        stream = JSONStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return changes
+        while True:
+            key = stream.string()
+            stream.expect(":")
+            if key == "resource_changes" and stream.peek() == "[":
+                changes += _read_changes(stream, resource_types)
+            else:
+                stream.skip()
+            if stream.expect(",}") == "}":
+                return changes
+
+
+class ResourceChangeIndex:
+    """Resource changes indexed by resource type and action
+
+    The index is built once, the lookups don't scan the plan again. All changes
+    are kept in plan order, too.
+    """
+
+    def __init__(self, changes: Iterable[ResourceChange]) -> None:
+        self.changes = list(changes)
+        self._index: dict[tuple[str, Action], list[ResourceChange]] = defaultdict(list)
+        for change in self.changes:
+            for action in change.change.actions if change.change else []:
+                self._index[change.type, action].append(change)
+
+    def get(self, resource_type: str, action: Action) -> list[ResourceChange]:
+        """The changes of a resource type with the given action."""
+        return self._index.get((resource_type, action), [])
+
+    @classmethod
+    def read(
+        cls, plan_file: Path, resource_types: Collection[str]
+    ) -> "ResourceChangeIndex":
+        """Index the changes of the given types in a plan JSON file."""
+        return cls(read_resource_changes(plan_file, resource_types))
@@ -0,0 +1,541 @@
+"""Pure-Python renderer for the Elasticache stack.
+
+Builds the same Terraform JSON as `ElasticacheStack` with plain dicts, without
+starting the JSII runtime. Keep it in sync with `stack.py`; the parity tests
+compare both engines.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections.abc import Mapping
+from functools import cache
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+from . import monitoring
+from .app_interface_input import (
+    PREDEFINED_METRICS,
+    SCALABLE_DIMENSIONS,
+    SCALED_ATTRIBUTES,
+    ElasticacheData,
+    StackInput,
+)
+
+# cdktf truncates longer logical IDs and appends a hash, see makeUniqueId
+MAX_ID_LEN = 255
+MAX_HUMAN_LEN = 240
+HASH_LEN = 8
+# the cdktf.json next to the package, where the CDKTF app is run from
+CDKTF_JSON = Path(__file__).parent.parent / "cdktf.json"
+
+
+def unique_id(id_: str) -> str:
+    """The logical ID cdktf allocates for a top-level construct of a stack."""
+    if id_ == "Default":
+        # hidden from the logical ID, cdktf can't allocate one either
+        raise ValueError("A top-level construct can't be named Default")
+    logical_id = re.sub(r"[^A-Za-z0-9_-]", "", id_)
+    if len(logical_id) <= MAX_ID_LEN:
+        return logical_id
+    path_hash = hashlib.md5(id_.encode(), usedforsecurity=False).hexdigest()
+    return f"{logical_id[:MAX_HUMAN_LEN]}_{path_hash[:HASH_LEN].upper()}"
+
+
+def cdktf_json() -> Path:
+    """The cdktf.json the provider bindings are generated from."""
+    return Path(os.environ.get("ER_CDKTF_JSON", CDKTF_JSON))
+
+
+def stringify(obj: Any, space: str = "  ", level: int = 0) -> str:  # noqa: ANN401
+    """Serialize like json-stable-stringify, which cdktf uses to write its files."""
+    indent = "\n" + space * level
+    if isinstance(obj, Mapping):
+        items = [
+            f"{indent}{space}{json.dumps(key, ensure_ascii=False)}: {stringify(value, space, level + 1)}"
+            for key, value in sorted(obj.items())
+        ]
+        return "{" + ",".join(items) + indent + "}"
+    if isinstance(obj, list | tuple):
+        items = [f"{indent}{space}{stringify(i, space, level + 1)}" for i in obj]
+        return "[" + ",".join(items) + indent + "]"
+    if isinstance(obj, float) and obj.is_integer():
+        # JavaScript has no separate integer type
+        return str(int(obj))
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def compact(obj: Mapping[str, Any]) -> dict[str, Any]:
+    """Drop the unset attributes like cdktf does."""
+    return {k: v for k, v in obj.items() if v is not None}
+
+
+def required_providers() -> dict[str, dict[str, str]]:
+    """The terraform providers from cdktf.json, which the provider bindings are generated from."""
+    return _required_providers(cdktf_json())
+
+
+@cache
+def _required_providers(path: Path) -> dict[str, dict[str, str]]:
+    providers = {}
+    for provider in json.loads(path.read_text(encoding="utf-8"))["terraformProviders"]:
+        source, constraint = (p.strip() for p in provider.split("@", 1))
+        if not constraint.startswith("="):
+            raise ValueError(f"Provider {provider} must be pinned to a version")
+        providers[source.rsplit("/", 1)[-1]] = {
+            "source": source,
+            "version": constraint.lstrip("= "),
+        }
+    return providers
+
+
+class ElasticacheStackRenderer:
+    """Renders the cdk.tf.json of `ElasticacheStack`"""
+
+    def __init__(self, id_: str, app_interface_input: StackInput) -> None:
+        self.id_ = id_
+        self.clusters = app_interface_input.clusters
+        self.provision = app_interface_input.provision
+        self.doc: dict[str, Any] = {
+            "//": {
+                "metadata": {
+                    "backend": "local",
+                    "stackName": id_,
+                    "version": version("cdktf"),
+                },
+            },
+        }
+        self._init_providers()
+        self._run()
+
+    def _add_resource(
+        self, resource_type: str, id_: str, attributes: Mapping[str, Any]
+    ) -> str:
+        logical_id = unique_id(id_)
+        self.doc.setdefault("resource", {}).setdefault(resource_type, {})[
+            logical_id
+        ] = {
+            "//": {"metadata": {"path": f"{self.id_}/{id_}", "uniqueId": logical_id}},
+            **compact(attributes),
+        }
+        return f"{resource_type}.{logical_id}"
+
+    def _add_output(self, id_: str, value: str | float, *, sensitive: bool) -> None:
+        logical_id = unique_id(id_)
+        self.doc["//"].setdefault("outputs", {}).setdefault(self.id_, {})[id_] = (
+            logical_id
+        )
+        self.doc.setdefault("output", {})[logical_id] = {
+            "sensitive": sensitive,
+            "value": value,
+        }
+
+    def _init_providers(self) -> None:
+        self.doc["//"]["metadata"]["backend"] = "s3"
+        self.doc["terraform"] = {
+            "backend": {
+                "s3": {
+                    "bucket": self.provision.module_provision_data.tf_state_bucket,
+                    "dynamodb_table": self.provision.module_provision_data.tf_state_dynamodb_table,
+                    "encrypt": True,
+                    "key": self.provision.module_provision_data.tf_state_key,
+                    "profile": "external-resources-state",
+                    "region": self.provision.module_provision_data.tf_state_region,
+                }
+            },
+            "required_providers": required_providers(),
+        }
+        self.doc["provider"] = {
+            "aws": [
+                compact({
+                    "default_tags": self.clusters[0].default_tags,
+                    "region": self.clusters[0].region,
+                })
+            ]
+            + [
+                compact({
+                    "alias": region,
+                    "default_tags": self.clusters[0].default_tags,
+                    "region": region,
+                })
+                for region in dict.fromkeys(
+                    r for data in self.clusters for r in data.regions[1:]
+                )
+            ],
+            "random": [{}],
+        }
+
+    def _create_parameter_group(self, data: ElasticacheData) -> str | None:
+        if data.parameter_group:
+            return self._add_resource(
+                "aws_elasticache_parameter_group",
+                data.parameter_group.name,
+                {
+                    "description": data.parameter_group.description,
+                    "family": data.parameter_group.family,
+                    "lifecycle": {"create_before_destroy": True},
+                    "name": data.parameter_group.name,
+                    "parameter": [
+                        {"name": param.name, "value": param.value}
+                        for param in data.parameter_group.parameters
+                    ],
+                    "tags": data.tags,
+                },
+            )
+        return None
+
+    def _create_elasticache(
+        self, data: ElasticacheData, parameter_group: str | None
+    ) -> str:
+        auth_token = None
+        if data.transit_encryption_enabled:
+            password = self._add_resource(
+                "random_password",
+                f"{data.identifier}-password",
+                {
+                    "keepers": {"reset_password": data.reset_password}
+                    if data.reset_password
+                    else None,
+                    "length": 20,
+                    "override_special": "!&#$^<>-",
+                },
+            )
+            auth_token = f"${{{password}.result}}"
+        return self._add_resource(
+            "aws_elasticache_replication_group",
+            data.identifier,
+            {
+                "apply_immediately": data.apply_immediately,
+                "at_rest_encryption_enabled": data.at_rest_encryption_enabled,
+                "auth_token": auth_token,
+                "auto_minor_version_upgrade": str(
+                    data.auto_minor_version_upgrade
+                ).lower(),
+                "automatic_failover_enabled": data.automatic_failover_enabled,
+                "data_tiering_enabled": data.data_tiering_enabled,
+                "depends_on": [parameter_group] if parameter_group else None,
+                "description": data.replication_group_description,
+                "engine": data.engine,
+                "engine_version": data.engine_version,
+                "lifecycle": {
+                    "ignore_changes": [
+                        SCALED_ATTRIBUTES[d] for d in data.autoscaling.targets
+                    ]
+                }
+                if data.autoscaling
+                else None,
+                "log_delivery_configuration": [
+                    {
+                        "destination": ldc.destination,
+                        "destination_type": ldc.destination_type,
+                        "log_format": ldc.log_format,
+                        "log_type": ldc.log_type,
+                    }
+                    for ldc in data.log_delivery_configuration or []
+                ],
+                "maintenance_window": data.maintenance_window,
+                "multi_az_enabled": data.multi_az_enabled,
+                "node_type": data.node_type,
+                "notification_topic_arn": data.notification_topic_arn,
+                "num_cache_clusters": data.number_cache_clusters,
+                "num_node_groups": data.num_node_groups,
+                "parameter_group_name": data.parameter_group_name,
+                "port": data.port,
+                "preferred_cache_cluster_azs": data.availability_zones,
+                "replicas_per_node_group": data.replicas_per_node_group,
+                "replication_group_id": data.replication_group_id,
+                "security_group_ids": data.security_group_ids,
+                "snapshot_retention_limit": data.snapshot_retention_limit,
+                "snapshot_window": data.snapshot_window,
+                "subnet_group_name": data.subnet_group_name,
+                "tags": data.tags,
+                "transit_encryption_enabled": data.transit_encryption_enabled,
+                "transit_encryption_mode": data.transit_encryption_mode,
+            },
+        )
+
+    def _create_autoscaling(self, data: ElasticacheData, elasticache: str) -> None:
+        assert data.autoscaling  # mypy
+        for dimension, target in data.autoscaling.targets.items():
+            scalable_target = self._add_resource(
+                "aws_appautoscaling_target",
+                f"{data.identifier}-{dimension}-target",
+                {
+                    "max_capacity": target.max_capacity,
+                    "min_capacity": target.min_capacity,
+                    "resource_id": f"replication-group/${{{elasticache}.id}}",
+                    "scalable_dimension": SCALABLE_DIMENSIONS[dimension],
+                    "service_namespace": "elasticache",
+                },
+            )
+            self._add_resource(
+                "aws_appautoscaling_policy",
+                f"{data.identifier}-{dimension}-policy",
+                {
+                    "name": f"{data.replication_group_id}-{dimension}-{target.metric}",
+                    "policy_type": "TargetTrackingScaling",
+                    "resource_id": f"${{{scalable_target}.resource_id}}",
+                    "scalable_dimension": f"${{{scalable_target}.scalable_dimension}}",
+                    "service_namespace": f"${{{scalable_target}.service_namespace}}",
+                    "target_tracking_scaling_policy_configuration": compact({
+                        "disable_scale_in": target.disable_scale_in,
+                        "predefined_metric_specification": {
+                            "predefined_metric_type": PREDEFINED_METRICS[
+                                dimension, target.metric
+                            ]
+                        },
+                        "scale_in_cooldown": target.scale_in_cooldown,
+                        "scale_out_cooldown": target.scale_out_cooldown,
+                        "target_value": target.target_value,
+                    }),
+                },
+            )
+
+    def _create_monitoring(self, data: ElasticacheData) -> None:
+        assert data.monitoring  # mypy
+        for id_, attributes in monitoring.alarms(data).items():
+            self._add_resource("aws_cloudwatch_metric_alarm", id_, attributes)
+        if data.monitoring.dashboard:
+            self._add_resource(
+                "aws_cloudwatch_dashboard",
+                f"{data.identifier}-dashboard",
+                {
+                    "dashboard_body": monitoring.dashboard_body(data),
+                    "dashboard_name": data.replication_group_id,
+                },
+            )
+
+    def _create_serverless_cache(self, data: ElasticacheData) -> str:
+        assert data.serverless  # mypy
+        serverless = data.serverless
+        data_storage = compact({
+            "maximum": serverless.max_data_storage_gb,
+            "minimum": serverless.min_data_storage_gb,
+        })
+        ecpu_per_second = compact({
+            "maximum": serverless.max_ecpu_per_second,
+            "minimum": serverless.min_ecpu_per_second,
+        })
+        return self._add_resource(
+            "aws_elasticache_serverless_cache",
+            data.identifier,
+            {
+                "cache_usage_limits": [
+                    compact({
+                        "data_storage": [data_storage | {"unit": "GB"}]
+                        if data_storage
+                        else None,
+                        "ecpu_per_second": [ecpu_per_second]
+                        if ecpu_per_second
+                        else None,
+                    })
+                ],
+                "daily_snapshot_time": serverless.daily_snapshot_time,
+                "description": data.replication_group_description,
+                "engine": data.engine,
+                "kms_key_id": serverless.kms_key_id,
+                "major_engine_version": data.engine_version.split(".")[0],
+                "name": data.replication_group_id,
+                "security_group_ids": data.security_group_ids,
+                "snapshot_arns_to_restore": serverless.snapshot_arns_to_restore,
+                "snapshot_retention_limit": data.snapshot_retention_limit,
+                "subnet_ids": serverless.subnet_ids,
+                "tags": data.tags,
+                "user_group_id": serverless.user_group_id,
+            },
+        )
+
+    def _serverless_outputs(self, data: ElasticacheData, cache: str) -> None:
+        self._add_output(
+            data.output_prefix + "__db_endpoint",
+            f"${{{cache}.endpoint[0].address}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_port",
+            f"${{{cache}.endpoint[0].port}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_reader_endpoint",
+            f"${{{cache}.reader_endpoint[0].address}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_cluster_enabled", value=True, sensitive=False
+        )
+        self._add_output(
+            data.output_prefix + "__db_serverless_cache_arn",
+            f"${{{cache}.arn}}",
+            sensitive=False,
+        )
+
+    def _create_global_datastore(
+        self, data: ElasticacheData, elasticache: str
+    ) -> tuple[str, dict[str, str]]:
+        assert data.global_datastore  # mypy
+        global_group = self._add_resource(
+            "aws_elasticache_global_replication_group",
+            f"{data.identifier}-global",
+            {
+                "global_replication_group_description": data.global_datastore.description,
+                "global_replication_group_id_suffix": data.global_datastore.global_replication_group_id_suffix,
+                "primary_replication_group_id": f"${{{elasticache}.id}}",
+            },
+        )
+        secondaries = {
+            secondary.region: self._add_resource(
+                "aws_elasticache_replication_group",
+                f"{data.identifier}-{secondary.region}",
+                {
+                    "automatic_failover_enabled": data.automatic_failover_enabled,
+                    "description": secondary.replication_group_description,
+                    "global_replication_group_id": f"${{{global_group}.global_replication_group_id}}",
+                    "multi_az_enabled": data.multi_az_enabled,
+                    "num_cache_clusters": secondary.number_cache_clusters,
+                    "provider": f"aws.{secondary.region}",
+                    "replicas_per_node_group": secondary.replicas_per_node_group,
+                    "replication_group_id": secondary.replication_group_id,
+                    "security_group_ids": secondary.security_group_ids,
+                    "subnet_group_name": secondary.subnet_group_name,
+                    "tags": data.tags,
+                },
+            )
+            for secondary in data.global_datastore.secondaries
+        }
+        return global_group, secondaries
+
+    def _global_datastore_outputs(
+        self, data: ElasticacheData, global_group: str, groups: dict[str, str]
+    ) -> None:
+        self._add_output(
+            data.output_prefix + "__db_global_replication_group_id",
+            f"${{{global_group}.global_replication_group_id}}",
+            sensitive=False,
+        )
+        for region, group in groups.items():
+            suffix = region.replace("-", "_")
+            self._add_output(
+                f"{data.output_prefix}__db_endpoint_{suffix}",
+                f"${{{group}.cluster_enabled ? {group}.configuration_endpoint_address : {group}.primary_endpoint_address}}",
+                sensitive=False,
+            )
+            self._add_output(
+                f"{data.output_prefix}__db_reader_endpoint_{suffix}",
+                f"${{{group}.reader_endpoint_address}}",
+                sensitive=False,
+            )
+
+    def _outputs(self, data: ElasticacheData, elasticache: str) -> None:
+        self._add_output(
+            data.output_prefix + "__db_endpoint",
+            f"${{{elasticache}.cluster_enabled ? {elasticache}.configuration_endpoint_address : {elasticache}.primary_endpoint_address}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_port",
+            f"${{{elasticache}.port}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_auth_token",
+            f"${{{elasticache}.auth_token}}",
+            sensitive=True,
+        )
+        self._add_output(
+            data.output_prefix + "__db_reader_endpoint",
+            f"${{{elasticache}.reader_endpoint_address}}",
+            sensitive=False,
+        )
+        self._add_output(
+            data.output_prefix + "__db_member_clusters",
+            f'${{join(",", tolist({elasticache}.member_clusters))}}',
+            sensitive=False,
+        )
+        for attribute in (
+            "cluster_enabled",
+            "num_node_groups",
+            "replicas_per_node_group",
+        ):
+            self._add_output(
+                f"{data.output_prefix}__db_{attribute}",
+                f"${{{elasticache}.{attribute}}}",
+                sensitive=False,
+            )
+        if plan := data.capacity_plan:
+            self._add_output(
+                data.output_prefix + "__capacity_memory_gib",
+                plan.memory_gib,
+                sensitive=False,
+            )
+            self._add_output(
+                data.output_prefix + "__capacity_ops_per_second",
+                plan.ops_per_second,
+                sensitive=False,
+            )
+        if tiered := data.data_tiering_capacity:
+            memory_gib, ssd_gib = tiered
+            self._add_output(
+                data.output_prefix + "__data_tiering_memory_gib",
+                memory_gib,
+                sensitive=False,
+            )
+            self._add_output(
+                data.output_prefix + "__data_tiering_ssd_gib",
+                ssd_gib,
+                sensitive=False,
+            )
+
+    def _run(self) -> None:
+        """Run the stack"""
+        for data in self.clusters:
+            if data.serverless:
+                cache = self._create_serverless_cache(data)
+                self._serverless_outputs(data, cache)
+                continue
+            parameter_group = self._create_parameter_group(data)
+            elasticache = self._create_elasticache(data, parameter_group)
+            self._outputs(data, elasticache)
+            if data.autoscaling:
+                self._create_autoscaling(data, elasticache)
+            if data.monitoring:
+                self._create_monitoring(data)
+            if data.global_datastore:
+                global_group, secondaries = self._create_global_datastore(
+                    data, elasticache
+                )
+                self._global_datastore_outputs(
+                    data, global_group, {data.region: elasticache, **secondaries}
+                )
+
+
+def synth(ai_input: StackInput, id_: str = "CDKTF", outdir: str | None = None) -> None:
+    """Write the stack and the manifest like `App.synth()` does."""
+    out = Path(
+        outdir
+        or os.environ.get("ER_OUTDIR")
+        or os.environ.get("CDKTF_OUTDIR")
+        or "cdktf.out"
+    )
+    stack_dir = Path("stacks") / id_
+    (out / stack_dir).mkdir(parents=True, exist_ok=True)
+    (out / stack_dir / "cdk.tf.json").write_text(
+        stringify(ElasticacheStackRenderer(id_, ai_input).doc), encoding="utf-8"
+    )
+    manifest = {
+        "stacks": {
+            id_: {
+                "annotations": [],
+                "constructPath": id_,
+                "dependencies": [],
+                "name": id_,
+                "stackMetadataPath": str(stack_dir / "metadata.json"),
+                "synthesizedStackPath": str(stack_dir / "cdk.tf.json"),
+                "workingDirectory": str(stack_dir),
+            }
+        },
+        "version": version("cdktf"),
+    }
+    (out / "manifest.json").write_text(stringify(manifest), encoding="utf-8")
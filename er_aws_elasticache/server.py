@@ -0,0 +1,111 @@
+"""Long-running synth server.
+
+Every `python -m er_aws_elasticache` run starts the JSII runtime and loads the
+provider bindings again. The server pays that once and then synthesizes each
+received input document into its own output directory.
+
+Requests are read either from stdin, one JSON object per line:
+
+    {"input": {...app-interface input...}, "outdir": "/path/to/outdir"}
+
+answered with one JSON line each on stdout, or from a spool directory: every
+`<name>.json` input document dropped there is synthesized into `<name>.out/` and
+then renamed to `<name>.json.done` (or `<name>.json.failed`, with the error in
+`<name>.error`). Write the documents atomically, e.g. under another name and
+rename them into the spool directory.
+
+Each document is synthesized like a single run: with the ER_SYNTH_ENGINE engine
+and through the synth cache if ER_SYNTH_CACHE_DIR is set.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, TextIO
+
+from .__main__ import synth_cached, synth_engine
+from .app_interface_input import validate_input
+
+logger = logging.getLogger(__name__)
+
+SPOOL_POLL_INTERVAL = 0.2
+
+
+def synth(raw_input: Mapping[str, Any], outdir: Path) -> None:
+    """Synthesize one input document into outdir."""
+    synth_cached(
+        validate_input(raw_input),
+        synth_engine(),
+        str(outdir),
+    )
+
+
+def serve_stream(requests: TextIO, responses: TextIO) -> None:
+    """Answer the JSON line requests until the end of the stream."""
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            outdir = Path(request["outdir"])
+            synth(request["input"], outdir)
+            response: dict[str, Any] = {"outdir": str(outdir), "ok": True}
+        except Exception as e:  # noqa: BLE001 - reported to the client
+            response = {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+def process_spool(spool_dir: Path) -> int:
+    """Synthesize all pending input documents of the spool directory."""
+    processed = 0
+    for input_file in sorted(spool_dir.glob("*.json")):
+        try:
+            synth(
+                json.loads(input_file.read_text(encoding="utf-8")),
+                input_file.with_suffix(".out"),
+            )
+            input_file.rename(input_file.with_suffix(".json.done"))
+        except Exception as e:
+            logger.exception(f"Synth of {input_file} failed")
+            input_file.with_suffix(".error").write_text(
+                f"{e.__class__.__name__}: {e}\n", encoding="utf-8"
+            )
+            input_file.rename(input_file.with_suffix(".json.failed"))
+        processed += 1
+    return processed
+
+
+def serve_spool(spool_dir: Path, poll_interval: float = SPOOL_POLL_INTERVAL) -> None:
+    """Watch the spool directory forever."""
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Watching {spool_dir} for input documents")
+    while True:
+        if not process_spool(spool_dir):
+            time.sleep(poll_interval)
+
+
+def main() -> None:
+    """Entry point of the synth server."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Synthesize many inputs with one warm JSII runtime"
+    )
+    parser.add_argument(
+        "--spool",
+        type=Path,
+        help="watch this directory for input documents instead of reading stdin",
+    )
+    args = parser.parse_args()
+    if args.spool:
+        serve_spool(args.spool)
+    else:
+        serve_stream(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
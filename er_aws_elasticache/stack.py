@@ -1,3 +1,5 @@
+from typing import TYPE_CHECKING
+
 from cdktf import (
     Fn,
     S3Backend,
@@ -5,30 +7,46 @@ from cdktf import (
     TerraformResourceLifecycle,
     TerraformStack,
 )
-from cdktf_cdktf_provider_aws.elasticache_parameter_group import (
-    ElasticacheParameterGroup,
-    ElasticacheParameterGroupParameter,
-)
-from cdktf_cdktf_provider_aws.elasticache_replication_group import (
-    ElasticacheReplicationGroup,
-    ElasticacheReplicationGroupLogDeliveryConfiguration,
-)
-from cdktf_cdktf_provider_aws.provider import AwsProvider
-from cdktf_cdktf_provider_random.password import Password
-from cdktf_cdktf_provider_random.provider import RandomProvider
 from constructs import Construct
 
-from .app_interface_input import AppInterfaceInput
+from . import monitoring
+from .app_interface_input import (
+    PREDEFINED_METRICS,
+    SCALABLE_DIMENSIONS,
+    SCALED_ATTRIBUTES,
+    ElasticacheData,
+    StackInput,
+)
+
+# The provider bindings are imported where they are used; the generated aws
+# package imports all of its submodules and takes several seconds to load.
+if TYPE_CHECKING:
+    from cdktf_cdktf_provider_aws.elasticache_global_replication_group import (
+        ElasticacheGlobalReplicationGroup,
+    )
+    from cdktf_cdktf_provider_aws.elasticache_parameter_group import (
+        ElasticacheParameterGroup,
+    )
+    from cdktf_cdktf_provider_aws.elasticache_replication_group import (
+        ElasticacheReplicationGroup,
+    )
+    from cdktf_cdktf_provider_aws.elasticache_serverless_cache import (
+        ElasticacheServerlessCache,
+    )
 
 
 class ElasticacheStack(TerraformStack):
-    """AWS Elasticache stack"""
+    """AWS Elasticache stack
+
+    A multi-cluster input creates the resources and outputs of all its clusters
+    in this stack, with one backend and shared providers.
+    """
 
     def __init__(
-        self, scope: Construct, id_: str, app_interface_input: AppInterfaceInput
+        self, scope: Construct, id_: str, app_interface_input: StackInput
     ) -> None:
         super().__init__(scope, id_)
-        self.data = app_interface_input.data
+        self.clusters = app_interface_input.clusters
         self.provision = app_interface_input.provision
         self._init_providers()
         self._run()
@@ -43,63 +61,98 @@ class ElasticacheStack(TerraformStack):
             dynamodb_table=self.provision.module_provision_data.tf_state_dynamodb_table,
             profile="external-resources-state",
         )
+        from cdktf_cdktf_provider_aws.provider import AwsProvider  # noqa: PLC0415
+        from cdktf_cdktf_provider_random.provider import (  # noqa: PLC0415
+            RandomProvider,
+        )
+
+        # the clusters share the region and the default tags
+        region = self.clusters[0].region
         AwsProvider(
             self,
-            f"aws.{self.data.region}",
-            region=self.data.region,
-            default_tags=self.data.default_tags,
+            f"aws.{region}",
+            region=region,
+            default_tags=self.clusters[0].default_tags,
         )
+        # an aliased provider per region of the global datastore secondaries
+        self.providers: dict[str, AwsProvider] = {
+            secondary_region: AwsProvider(
+                self,
+                f"aws.{secondary_region}",
+                alias=secondary_region,
+                region=secondary_region,
+                default_tags=self.clusters[0].default_tags,
+            )
+            for secondary_region in dict.fromkeys(
+                r for data in self.clusters for r in data.regions[1:]
+            )
+        }
         RandomProvider(self, "Random")
 
-    def _create_parameter_group(self) -> ElasticacheParameterGroup | None:
-        if self.data.parameter_group:
+    def _create_parameter_group(
+        self, data: ElasticacheData
+    ) -> "ElasticacheParameterGroup | None":
+        if data.parameter_group:
+            from cdktf_cdktf_provider_aws.elasticache_parameter_group import (  # noqa: PLC0415
+                ElasticacheParameterGroup,
+                ElasticacheParameterGroupParameter,
+            )
+
             return ElasticacheParameterGroup(
                 self,
-                self.data.parameter_group.name,
-                family=self.data.parameter_group.family,
-                name=self.data.parameter_group.name,
-                description=self.data.parameter_group.description,
+                data.parameter_group.name,
+                family=data.parameter_group.family,
+                name=data.parameter_group.name,
+                description=data.parameter_group.description,
                 parameter=[
                     ElasticacheParameterGroupParameter(
                         name=param.name,
                         value=param.value,
                     )
-                    for param in self.data.parameter_group.parameters
+                    for param in data.parameter_group.parameters
                 ],
-                tags=self.data.tags,
+                tags=data.tags,
                 lifecycle=TerraformResourceLifecycle(create_before_destroy=True),
             )
         return None
 
     def _create_elasticache(
-        self, parameter_group: ElasticacheParameterGroup | None
-    ) -> ElasticacheReplicationGroup:
+        self,
+        data: ElasticacheData,
+        parameter_group: "ElasticacheParameterGroup | None",
+    ) -> "ElasticacheReplicationGroup":
+        from cdktf_cdktf_provider_aws.elasticache_replication_group import (  # noqa: PLC0415
+            ElasticacheReplicationGroup,
+            ElasticacheReplicationGroupLogDeliveryConfiguration,
+        )
+
         auth_token = None
-        if self.data.transit_encryption_enabled:
+        if data.transit_encryption_enabled:
+            from cdktf_cdktf_provider_random.password import Password  # noqa: PLC0415
+
             auth_token = Password(
                 self,
-                id=f"{self.data.identifier}-password",
+                id=f"{data.identifier}-password",
                 length=20,
                 # https://docs.aws.amazon.com/AmazonElastiCache/latest/dg/auth.html
                 override_special="!&#$^<>-",
-                keepers={"reset_password": self.data.reset_password}
-                if self.data.reset_password
+                keepers={"reset_password": data.reset_password}
+                if data.reset_password
                 else None,
             ).result
         return ElasticacheReplicationGroup(
             self,
-            self.data.identifier,
-            apply_immediately=self.data.apply_immediately,
-            at_rest_encryption_enabled=self.data.at_rest_encryption_enabled,
+            data.identifier,
+            apply_immediately=data.apply_immediately,
+            at_rest_encryption_enabled=data.at_rest_encryption_enabled,
             # no idea why this is a string
-            auto_minor_version_upgrade=str(
-                self.data.auto_minor_version_upgrade
-            ).lower(),
-            automatic_failover_enabled=self.data.automatic_failover_enabled,
+            auto_minor_version_upgrade=str(data.auto_minor_version_upgrade).lower(),
+            automatic_failover_enabled=data.automatic_failover_enabled,
             auth_token=auth_token,
-            description=self.data.replication_group_description,
-            engine=self.data.engine,
-            engine_version=self.data.engine_version,
+            data_tiering_enabled=data.data_tiering_enabled,
+            description=data.replication_group_description,
+            engine=data.engine,
+            engine_version=data.engine_version,
             log_delivery_configuration=[
                 ElasticacheReplicationGroupLogDeliveryConfiguration(
                     destination=ldc.destination,
@@ -107,33 +160,263 @@ class ElasticacheStack(TerraformStack):
                     log_format=ldc.log_format,
                     log_type=ldc.log_type,
                 )
-                for ldc in self.data.log_delivery_configuration or []
+                for ldc in data.log_delivery_configuration or []
             ],
-            maintenance_window=self.data.maintenance_window,
-            multi_az_enabled=self.data.multi_az_enabled,
-            node_type=self.data.node_type,
-            notification_topic_arn=self.data.notification_topic_arn,
-            num_cache_clusters=self.data.number_cache_clusters,
-            num_node_groups=self.data.num_node_groups,
-            parameter_group_name=self.data.parameter_group_name,
-            port=self.data.port,
-            preferred_cache_cluster_azs=self.data.availability_zones,
-            replicas_per_node_group=self.data.replicas_per_node_group,
-            replication_group_id=self.data.replication_group_id,
-            security_group_ids=self.data.security_group_ids,
-            snapshot_retention_limit=self.data.snapshot_retention_limit,
-            snapshot_window=self.data.snapshot_window,
-            subnet_group_name=self.data.subnet_group_name,
-            transit_encryption_enabled=self.data.transit_encryption_enabled,
-            transit_encryption_mode=self.data.transit_encryption_mode,
-            tags=self.data.tags,
+            maintenance_window=data.maintenance_window,
+            multi_az_enabled=data.multi_az_enabled,
+            node_type=data.node_type,
+            notification_topic_arn=data.notification_topic_arn,
+            num_cache_clusters=data.number_cache_clusters,
+            num_node_groups=data.num_node_groups,
+            parameter_group_name=data.parameter_group_name,
+            port=data.port,
+            preferred_cache_cluster_azs=data.availability_zones,
+            replicas_per_node_group=data.replicas_per_node_group,
+            replication_group_id=data.replication_group_id,
+            security_group_ids=data.security_group_ids,
+            snapshot_retention_limit=data.snapshot_retention_limit,
+            snapshot_window=data.snapshot_window,
+            subnet_group_name=data.subnet_group_name,
+            transit_encryption_enabled=data.transit_encryption_enabled,
+            transit_encryption_mode=data.transit_encryption_mode,
+            tags=data.tags,
             depends_on=[parameter_group] if parameter_group else None,
+            # don't revert the shards and replicas of the scaler
+            lifecycle=TerraformResourceLifecycle(
+                ignore_changes=[SCALED_ATTRIBUTES[d] for d in data.autoscaling.targets]
+            )
+            if data.autoscaling
+            else None,
+        )
+
+    def _create_autoscaling(
+        self, data: ElasticacheData, elasticache: "ElasticacheReplicationGroup"
+    ) -> None:
+        from cdktf_cdktf_provider_aws.appautoscaling_policy import (  # noqa: PLC0415
+            AppautoscalingPolicy,
+            AppautoscalingPolicyTargetTrackingScalingPolicyConfiguration,
+            AppautoscalingPolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecification,
+        )
+        from cdktf_cdktf_provider_aws.appautoscaling_target import (  # noqa: PLC0415
+            AppautoscalingTarget,
+        )
+
+        assert data.autoscaling  # mypy
+        for dimension, target in data.autoscaling.targets.items():
+            scalable_target = AppautoscalingTarget(
+                self,
+                f"{data.identifier}-{dimension}-target",
+                service_namespace="elasticache",
+                resource_id=f"replication-group/{elasticache.id}",
+                scalable_dimension=SCALABLE_DIMENSIONS[dimension],
+                min_capacity=target.min_capacity,
+                max_capacity=target.max_capacity,
+            )
+            AppautoscalingPolicy(
+                self,
+                f"{data.identifier}-{dimension}-policy",
+                name=f"{data.replication_group_id}-{dimension}-{target.metric}",
+                policy_type="TargetTrackingScaling",
+                service_namespace=scalable_target.service_namespace,
+                resource_id=scalable_target.resource_id,
+                scalable_dimension=scalable_target.scalable_dimension,
+                target_tracking_scaling_policy_configuration=AppautoscalingPolicyTargetTrackingScalingPolicyConfiguration(
+                    target_value=target.target_value,
+                    predefined_metric_specification=AppautoscalingPolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecification(
+                        predefined_metric_type=PREDEFINED_METRICS[
+                            dimension, target.metric
+                        ]
+                    ),
+                    scale_in_cooldown=target.scale_in_cooldown,
+                    scale_out_cooldown=target.scale_out_cooldown,
+                    disable_scale_in=target.disable_scale_in,
+                ),
+            )
+
+    def _create_monitoring(self, data: ElasticacheData) -> None:
+        from cdktf_cdktf_provider_aws.cloudwatch_dashboard import (  # noqa: PLC0415
+            CloudwatchDashboard,
+        )
+        from cdktf_cdktf_provider_aws.cloudwatch_metric_alarm import (  # noqa: PLC0415
+            CloudwatchMetricAlarm,
+        )
+
+        assert data.monitoring  # mypy
+        for id_, attributes in monitoring.alarms(data).items():
+            CloudwatchMetricAlarm(self, id_, **attributes)
+        if data.monitoring.dashboard:
+            CloudwatchDashboard(
+                self,
+                f"{data.identifier}-dashboard",
+                dashboard_name=data.replication_group_id,
+                dashboard_body=monitoring.dashboard_body(data),
+            )
+
+    def _create_serverless_cache(
+        self, data: ElasticacheData
+    ) -> "ElasticacheServerlessCache":
+        from cdktf_cdktf_provider_aws.elasticache_serverless_cache import (  # noqa: PLC0415
+            ElasticacheServerlessCache,
+            ElasticacheServerlessCacheCacheUsageLimits,
+            ElasticacheServerlessCacheCacheUsageLimitsDataStorage,
+            ElasticacheServerlessCacheCacheUsageLimitsEcpuPerSecond,
+        )
+
+        assert data.serverless  # mypy
+        serverless = data.serverless
+        return ElasticacheServerlessCache(
+            self,
+            data.identifier,
+            name=data.replication_group_id,
+            description=data.replication_group_description,
+            engine=data.engine,
+            major_engine_version=data.engine_version.split(".")[0],
+            cache_usage_limits=[
+                ElasticacheServerlessCacheCacheUsageLimits(
+                    data_storage=[
+                        ElasticacheServerlessCacheCacheUsageLimitsDataStorage(
+                            maximum=serverless.max_data_storage_gb,
+                            minimum=serverless.min_data_storage_gb,
+                            unit="GB",
+                        )
+                    ]
+                    if serverless.max_data_storage_gb or serverless.min_data_storage_gb
+                    else None,
+                    ecpu_per_second=[
+                        ElasticacheServerlessCacheCacheUsageLimitsEcpuPerSecond(
+                            maximum=serverless.max_ecpu_per_second,
+                            minimum=serverless.min_ecpu_per_second,
+                        )
+                    ]
+                    if serverless.max_ecpu_per_second or serverless.min_ecpu_per_second
+                    else None,
+                )
+            ],
+            daily_snapshot_time=serverless.daily_snapshot_time,
+            kms_key_id=serverless.kms_key_id,
+            security_group_ids=data.security_group_ids,
+            snapshot_arns_to_restore=serverless.snapshot_arns_to_restore,
+            snapshot_retention_limit=data.snapshot_retention_limit,
+            subnet_ids=serverless.subnet_ids,
+            user_group_id=serverless.user_group_id,
+            tags=data.tags,
+        )
+
+    def _serverless_outputs(
+        self, data: ElasticacheData, cache: "ElasticacheServerlessCache"
+    ) -> None:
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_endpoint",
+            value=cache.endpoint.get(0).address,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_port",
+            value=cache.endpoint.get(0).port,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_reader_endpoint",
+            value=cache.reader_endpoint.get(0).address,
+            sensitive=False,
+        )
+        # the clients of a serverless cache connect in cluster mode
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_cluster_enabled",
+            value=True,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_serverless_cache_arn",
+            value=cache.arn,
+            sensitive=False,
+        )
+
+    def _create_global_datastore(
+        self, data: ElasticacheData, elasticache: "ElasticacheReplicationGroup"
+    ) -> tuple[
+        "ElasticacheGlobalReplicationGroup", dict[str, "ElasticacheReplicationGroup"]
+    ]:
+        from cdktf_cdktf_provider_aws.elasticache_global_replication_group import (  # noqa: PLC0415
+            ElasticacheGlobalReplicationGroup,
+        )
+        from cdktf_cdktf_provider_aws.elasticache_replication_group import (  # noqa: PLC0415
+            ElasticacheReplicationGroup,
+        )
+
+        assert data.global_datastore  # mypy
+        global_group = ElasticacheGlobalReplicationGroup(
+            self,
+            f"{data.identifier}-global",
+            global_replication_group_id_suffix=data.global_datastore.global_replication_group_id_suffix,
+            global_replication_group_description=data.global_datastore.description,
+            primary_replication_group_id=elasticache.id,
+        )
+        # the engine, node type, parameter group, encryption and shards are
+        # inherited from the primary replication group
+        secondaries = {
+            secondary.region: ElasticacheReplicationGroup(
+                self,
+                f"{data.identifier}-{secondary.region}",
+                provider=self.providers[secondary.region],
+                global_replication_group_id=global_group.global_replication_group_id,
+                automatic_failover_enabled=data.automatic_failover_enabled,
+                description=secondary.replication_group_description,
+                multi_az_enabled=data.multi_az_enabled,
+                num_cache_clusters=secondary.number_cache_clusters,
+                replicas_per_node_group=secondary.replicas_per_node_group,
+                replication_group_id=secondary.replication_group_id,
+                security_group_ids=secondary.security_group_ids,
+                subnet_group_name=secondary.subnet_group_name,
+                tags=data.tags,
+            )
+            for secondary in data.global_datastore.secondaries
+        }
+        return global_group, secondaries
+
+    def _global_datastore_outputs(
+        self,
+        data: ElasticacheData,
+        global_group: "ElasticacheGlobalReplicationGroup",
+        groups: dict[str, "ElasticacheReplicationGroup"],
+    ) -> None:
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_global_replication_group_id",
+            value=global_group.global_replication_group_id,
+            sensitive=False,
         )
+        # serve the reads from the replication group in the region of the client
+        for region, group in groups.items():
+            suffix = region.replace("-", "_")
+            TerraformOutput(
+                self,
+                f"{data.output_prefix}__db_endpoint_{suffix}",
+                value=Fn.conditional(
+                    group.cluster_enabled,
+                    group.configuration_endpoint_address,
+                    group.primary_endpoint_address,
+                ),
+                sensitive=False,
+            )
+            TerraformOutput(
+                self,
+                f"{data.output_prefix}__db_reader_endpoint_{suffix}",
+                value=group.reader_endpoint_address,
+                sensitive=False,
+            )
 
-    def _outputs(self, elasticache: ElasticacheReplicationGroup) -> None:
+    def _outputs(
+        self, data: ElasticacheData, elasticache: "ElasticacheReplicationGroup"
+    ) -> None:
         TerraformOutput(
             self,
-            self.data.output_prefix + "__db_endpoint",
+            data.output_prefix + "__db_endpoint",
             value=Fn.conditional(
                 elasticache.cluster_enabled,
                 elasticache.configuration_endpoint_address,
@@ -144,20 +427,96 @@ class ElasticacheStack(TerraformStack):
 
         TerraformOutput(
             self,
-            self.data.output_prefix + "__db_port",
+            data.output_prefix + "__db_port",
             value=elasticache.port,
             sensitive=False,
         )
 
         TerraformOutput(
             self,
-            self.data.output_prefix + "__db_auth_token",
+            data.output_prefix + "__db_auth_token",
             value=elasticache.auth_token,
             sensitive=True,
         )
 
+        # read scaling and the topology for pre-warming the connections
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_reader_endpoint",
+            value=elasticache.reader_endpoint_address,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_member_clusters",
+            value=Fn.join(",", elasticache.member_clusters),
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_cluster_enabled",
+            value=elasticache.cluster_enabled,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_num_node_groups",
+            value=elasticache.num_node_groups,
+            sensitive=False,
+        )
+        TerraformOutput(
+            self,
+            data.output_prefix + "__db_replicas_per_node_group",
+            value=elasticache.replicas_per_node_group,
+            sensitive=False,
+        )
+
+        if plan := data.capacity_plan:
+            TerraformOutput(
+                self,
+                data.output_prefix + "__capacity_memory_gib",
+                value=plan.memory_gib,
+                sensitive=False,
+            )
+            TerraformOutput(
+                self,
+                data.output_prefix + "__capacity_ops_per_second",
+                value=plan.ops_per_second,
+                sensitive=False,
+            )
+        if tiered := data.data_tiering_capacity:
+            memory_gib, ssd_gib = tiered
+            TerraformOutput(
+                self,
+                data.output_prefix + "__data_tiering_memory_gib",
+                value=memory_gib,
+                sensitive=False,
+            )
+            TerraformOutput(
+                self,
+                data.output_prefix + "__data_tiering_ssd_gib",
+                value=ssd_gib,
+                sensitive=False,
+            )
+
     def _run(self) -> None:
         """Run the stack"""
-        parameter_group = self._create_parameter_group()
-        elasticache = self._create_elasticache(parameter_group)
-        self._outputs(elasticache)
+        for data in self.clusters:
+            if data.serverless:
+                cache = self._create_serverless_cache(data)
+                self._serverless_outputs(data, cache)
+                continue
+            parameter_group = self._create_parameter_group(data)
+            elasticache = self._create_elasticache(data, parameter_group)
+            self._outputs(data, elasticache)
+            if data.autoscaling:
+                self._create_autoscaling(data, elasticache)
+            if data.monitoring:
+                self._create_monitoring(data)
+            if data.global_datastore:
+                global_group, secondaries = self._create_global_datastore(
+                    data, elasticache
+                )
+                self._global_datastore_outputs(
+                    data, global_group, {data.region: elasticache, **secondaries}
+                )
@@ -0,0 +1,150 @@
+"""Content-addressed cache of synthesized output directories.
+
+The cache key is a hash of everything the synthesized stack depends on: the
+canonicalized input, the module version, sources and catalogs, the provider versions from
+cdktf.json, and the synth engine. An unchanged input is restored from the cache
+instead of being synthesized again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from .app_interface_input import StackInput
+from .renderer import cdktf_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100
+# the synthesized stack depends on the sources and the data/ catalogs
+PACKAGE = Path(__file__).parent
+
+
+def module_version() -> str:
+    """The installed version of this module."""
+    try:
+        return version("er-aws-elasticache")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def sources_digest() -> str:
+    """Hash of the module sources and catalogs, the version isn't bumped for every change."""
+    digest = hashlib.sha256()
+    for source in sorted(PACKAGE.rglob("*")):
+        if not source.is_file() or "__pycache__" in source.parts:
+            continue
+        digest.update(source.relative_to(PACKAGE).as_posix().encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def provider_versions() -> list[str]:
+    """The terraform providers the bindings are generated from."""
+    if not (path := cdktf_json()).exists():
+        return []
+    return json.loads(path.read_text(encoding="utf-8"))["terraformProviders"]
+
+
+def cache_key(ai_input: StackInput, engine: str) -> str:
+    """The content address of the synthesized output of an input."""
+    canonical = json.dumps(
+        {
+            "engine": engine,
+            "input": ai_input.model_dump(mode="json"),
+            "module_version": module_version(),
+            "providers": provider_versions(),
+            "sources": sources_digest(),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SynthCache:
+    """Bounded LRU cache of output directories
+
+    Entries are written to a temporary directory and renamed into place, so
+    concurrent runs never see partial entries. A hit refreshes the entry's
+    modification time, and the least recently used entries are evicted once there
+    are more than max_entries.
+    """
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def restore(self, key: str, outdir: Path) -> bool:
+        """Copy a cached entry into outdir; returns whether there was one.
+
+        The stacks directory and the other top-level entries of a previous synth
+        in outdir are replaced, not merged with the cached ones.
+        """
+        entry = self.path / key
+        try:
+            names = [e.name for e in entry.iterdir()]
+        except FileNotFoundError:
+            logger.info(f"Synth cache miss: {key}")
+            return False
+        for name in names:
+            if (target := outdir / name).is_dir():
+                shutil.rmtree(target)
+            else:
+                target.unlink(missing_ok=True)
+        try:
+            shutil.copytree(entry, outdir, dirs_exist_ok=True)
+        except FileNotFoundError:
+            # evicted by a concurrent run
+            logger.info(f"Synth cache miss: {key}")
+            return False
+        os.utime(entry)
+        logger.info(f"Synth cache hit: {key}")
+        return True
+
+    def store(self, key: str, outdir: Path) -> None:
+        """Add the synthesized outdir to the cache."""
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.path))
+        shutil.copytree(outdir, tmp, dirs_exist_ok=True)
+        try:
+            tmp.rename(self.path / key)
+        except OSError:
+            # another run stored the same entry in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries."""
+
+        def last_used(entry: Path) -> float:
+            try:
+                return entry.stat().st_mtime
+            except FileNotFoundError:
+                # evicted by a concurrent run
+                return 0
+
+        entries = sorted(
+            (e for e in self.path.iterdir() if not e.name.startswith(".tmp-")),
+            key=last_used,
+            reverse=True,
+        )
+        for entry in entries[self.max_entries :]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+    @classmethod
+    def from_env(cls) -> "SynthCache | None":
+        """The cache configured by the ER_SYNTH_CACHE_* environment variables."""
+        if not (cache_dir := os.environ.get("ER_SYNTH_CACHE_DIR")):
+            return None
+        return cls(
+            Path(cache_dir),
+            max_entries=int(
+                os.environ.get("ER_SYNTH_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+            ),
+        )
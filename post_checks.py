@@ -1,21 +1,64 @@
 import json
 import logging
 import sys
+from collections import defaultdict
 from collections.abc import Mapping
+from itertools import starmap
 from pathlib import Path
+from typing import Any
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REQUIRED_OUTPUTS = (
+    "db_endpoint",
+    "db_port",
+    "db_reader_endpoint",
+    "db_member_clusters",
+    "db_cluster_enabled",
+)
+# serverless caches have no member clusters
+SERVERLESS_REQUIRED_OUTPUTS = ("db_endpoint", "db_port", "db_reader_endpoint")
+
+
+def check_cluster(prefix: str, outputs: Mapping[str, Any]) -> bool:
+    """Check the outputs of one cluster, by name without the output prefix."""
+    serverless = "db_serverless_cache_arn" in outputs
+    required = SERVERLESS_REQUIRED_OUTPUTS if serverless else REQUIRED_OUTPUTS
+    if missing := [name for name in required if name not in outputs]:
+        logger.error(f"{prefix}: outputs {', '.join(missing)} not found.")
+        return False
+    if serverless:
+        if not outputs["db_endpoint"] or not outputs["db_reader_endpoint"]:
+            logger.error(f"{prefix}: serverless cache endpoint is empty.")
+            return False
+        return True
+    ok = True
+    if not outputs["db_endpoint"]:
+        logger.error(f"{prefix}: endpoint is empty.")
+        ok = False
+    if not outputs["db_member_clusters"]:
+        logger.error(f"{prefix}: no member clusters.")
+        ok = False
+    # only cluster-mode disabled groups have a reader endpoint
+    if not outputs["db_cluster_enabled"] and not outputs["db_reader_endpoint"]:
+        logger.error(f"{prefix}: reader endpoint is empty.")
+        ok = False
+    return ok
+
 
 def check(outputs: Mapping) -> bool:
     """Check function."""
-    for key in outputs:
-        if key.endswith("__db_port"):
-            # port output found
-            return True
-    logger.error("Port output not found.")
-    return False
+    clusters: dict[str, dict[str, Any]] = defaultdict(dict)
+    for key, output in outputs.items():
+        prefix, _, name = key.rpartition("__")
+        clusters[prefix][name] = output.get("value")
+    clusters = {p: o for p, o in clusters.items() if "db_port" in o}
+    if not clusters:
+        logger.error("Port output not found.")
+        return False
+    # check every cluster, to report all problems
+    return all(list(starmap(check_cluster, clusters.items())))
 
 
 def main() -> None:
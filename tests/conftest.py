@@ -1,3 +1,5 @@
+import copy
+
 import pytest
 from cdktf import Testing
 from external_resources_io.input import parse_model
@@ -70,3 +72,20 @@ def raw_input_data() -> dict:
 def ai_input(raw_input_data: dict) -> AppInterfaceInput:
     """Fixture to provide the AppInterfaceInput."""
     return parse_model(AppInterfaceInput, raw_input_data)
+
+
+@pytest.fixture
+def raw_multi_cluster_input_data(raw_input_data: dict) -> dict:
+    """Fixture to provide a multi-cluster input with two shards of raw_input_data."""
+    shards = []
+    for shard in range(2):
+        data = copy.deepcopy(raw_input_data["data"])
+        data |= {
+            "identifier": f"example-elasticache-{shard}",
+            "replication_group_id": f"elasticache-example-0{shard}",
+            "output_prefix": f"example-elasticache-{shard}-elasticache",
+            "parameter_group_name": f"elasticache-example-0{shard}-pg",
+        }
+        data["parameter_group"]["name"] = data["parameter_group_name"]
+        shards.append(data)
+    return {"data": shards, "provision": raw_input_data["provision"]}
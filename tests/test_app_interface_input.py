@@ -0,0 +1,253 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from er_aws_elasticache.app_interface_input import (
+    AppInterfaceInput,
+    MultiClusterInput,
+    parse_input,
+)
+
+
+def test_parse_input(raw_input_data: dict, raw_multi_cluster_input_data: dict) -> None:
+    """Test a list of clusters is parsed as a multi-cluster input."""
+    assert isinstance(parse_input(json.dumps(raw_input_data)), AppInterfaceInput)
+    multi = parse_input(json.dumps(raw_multi_cluster_input_data))
+    assert isinstance(multi, MultiClusterInput)
+    assert [c.identifier for c in multi.clusters] == [
+        "example-elasticache-0",
+        "example-elasticache-1",
+    ]
+
+
+def test_parse_input_error_locations(raw_multi_cluster_input_data: dict) -> None:
+    """Test the errors point into the document, not at the input kind."""
+    raw_multi_cluster_input_data["data"][1]["number_cache_clusters"] = 1
+    with pytest.raises(ValidationError) as e:
+        parse_input(json.dumps(raw_multi_cluster_input_data))
+    assert e.value.title == "MultiClusterInput"
+    assert [error["loc"] for error in e.value.errors()] == [("data", 1)]
+
+
+def test_parse_input_invalid_json() -> None:
+    """Test an invalid JSON document is a validation error."""
+    with pytest.raises(ValidationError, match="Invalid JSON"):
+        parse_input("{")
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        ({"region": "eu-west-1"}, "same region"),
+        ({"default_tags": None}, "same default_tags"),
+        ({"identifier": "example-elasticache-0"}, "Duplicate resource IDs"),
+        ({"identifier": "elasticache-example-00-pg"}, "Duplicate resource IDs"),
+        (
+            {"replication_group_id": "elasticache-example-00"},
+            "Duplicate replication_group_id",
+        ),
+        (
+            {"output_prefix": "example-elasticache-0-elasticache"},
+            "Duplicate output_prefix",
+        ),
+    ],
+)
+def test_multi_cluster_input_conflicts(
+    raw_multi_cluster_input_data: dict, data: dict, error: str
+) -> None:
+    """Test the clusters of a stack must share the provider and must not collide."""
+    raw_multi_cluster_input_data["data"][1] |= data
+    with pytest.raises(ValidationError, match=error):
+        MultiClusterInput.model_validate(raw_multi_cluster_input_data)
+
+
+def test_multi_cluster_input_without_clusters(raw_input_data: dict) -> None:
+    """Test a multi-cluster input needs at least one cluster."""
+    with pytest.raises(ValidationError, match="at least 1 item"):
+        parse_input(json.dumps({"data": [], "provision": raw_input_data["provision"]}))
+
+
+@pytest.mark.parametrize(
+    ("data", "secondary", "error"),
+    [
+        ({}, {"region": "us-east-1"}, "distinct regions"),
+        (
+            {},
+            {"replication_group_id": "elasticache-example-01"},
+            "own replication_group_id",
+        ),
+        ({}, {"replicas_per_node_group": 1}, "needs cluster mode"),
+        (
+            {"number_cache_clusters": None, "num_node_groups": 2},
+            {"number_cache_clusters": 2},
+            "not supported in cluster mode",
+        ),
+    ],
+)
+def test_global_datastore_conflicts(
+    raw_input_data: dict, data: dict, secondary: dict, error: str
+) -> None:
+    """Test the secondaries of a global datastore must not collide with the primary."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "secondaries": [
+                {"region": "us-west-2", "replication_group_id": "secondary"} | secondary
+            ],
+        },
+    } | data
+    with pytest.raises(ValidationError, match=error):
+        AppInterfaceInput.model_validate(raw_input_data)
+
+
+def test_global_datastore_secondary_layout(raw_input_data: dict) -> None:
+    """Test the secondaries have the replicas of the primary unless configured."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "secondaries": [
+                {"region": "us-west-2", "replication_group_id": "usw2"},
+                {
+                    "region": "eu-west-1",
+                    "replication_group_id": "euw1",
+                    "replicas_per_node_group": 0,
+                },
+            ],
+        },
+    }
+    data = AppInterfaceInput.model_validate(raw_input_data).data
+    assert data.global_datastore
+    assert [s.replicas_per_node_group for s in data.global_datastore.secondaries] == [
+        data.replicas_per_node_group,
+        0,
+    ]
+    assert data.regions == ["us-east-1", "us-west-2", "eu-west-1"]
+
+
+@pytest.fixture
+def raw_serverless_input_data(raw_input_data: dict) -> dict:
+    """Fixture to provide a serverless cache input."""
+    for attribute in (
+        "node_type",
+        "automatic_failover_enabled",
+        "number_cache_clusters",
+        "parameter_group",
+        "parameter_group_name",
+        "maintenance_window",
+        "snapshot_window",
+        "subnet_group_name",
+    ):
+        raw_input_data["data"].pop(attribute)
+    raw_input_data["data"] |= {
+        "engine_version": "7.1",
+        "serverless": {"max_data_storage_gb": 10, "subnet_ids": ["subnet-1"]},
+    }
+    return raw_input_data
+
+
+def test_serverless_input(raw_serverless_input_data: dict) -> None:
+    """Test a serverless cache has no password resource."""
+    data = AppInterfaceInput.model_validate(raw_serverless_input_data).data
+    assert data.serverless
+    assert data.resource_ids == [data.identifier]
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        ({"node_type": "cache.r6g.large"}, "mutually exclusive"),
+        ({"serverless": None}, "node_type is required"),
+        ({"engine_version": "7.0"}, "not supported for redis 7.0"),
+        (
+            {"number_cache_clusters": 2, "subnet_group_name": "default"},
+            "number_cache_clusters, subnet_group_name not supported",
+        ),
+        ({"transit_encryption_enabled": False}, "always encrypted in transit"),
+        (
+            {"serverless": {"min_ecpu_per_second": 2000, "max_ecpu_per_second": 1000}},
+            r"min_ecpu_per_second \(2000\) must not exceed",
+        ),
+        ({"serverless": {"daily_snapshot_time": "3am"}}, "should match pattern"),
+    ],
+)
+def test_serverless_input_conflicts(
+    raw_serverless_input_data: dict, data: dict, error: str
+) -> None:
+    """Test the serverless mode validators."""
+    raw_serverless_input_data["data"] |= data
+    with pytest.raises(ValidationError, match=error):
+        AppInterfaceInput.model_validate(raw_serverless_input_data)
+
+
+@pytest.mark.parametrize(
+    ("data", "autoscaling", "error"),
+    [
+        (
+            {"num_node_groups": None, "number_cache_clusters": 2},
+            {},
+            "only supported for cluster-mode enabled",
+        ),
+        ({"node_type": "cache.t4g.micro"}, {}, "not supported for cache.t4g.micro"),
+        (
+            {},
+            {
+                "replicas": {
+                    "min_capacity": 1,
+                    "max_capacity": 6,
+                    "metric": "cpu",
+                    "target_value": 60,
+                }
+            },
+            "at most 5 replicas",
+        ),
+        (
+            {"monitoring": {}},
+            {},
+            "not supported together with monitoring",
+        ),
+        (
+            {"num_node_groups": 5},
+            {},
+            r"num_node_groups \(5\) must be within the shards capacity range 1-4",
+        ),
+        (
+            {},
+            {
+                "shards": {
+                    "min_capacity": 3,
+                    "max_capacity": 2,
+                    "metric": "cpu",
+                    "target_value": 60,
+                }
+            },
+            r"min_capacity \(3\) must not exceed max_capacity \(2\)",
+        ),
+    ],
+)
+def test_autoscaling_conflicts(
+    raw_input_data: dict, data: dict, autoscaling: dict, error: str
+) -> None:
+    """Test autoscaling needs cluster mode and a layout within the capacity range."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "autoscaling": {
+            "shards": {
+                "min_capacity": 1,
+                "max_capacity": 4,
+                "metric": "cpu",
+                "target_value": 60,
+            }
+        }
+        | autoscaling,
+    } | data
+    with pytest.raises(ValidationError, match=error):
+        AppInterfaceInput.model_validate(raw_input_data)
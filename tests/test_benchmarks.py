@@ -0,0 +1,42 @@
+from benchmarks.run import INPUTS, compare, run
+
+
+def test_run() -> None:
+    """Test all phases of an input are benchmarked."""
+    results = run({"small": INPUTS["small"]}, repeat=1)
+    assert set(results["benchmarks"]) == {
+        "small/parse",
+        "small/construct",
+        "small/testing-synth",
+        "small/app-synth",
+        "small/python-synth",
+        "small/aws-clients",
+        "small/validate",
+    }
+    assert all(
+        r["median_ms"] >= r["min_ms"] > 0 for r in results["benchmarks"].values()
+    )
+
+
+def test_compare() -> None:
+    """Test only slowdowns above the threshold are regressions."""
+    baseline = {
+        "benchmarks": {
+            "small/parse": {"min_ms": 0.1},
+            "small/construct": {"min_ms": 20.0},
+            "small/validate": {"min_ms": 100.0},
+        }
+    }
+    results = {
+        "benchmarks": {
+            # above the threshold, but within the timer noise
+            "small/parse": {"min_ms": 0.5},
+            "small/construct": {"min_ms": 30.0},
+            "small/validate": {"min_ms": 110.0},
+            # not in the baseline
+            "small/app-synth": {"min_ms": 40.0},
+        }
+    }
+    assert compare(results, baseline, threshold=0.25) == [
+        "small/construct: 30.000 ms, baseline 20.000 ms (+50%)"
+    ]
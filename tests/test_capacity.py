@@ -0,0 +1,191 @@
+import json
+from pathlib import Path
+
+import pytest
+from external_resources_io.input import parse_model
+from pydantic import ValidationError
+
+from er_aws_elasticache.app_interface_input import AppInterfaceInput, Capacity
+from er_aws_elasticache.capacity import (
+    layout,
+    main,
+    node_memory,
+    plan,
+    recommend,
+    shortfalls,
+)
+from er_aws_elasticache.engine_catalog import NodeType, engine_catalog
+
+
+@pytest.fixture
+def node() -> NodeType:
+    """Fixture to provide a node type of the catalog."""
+    node = engine_catalog().node_type("cache.r6g.large")
+    assert node
+    return node
+
+
+def test_plan_memory_bound(node: NodeType) -> None:
+    """Test the dataset is sharded over enough node memory."""
+    capacity = Capacity(
+        dataset_gib=node_memory(node) * 2.5, peak_ops_per_second=0, headroom_percent=0
+    )
+    result = plan(capacity, node)
+    assert (result.shards, result.replicas_per_shard) == (3, 0)
+    assert not shortfalls(capacity, result)
+    assert shortfalls(capacity, layout(node, 2, 5))
+
+
+def test_plan_throughput_bound(node: NodeType) -> None:
+    """Test the writes are spread over the primaries and the reads over all nodes."""
+    capacity = Capacity(
+        dataset_gib=1,
+        peak_ops_per_second=node.ops_per_second * 4,
+        read_ratio=0.75,
+        headroom_percent=0,
+    )
+    result = plan(capacity, node, min_replicas=1)
+    assert (result.shards, result.replicas_per_shard) == (1, 3)
+    assert not shortfalls(capacity, result)
+    assert shortfalls(capacity, layout(node, 1, 2)) == [
+        f"{node.ops_per_second * 3} ops/s < {node.ops_per_second * 4} ops/s"
+    ]
+
+
+def test_recommend() -> None:
+    """Test the recommendations fit the engine version and are ordered by node memory."""
+    capacity = Capacity(dataset_gib=40, peak_ops_per_second=100000)
+    recommendations = recommend(capacity, "redis", "6.x")
+    catalog = engine_catalog()
+    nodes = [catalog.node_type(r.node_type) for r in recommendations]
+    assert all(n and not n.previous_generation for n in nodes)
+    assert all(n and n.min_engine_version.get("redis") != "6.2" for n in nodes)
+    totals = [
+        r.nodes * n.memory_gib for r, n in zip(recommendations, nodes, strict=True) if n
+    ]
+    assert totals == sorted(totals)
+    assert all(not shortfalls(capacity, r) for r in recommendations)
+
+
+def test_input_layout_from_planner(raw_input_data: dict) -> None:
+    """Test the planner chooses the layout if none is configured."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "capacity": {"dataset_gib": 20, "peak_ops_per_second": 300000},
+    }
+    data = parse_model(AppInterfaceInput, raw_input_data).data
+    assert data.capacity
+    assert data.capacity_plan
+    assert data.num_node_groups == data.capacity_plan.shards
+    assert data.replicas_per_node_group == data.capacity_plan.replicas_per_shard
+    assert not shortfalls(data.capacity, data.capacity_plan)
+
+
+def test_input_single_shard_layout_from_planner(raw_input_data: dict) -> None:
+    """Test a plan which fits in one shard uses number_cache_clusters."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "capacity": {"dataset_gib": 1, "peak_ops_per_second": 1000},
+    }
+    data = parse_model(AppInterfaceInput, raw_input_data).data
+    assert data.num_node_groups is None
+    assert data.number_cache_clusters == 2  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("data", "match"),
+    [
+        (
+            {"availability_zones": ["us-east-1a", "us-east-1b"]},
+            "availability_zones and cluster_mode.num_node_groups are mutually exclusive",
+        ),
+        (
+            {"automatic_failover_enabled": False},
+            "Automatic failover must be enabled for cluster mode",
+        ),
+    ],
+)
+def test_input_layout_from_planner_is_validated(
+    raw_input_data: dict, data: dict, match: str
+) -> None:
+    """Test the layout rules apply to the layout chosen by the planner."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.m6g.large",
+        "number_cache_clusters": None,
+        "capacity": {"dataset_gib": 40, "peak_ops_per_second": 500000},
+    } | data
+    with pytest.raises(ValidationError, match=match):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+def test_input_partial_layout_isnt_completed(raw_input_data: dict) -> None:
+    """Test the planner doesn't complete a partially configured layout."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "replicas_per_node_group": 3,
+        "capacity": {"dataset_gib": 1, "peak_ops_per_second": 1000},
+    }
+    with pytest.raises(
+        ValidationError, match="replicas_per_node_group needs cluster_mode"
+    ):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+@pytest.mark.parametrize(
+    ("node_type", "dataset_gib", "max_shards"),
+    [
+        ("cache.t4g.micro", 20, None),
+        ("cache.r6g.large", 200, None),
+        ("cache.r6g.large", 20, 2),
+    ],
+)
+def test_input_layout_from_planner_max_shards(
+    raw_input_data: dict, node_type: str, dataset_gib: int, max_shards: int | None
+) -> None:
+    """Test the planner rejects layouts with too many shards."""
+    capacity: dict = {"dataset_gib": dataset_gib, "peak_ops_per_second": 1000}
+    if max_shards:
+        capacity["max_shards"] = max_shards
+    raw_input_data["data"] |= {
+        "node_type": node_type,
+        "number_cache_clusters": None,
+        "capacity": capacity,
+    }
+    with pytest.raises(
+        ValidationError,
+        match=rf"shards of {node_type}, more than max_shards .* Use a larger node type",
+    ):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+def test_input_layout_too_small(raw_input_data: dict) -> None:
+    """Test a configured layout which doesn't serve the capacity block fails."""
+    raw_input_data["data"] |= {
+        "capacity": {"dataset_gib": 20, "peak_ops_per_second": 1000}
+    }
+    with pytest.raises(ValidationError, match="The planner recommends"):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+def test_main(
+    tmp_path: Path,
+    raw_input_data: dict,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    """Test the recommendations for an input whose layout is too small."""
+    raw_input_data["data"] |= {
+        "capacity": {"dataset_gib": 20, "peak_ops_per_second": 1000}
+    }
+    input_json = tmp_path / "input.json"
+    input_json.write_text(json.dumps(raw_input_data))
+    monkeypatch.setattr("sys.argv", ["capacity", str(input_json), "--top", "2"])
+
+    main()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["identifier"] for line in lines] == ["example-elasticache"] * 2
+    assert all(line["replicas_per_shard"] >= 1 for line in lines)
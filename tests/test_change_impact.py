@@ -0,0 +1,212 @@
+from typing import Any
+
+from er_aws_elasticache.change_impact import (
+    PARAMETER_GROUP,
+    REPLICATION_GROUP,
+    SERVERLESS_CACHE,
+    ChangeAnalyzer,
+    Impact,
+)
+from er_aws_elasticache.plan_reader import PlannedResourceChange
+
+
+def resource_change(
+    type_: str,
+    name: str,
+    actions: list[str],
+    before: dict[str, Any] | None,
+    after: dict[str, Any] | None,
+) -> PlannedResourceChange:
+    """A resource change of a terraform plan."""
+    return PlannedResourceChange.model_validate({
+        "address": f"{type_}.{name}",
+        "type": type_,
+        "name": name,
+        "change": {
+            "actions": actions,
+            "before": before,
+            "after": after,
+            "after_unknown": {},
+        },
+    })
+
+
+def parameter_group(name: str, **parameters: str) -> dict[str, Any]:
+    """The attributes of a redis7 parameter group."""
+    return {
+        "name": name,
+        "family": "redis7",
+        "parameter": [{"name": n, "value": v} for n, v in parameters.items()],
+    }
+
+
+def test_replace_is_destroy() -> None:
+    """Test a replaced replication group loses its data."""
+    impacts = ChangeAnalyzer([
+        resource_change(
+            REPLICATION_GROUP,
+            "rg",
+            ["delete", "create"],
+            {"replication_group_id": "rg", "at_rest_encryption_enabled": False},
+            {"replication_group_id": "rg", "at_rest_encryption_enabled": True},
+        )
+    ]).analyze()
+    assert [(i.resource_id, i.impact) for i in impacts] == [("rg", Impact.DESTROY)]
+    assert "at_rest_encryption_enabled" in impacts[0].reasons[0]
+
+
+def test_replace_paths() -> None:
+    """Test a replace names the attributes which force it, not the whole diff."""
+    change = resource_change(
+        REPLICATION_GROUP,
+        "rg",
+        ["delete", "create"],
+        {"replication_group_id": "rg", "engine": "redis", "arn": "arn"},
+        {"replication_group_id": "rg", "engine": "valkey", "arn": None},
+    )
+    assert change.change
+    change.change.replace_paths = [["engine"]]
+    impacts = ChangeAnalyzer([change]).analyze()
+    assert impacts[0].reasons == [
+        "replaced because of engine, the new cache starts empty"
+    ]
+
+
+def test_creates_are_ignored() -> None:
+    """Test only updates, deletes and replaces are classified."""
+    assert not ChangeAnalyzer([
+        resource_change(REPLICATION_GROUP, "rg", ["create"], None, {"a": 1}),
+        resource_change(PARAMETER_GROUP, "pg", ["no-op"], {"a": 1}, {"a": 1}),
+    ]).analyze()
+
+
+def test_node_type_update_is_online() -> None:
+    """Test vertical scaling is applied online."""
+    impacts = ChangeAnalyzer([
+        resource_change(
+            REPLICATION_GROUP,
+            "rg",
+            ["update"],
+            {"replication_group_id": "rg", "node_type": "cache.r6g.large"},
+            {"replication_group_id": "rg", "node_type": "cache.r6g.xlarge"},
+        )
+    ]).analyze()
+    assert impacts[0].impact == Impact.ONLINE
+    assert impacts[0].reasons == [
+        "node_type cache.r6g.large -> cache.r6g.xlarge: online vertical scaling"
+    ]
+
+
+def test_unknown_attribute_update_may_need_a_reboot() -> None:
+    """Test updates of attributes with an unknown impact aren't allowed as online."""
+    impacts = ChangeAnalyzer([
+        resource_change(
+            REPLICATION_GROUP,
+            "rg",
+            ["update"],
+            {"replication_group_id": "rg", "tags": {}, "port": 6379},
+            {"replication_group_id": "rg", "tags": {"a": "b"}, "port": 6380},
+        )
+    ]).analyze()
+    assert impacts[0].impact == Impact.PENDING_REBOOT
+    assert impacts[0].reasons == [
+        "port 6379 -> 6380: unknown impact, it may need a reboot",
+        "tags {} -> {'a': 'b'}: online update",
+    ]
+
+
+def test_serverless_cache_changes() -> None:
+    """Test a serverless cache replace loses its data, a usage limit update not."""
+    impacts = ChangeAnalyzer([
+        resource_change(
+            SERVERLESS_CACHE,
+            "replaced",
+            ["delete", "create"],
+            {"name": "replaced", "kms_key_id": None},
+            {"name": "replaced", "kms_key_id": "key"},
+        ),
+        resource_change(
+            SERVERLESS_CACHE,
+            "scaled",
+            ["update"],
+            {"name": "scaled", "cache_usage_limits": []},
+            {"name": "scaled", "cache_usage_limits": [{"data_storage": []}]},
+        ),
+    ]).analyze()
+    assert [(i.resource_id, i.impact) for i in impacts] == [
+        ("replaced", Impact.DESTROY),
+        ("scaled", Impact.ONLINE),
+    ]
+    assert impacts[0].reasons == [
+        "replaced because of kms_key_id, the new cache starts empty"
+    ]
+
+
+def test_impacts_in_plan_order() -> None:
+    """Test the impacts are reported in plan order, not grouped by type."""
+    impacts = ChangeAnalyzer([
+        resource_change(PARAMETER_GROUP, "pg", ["delete"], parameter_group("pg"), None),
+        resource_change(
+            REPLICATION_GROUP, "rg", ["delete"], {"replication_group_id": "rg"}, None
+        ),
+        resource_change(
+            PARAMETER_GROUP, "pg2", ["delete"], parameter_group("pg2"), None
+        ),
+    ]).analyze()
+    assert [i.resource_id for i in impacts] == ["pg", "rg", "pg2"]
+
+
+def test_parameter_group_updates() -> None:
+    """Test parameters which need a reboot are told apart from immediate ones."""
+    before = parameter_group("pg", **{"maxmemory-policy": "allkeys-lru"})
+    immediate = ChangeAnalyzer([
+        resource_change(
+            PARAMETER_GROUP,
+            "pg",
+            ["update"],
+            before,
+            parameter_group("pg", **{"maxmemory-policy": "volatile-lru"}),
+        )
+    ]).analyze()
+    assert immediate[0].impact == Impact.ONLINE
+    reboot = ChangeAnalyzer([
+        resource_change(
+            PARAMETER_GROUP,
+            "pg",
+            ["update"],
+            before,
+            parameter_group(
+                "pg", databases="32", **{"maxmemory-policy": "allkeys-lru"}
+            ),
+        )
+    ]).analyze()
+    assert reboot[0].impact == Impact.PENDING_REBOOT
+    assert reboot[0].reasons == ["parameters which apply after a reboot: databases"]
+
+
+def test_parameter_group_switch() -> None:
+    """Test switching the parameter group compares the parameters of both groups."""
+    impacts = ChangeAnalyzer([
+        resource_change(
+            REPLICATION_GROUP,
+            "rg",
+            ["update"],
+            {"replication_group_id": "rg", "parameter_group_name": "old"},
+            {"replication_group_id": "rg", "parameter_group_name": "new"},
+        ),
+        resource_change(
+            PARAMETER_GROUP, "old", ["delete"], parameter_group("old"), None
+        ),
+        resource_change(
+            PARAMETER_GROUP,
+            "new",
+            ["create"],
+            None,
+            parameter_group("new", timeout="60"),
+        ),
+    ]).analyze()
+    assert [(i.resource_id, i.impact) for i in impacts] == [
+        ("rg", Impact.ONLINE),
+        ("old", Impact.ONLINE),
+    ]
+    assert impacts[0].reasons[-1] == "parameters which apply immediately: timeout"
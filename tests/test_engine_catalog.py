@@ -0,0 +1,153 @@
+import pytest
+from external_resources_io.input import parse_model
+from pydantic import ValidationError
+
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.engine_catalog import engine_catalog, version_key
+from er_aws_elasticache.parameter_catalog import family_catalog
+
+
+def test_node_type() -> None:
+    """Test a node type combines its size and family."""
+    catalog = engine_catalog()
+    node = catalog.node_type("cache.r6gd.xlarge")
+    assert node
+    assert node.family == "r6gd"
+    assert node.vcpus == catalog.node_families["r6gd"].sizes["xlarge"].vcpus
+    assert node.graviton
+    assert node.data_tiering
+    assert node.min_engine_version == {"redis": "6.2"}
+
+
+@pytest.mark.parametrize(
+    "name", ["cache.r6g", "cache.r6g.huge", "r6g.large", "cache.x9.large"]
+)
+def test_unknown_node_type(name: str) -> None:
+    """Test malformed and unknown node types."""
+    assert engine_catalog().node_type(name) is None
+
+
+def test_catalogs_are_consistent() -> None:
+    """Test every node type is found and every engine version has a valid family."""
+    catalog = engine_catalog()
+    assert all(catalog.node_type(name) for name in catalog.node_types)
+    for engine, versions in catalog.engines.items():
+        for version in versions.values():
+            assert version.family.startswith(engine)
+    assert family_catalog(catalog.engines["redis"]["6.2"].family)
+
+
+def test_engine_version_patch_versions() -> None:
+    """Test a patch version matches its major.minor version."""
+    catalog = engine_catalog()
+    assert catalog.engine_version("redis", "6.2.6") == catalog.engines["redis"]["6.2"]
+    assert catalog.engine_version("redis", "7.1.0") == catalog.engines["redis"]["7.1"]
+    assert catalog.engine_version("redis", "5.0.6") == catalog.engines["redis"]["5.0.6"]
+    assert catalog.engine_version("redis", "5.0.7") is None
+    assert catalog.engine_version("redis", "6.3.1") is None
+
+
+def test_version_key() -> None:
+    """Test engine versions sort numerically."""
+    assert version_key("5.0.6") < version_key("6.x") < version_key("6.2")
+    assert version_key("6.2") < version_key("7.0") < version_key("7.1")
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        ({"node_type": "cache.r6g.larg"}, "did you mean cache.r6g.large?"),
+        ({"node_type": "cache.m1.small"}, "Node type cache.m1.small is deprecated"),
+        (
+            {"node_type": "cache.t1.micro", "snapshot_retention_limit": 1},
+            "Snapshot retention limit is not supported for cache.t1.micro",
+        ),
+        (
+            {
+                "node_type": "cache.t1.micro",
+                "snapshot_retention_limit": None,
+                "number_cache_clusters": None,
+                "num_node_groups": 2,
+            },
+            "Cluster mode",
+        ),
+        (
+            {
+                "node_type": "cache.r6gd.xlarge",
+                "data_tiering_enabled": True,
+                "engine_version": "6.x",
+            },
+            "Node type cache.r6gd.xlarge needs redis 6.2 or later",
+        ),
+        ({"node_type": "cache.r6gd.xlarge"}, "Data tiering is mandatory"),
+        (
+            {"node_type": "cache.r6g.xlarge", "data_tiering_enabled": True},
+            "Data tiering is not supported for cache.r6g.xlarge",
+        ),
+        (
+            {
+                "global_datastore": {
+                    "global_replication_group_id_suffix": "example",
+                    "secondaries": [
+                        {"region": "us-west-2", "replication_group_id": "b"}
+                    ],
+                }
+            },
+            "Global datastores are not supported for cache.t4g.micro",
+        ),
+        (
+            {
+                "node_type": "cache.m5.large",
+                "engine_version": "5.0.5",
+                "parameter_group": None,
+                "global_datastore": {
+                    "global_replication_group_id_suffix": "example",
+                    "secondaries": [
+                        {"region": "us-west-2", "replication_group_id": "b"}
+                    ],
+                },
+            },
+            "Global datastores are not supported for redis 5.0.5",
+        ),
+        ({"engine": "memcached"}, "Unknown engine memcached"),
+        ({"engine_version": "6.3"}, "Unsupported redis engine version 6.3"),
+        (
+            {"node_type": "cache.m5.large", "engine_version": "4.0.10"},
+            "redis 4.0.10 is deprecated",
+        ),
+        (
+            {"engine_version": "5.0.6", "auto_minor_version_upgrade": True},
+            "Auto minor version upgrade is not supported for redis 5.0.6",
+        ),
+        (
+            {"engine_version": "7.1"},
+            "The parameter group family must be redis7 for redis 7.1",
+        ),
+    ],
+)
+def test_invalid_combinations(raw_input_data: dict, data: dict, error: str) -> None:
+    """Test unsupported node types and engine versions fail when the input is parsed."""
+    raw_input_data["data"] |= data
+    with pytest.raises(ValidationError, match=error):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"node_type": "cache.r6gd.xlarge", "data_tiering_enabled": True},
+        {
+            "node_type": "cache.m5.large",
+            "engine_version": "5.0.6",
+            "parameter_group": None,
+        },
+        {"node_type": "cache.t1.micro", "snapshot_retention_limit": 0},
+        {"engine": "valkey", "engine_version": "8.0", "parameter_group": None},
+        {"engine_version": "6.2.6"},
+        {"engine_version": "7.1.0", "parameter_group": None},
+    ],
+)
+def test_valid_combinations(raw_input_data: dict, data: dict) -> None:
+    """Test supported node types and engine versions."""
+    raw_input_data["data"] |= data
+    parse_model(AppInterfaceInput, raw_input_data)
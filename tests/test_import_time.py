@@ -0,0 +1,72 @@
+import json
+import os
+import re
+import subprocess  # noqa: S404
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+IMPORT_TIME_RE = re.compile(r"import time:\s+\d+ \|\s+\d+ \|\s+(?P<name>.+)")
+
+
+def imported_modules(args: list[str], env: dict[str, str] | None = None) -> set[str]:
+    """Run python -X importtime and return the imported modules.
+
+    The heavy imports are asserted by name, wall-clock budgets depend on the load
+    of the machine.
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env=os.environ | (env or {}),
+    )
+    return {
+        match["name"].strip()
+        for line in result.stderr.splitlines()
+        if (match := IMPORT_TIME_RE.match(line))
+    }
+
+
+def test_validate_plan_without_creates(tmp_path: Path, raw_input_data: dict) -> None:
+    """Test validate_plan.py doesn't load boto3 for a plan without creates."""
+    input_json = tmp_path / "input.json"
+    input_json.write_text(json.dumps(raw_input_data))
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps({"format_version": "1.2", "resource_changes": []}))
+
+    modules = imported_modules(
+        ["validate_plan.py", str(plan_json)], env={"ER_INPUT_FILE": str(input_json)}
+    )
+
+    assert "boto3" not in modules
+    assert "botocore" not in modules
+
+
+def test_python_engine(tmp_path: Path, raw_input_data: dict) -> None:
+    """Test the python engine doesn't load cdktf."""
+    input_json = tmp_path / "input.json"
+    input_json.write_text(json.dumps(raw_input_data))
+
+    modules = imported_modules(
+        ["-m", "er_aws_elasticache"],
+        env={
+            "ER_INPUT_FILE": str(input_json),
+            "ER_OUTDIR": str(tmp_path / "outdir"),
+            "ER_SYNTH_ENGINE": "python",
+        },
+    )
+
+    assert (tmp_path / "outdir" / "stacks" / "CDKTF" / "cdk.tf.json").exists()
+    assert "cdktf" not in modules
+    assert "jsii" not in modules
+
+
+def test_stack_import() -> None:
+    """Test importing the stack doesn't load the provider bindings."""
+    modules = imported_modules(["-c", "import er_aws_elasticache.stack"])
+
+    assert "cdktf_cdktf_provider_aws" not in modules
+    assert "cdktf_cdktf_provider_random" not in modules
@@ -0,0 +1,48 @@
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+from er_aws_elasticache.instrumentation import Metrics, metrics_enabled, profiling
+
+
+def test_metrics_spans(tmp_path: Path) -> None:
+    """Test spans accumulate their durations and are written as JSON."""
+    metrics = Metrics()
+    for _ in range(2):
+        with metrics.span("phase"):
+            pass
+    with pytest.raises(ValueError, match="failed"), metrics.span("failing"):
+        raise ValueError("failed")
+
+    metrics.write(tmp_path / "metrics.json", engine="python")
+
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["engine"] == "python"
+    assert set(data["spans_ms"]) == {"phase", "failing"}
+    assert data["total_ms"] >= sum(data["spans_ms"].values())
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"), [("1", True), ("true", True), ("", False), ("0", False)]
+)
+def test_metrics_enabled(
+    monkeypatch: pytest.MonkeyPatch, value: str, *, expected: bool
+) -> None:
+    """Test ER_METRICS enables the metrics file."""
+    monkeypatch.setenv("ER_METRICS", value)
+    assert metrics_enabled() is expected
+
+
+def test_profiling(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ER_PROFILE and ER_TRACEMALLOC capture profiles."""
+    monkeypatch.setenv("ER_PROFILE", str(tmp_path / "run.prof"))
+    monkeypatch.setenv("ER_TRACEMALLOC", str(tmp_path / "tracemalloc.txt"))
+
+    with profiling():
+        data = [str(i) for i in range(10000)]
+
+    assert data
+    assert pstats.Stats(str(tmp_path / "run.prof")).total_calls > 0  # type: ignore[attr-defined]
+    assert (tmp_path / "tracemalloc.txt").read_text().startswith("Peak traced memory")
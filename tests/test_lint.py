@@ -0,0 +1,55 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from er_aws_elasticache.lint import find_inputs, run
+
+
+def write_inputs(tmp_path: Path, raw_input_data: dict) -> list[Path]:
+    """Write a fleet with a valid, an invalid and a broken input document."""
+    valid = tmp_path / "a" / "input.json"
+    invalid = tmp_path / "b" / "input.json"
+    broken = tmp_path / "c" / "input.json"
+    for path in (valid, invalid, broken):
+        path.parent.mkdir()
+    valid.write_text(json.dumps(raw_input_data))
+    raw_input_data["data"] |= {"number_cache_clusters": 1}
+    invalid.write_text(json.dumps(raw_input_data))
+    broken.write_text("{")
+    (tmp_path / "a" / "plan.json").write_text("{}")
+    return [valid, invalid, broken]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_lint(tmp_path: Path, raw_input_data: dict, max_workers: int) -> None:
+    """Test every input document gets a result line in input order."""
+    inputs = write_inputs(tmp_path, raw_input_data)
+    output = io.StringIO()
+
+    assert find_inputs([str(tmp_path)]) == inputs
+    assert not run(inputs, output, max_workers)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r["input"] for r in results] == list(map(str, inputs))
+    assert [r["valid"] for r in results] == [True, False, False]
+    assert not results[0]["errors"]
+    assert results[1]["errors"] == [
+        {
+            "loc": "data",
+            "msg": "Value error, Automatic failover is not supported for clusters with less than 2 nodes. Set number_cache_clusters to 2 or more.",
+            "type": "value_error",
+        }
+    ]
+    assert results[2]["errors"][0]["type"] == "json_invalid"
+
+
+def test_lint_valid(tmp_path: Path, raw_input_data: dict) -> None:
+    """Test a fleet of valid input documents and a missing one."""
+    input_json = tmp_path / "input.json"
+    input_json.write_text(json.dumps(raw_input_data))
+    output = io.StringIO()
+
+    assert run(find_inputs([str(input_json)]), output, max_workers=2)
+    assert not run([tmp_path / "missing.json"], output, max_workers=1)
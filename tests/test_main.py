@@ -1,11 +1,16 @@
 import json
+import logging
 import os
 from pathlib import Path
 
 import pytest
 from cdktf import App
 
-from er_aws_elasticache.__main__ import get_ai_input, init_cdktf_app  # noqa: PLC2701
+from er_aws_elasticache.__main__ import (
+    get_ai_input,  # noqa: PLC2701
+    init_cdktf_app,  # noqa: PLC2701
+    main,  # noqa: PLC2701
+)
 from er_aws_elasticache.app_interface_input import AppInterfaceInput
 
 
@@ -40,3 +45,45 @@ def test_main_app(ai_input: AppInterfaceInput) -> None:
     outdir = os.environ.get("ER_OUTDIR")
     assert outdir
     assert (Path(outdir) / "stacks" / app_id / "cdk.tf.json").exists()
+
+
+def test_main_synth_cache(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test an unchanged input is restored from the synth cache."""
+    caplog.set_level(logging.INFO)
+    monkeypatch.setenv("ER_SYNTH_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("ER_SYNTH_ENGINE", "python")
+    main()
+    outdir = Path(os.environ["ER_OUTDIR"])
+    synthesized = (outdir / "stacks" / "CDKTF" / "cdk.tf.json").read_text()
+
+    def no_synth(*_: object) -> None:
+        raise AssertionError("synth must not run on a cache hit")
+
+    monkeypatch.setattr("er_aws_elasticache.__main__.synth", no_synth)
+    monkeypatch.setenv("ER_OUTDIR", str(tmp_path / "second"))
+    main()
+
+    assert "Synth cache hit" in caplog.text
+    assert (
+        tmp_path / "second" / "stacks" / "CDKTF" / "cdk.tf.json"
+    ).read_text() == synthesized
+
+
+def test_main_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ER_METRICS writes the phase timings next to the outputs."""
+    monkeypatch.setenv("ER_METRICS", "1")
+    monkeypatch.setenv("ER_SYNTH_ENGINE", "python")
+    main()
+
+    metrics = json.loads((Path(os.environ["ER_OUTDIR"]) / "metrics.json").read_text())
+    assert metrics["engine"] == "python"
+    assert set(metrics["spans_ms"]) == {"parse_input", "render"}
+
+
+def test_main_rejects_unknown_engines(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a typo in ER_SYNTH_ENGINE isn't replaced by the default engine."""
+    monkeypatch.setenv("ER_SYNTH_ENGINE", "pyhton")
+    with pytest.raises(ValueError, match="Unknown ER_SYNTH_ENGINE 'pyhton'"):
+        main()
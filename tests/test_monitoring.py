@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from cdktf import Testing
+from external_resources_io.input import parse_model
+
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.monitoring import (
+    ALARM_METRICS,
+    alarms,
+    dashboard_body,
+    member_clusters,
+)
+from er_aws_elasticache.stack import ElasticacheStack as Stack
+
+
+@pytest.mark.parametrize(
+    ("layout", "expected"),
+    [
+        (
+            {"number_cache_clusters": 2},
+            ["elasticache-example-01-001", "elasticache-example-01-002"],
+        ),
+        (
+            {
+                "node_type": "cache.r6g.large",
+                "number_cache_clusters": None,
+                "num_node_groups": 2,
+                "replicas_per_node_group": 1,
+            },
+            [
+                "elasticache-example-01-0001-001",
+                "elasticache-example-01-0001-002",
+                "elasticache-example-01-0002-001",
+                "elasticache-example-01-0002-002",
+            ],
+        ),
+    ],
+)
+def test_member_clusters(raw_input_data: dict, layout: dict, expected: list) -> None:
+    """Test the member cluster IDs follow the Elasticache naming of the layout."""
+    raw_input_data["data"] |= layout
+    assert member_clusters(parse_model(AppInterfaceInput, raw_input_data).data) == (
+        expected
+    )
+
+
+def test_alarms(raw_input_data: dict) -> None:
+    """Test every member has an alarm per enabled threshold, notifying the topic."""
+    topic = "arn:aws:sns:us-east-1:123456789012:alerts"
+    raw_input_data["data"] |= {
+        "notification_topic_arn": topic,
+        "monitoring": {"evictions": None, "cpu_percent": 80},
+    }
+    data = parse_model(AppInterfaceInput, raw_input_data).data
+    assert data.monitoring
+    result = alarms(data)
+
+    assert len(result) == len(member_clusters(data)) * (len(ALARM_METRICS) - 1)
+    assert not any(a["metric_name"] == "Evictions" for a in result.values())
+    cpu = result["example-elasticache-elasticache-example-01-002-cpu_percent"]
+    assert cpu["dimensions"] == {"CacheClusterId": "elasticache-example-01-002"}
+    assert cpu["metric_name"] == "EngineCPUUtilization"
+    assert cpu["threshold"] == data.monitoring.cpu_percent
+    assert cpu["alarm_actions"] == cpu["ok_actions"] == [topic]
+    assert set(result) <= set(data.resource_ids)
+
+
+def test_dashboard_body(raw_input_data: dict) -> None:
+    """Test the dashboard graphs every member per alarm metric."""
+    raw_input_data["data"] |= {"monitoring": {}}
+    data = parse_model(AppInterfaceInput, raw_input_data).data
+    widgets = json.loads(dashboard_body(data))["widgets"]
+    assert [w["properties"]["title"] for w in widgets] == [
+        metric for metric, _, _ in ALARM_METRICS.values()
+    ]
+    assert all(
+        len(w["properties"]["metrics"]) == len(member_clusters(data)) for w in widgets
+    )
+
+
+def test_stack_monitoring(raw_input_data: dict) -> None:
+    """Test the stack creates the alarms and the dashboard."""
+    raw_input_data["data"] |= {"monitoring": {"alarm_actions": ["arn:topic"]}}
+    ai_input = parse_model(AppInterfaceInput, raw_input_data)
+    doc = json.loads(Testing.synth(Stack(Testing.app(), "CDKTF", ai_input)))
+
+    assert sorted(doc["resource"]["aws_cloudwatch_metric_alarm"]) == sorted(
+        alarms(ai_input.data)
+    )
+    dashboard = doc["resource"]["aws_cloudwatch_dashboard"][
+        "example-elasticache-dashboard"
+    ]
+    assert dashboard["dashboard_name"] == ai_input.data.replication_group_id
+    assert dashboard["dashboard_body"] == dashboard_body(ai_input.data)
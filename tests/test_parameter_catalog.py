@@ -0,0 +1,190 @@
+from pathlib import Path
+from typing import Any
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from external_resources_io.input import parse_model
+from pydantic import ValidationError
+
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.parameter_catalog import (
+    CATALOG_DIR,
+    FamilyCatalog,
+    family_catalog,
+    spec_from_aws,
+    update,
+)
+
+# a page of DescribeEngineDefaultParameters for redis6.x, with the parameters
+# of the bundled input fixtures
+AWS_DEFAULTS: list[dict[str, Any]] = [
+    {
+        "ParameterName": "reserved-memory",
+        "ParameterValue": "0",
+        "DataType": "integer",
+        "IsModifiable": True,
+        "ChangeType": "immediate",
+    },
+    {
+        "ParameterName": "tcp-keepalive",
+        "ParameterValue": "300",
+        "DataType": "integer",
+        "AllowedValues": "0-",
+        "IsModifiable": True,
+        "ChangeType": "immediate",
+    },
+    {
+        "ParameterName": "maxmemory-policy",
+        "ParameterValue": "volatile-lru",
+        "DataType": "string",
+        "AllowedValues": "volatile-lru,allkeys-lru,volatile-lfu,allkeys-lfu,volatile-random,allkeys-random,volatile-ttl,noeviction",
+        "IsModifiable": True,
+        "ChangeType": "immediate",
+    },
+]
+
+
+@pytest.mark.parametrize("path", sorted(CATALOG_DIR.glob("*.json")))
+def test_catalog_defaults(path: Path) -> None:
+    """Test the bundled catalogs load and accept their own default values."""
+    catalog = FamilyCatalog.model_validate_json(path.read_bytes())
+    assert family_catalog(catalog.family) == catalog
+    for name, spec in catalog.parameters.items():
+        if spec.modifiable and spec.default:
+            assert catalog.check(name, spec.default, None) is None, name
+
+
+@pytest.mark.parametrize("path", sorted(CATALOG_DIR.glob("*.json")))
+def test_catalog_covers_the_aws_defaults(path: Path) -> None:
+    """Test the bundled catalogs know the AWS default parameters of the fixtures."""
+    catalog = FamilyCatalog.model_validate_json(path.read_bytes())
+    for parameter in AWS_DEFAULTS:
+        assert catalog.unknown(parameter["ParameterName"]) is None
+        assert (
+            catalog.check(parameter["ParameterName"], parameter["ParameterValue"], None)
+            is None
+        ), parameter["ParameterName"]
+
+
+def test_update(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a catalog is regenerated from all pages of the engine defaults."""
+    monkeypatch.setattr("er_aws_elasticache.parameter_catalog.CATALOG_DIR", tmp_path)
+    client = boto3.client("elasticache", region_name="us-east-1")
+    with Stubber(client) as elasticache:
+        for i, parameters in enumerate([AWS_DEFAULTS[:1], AWS_DEFAULTS[1:]]):
+            elasticache.add_response(
+                "describe_engine_default_parameters",
+                {
+                    "EngineDefaults": {
+                        "CacheParameterGroupFamily": "redis6.x",
+                        "Parameters": parameters,
+                    }
+                    | ({"Marker": "next"} if i == 0 else {})
+                },
+            )
+        path = update("redis6.x", client)
+
+    catalog = FamilyCatalog.model_validate_json(path.read_bytes())
+    assert catalog.generated
+    assert list(catalog.parameters) == sorted(p["ParameterName"] for p in AWS_DEFAULTS)
+    for parameter in AWS_DEFAULTS:
+        assert (
+            catalog.check(parameter["ParameterName"], parameter["ParameterValue"], None)
+            is None
+        )
+
+
+@pytest.mark.parametrize("family", ["memcached1.6", "redis99", "../parameters/redis7"])
+def test_unknown_family(family: str) -> None:
+    """Test families without a catalog aren't checked."""
+    assert family_catalog(family) is None
+
+
+@pytest.mark.parametrize(
+    ("parameter", "error"),
+    [
+        (
+            {"name": "activedefrag", "value": True},
+            "Invalid value 'True' for parameter activedefrag: allowed values are yes, no",
+        ),
+        (
+            {"name": "maxmemory-policy", "value": "allkeys-lr"},
+            "Invalid value 'allkeys-lr' for parameter maxmemory-policy",
+        ),
+        (
+            {"name": "tcp-keepalive", "value": "5m"},
+            "Invalid value '5m' for parameter tcp-keepalive: must be an integer",
+        ),
+        (
+            {"name": "active-defrag-cycle-max", "value": 80},
+            "must be at most 75",
+        ),
+        ({"name": "repl-timeout", "value": 10}, "must be at least 30"),
+        (
+            {"name": "maxclients", "value": 1000},
+            "Parameter maxclients is not modifiable",
+        ),
+        (
+            {"name": "databases", "value": 32, "apply_method": "immediate"},
+            "Parameter databases requires a reboot",
+        ),
+    ],
+)
+def test_invalid_parameters(raw_input_data: dict, parameter: dict, error: str) -> None:
+    """Test invalid parameters fail when the input is parsed."""
+    raw_input_data["data"]["parameter_group"]["parameters"].append(parameter)
+    with pytest.raises(ValidationError, match=error):
+        parse_model(AppInterfaceInput, raw_input_data)
+
+
+def test_valid_parameters(raw_input_data: dict) -> None:
+    """Test valid parameters, with a reboot where one is needed."""
+    raw_input_data["data"]["parameter_group"]["parameters"] += [
+        {"name": "maxmemory-policy", "value": "allkeys-lru"},
+        {"name": "activedefrag", "value": "yes"},
+        {"name": "active-defrag-cycle-max", "value": 75},
+        {"name": "databases", "value": 32, "apply_method": "pending-reboot"},
+        {"name": "reserved-memory", "value": 0},
+    ]
+    parse_model(AppInterfaceInput, raw_input_data)
+
+
+def test_spec_from_aws() -> None:
+    """Test the AllowedValues of the AWS API are converted."""
+    spec = spec_from_aws({
+        "ParameterName": "timeout",
+        "ParameterValue": "0",
+        "DataType": "integer",
+        "AllowedValues": "0,20-",
+        "IsModifiable": True,
+        "ChangeType": "immediate",
+    })
+    assert (spec.min, spec.max, spec.default) == (0, None, "0")
+    spec = spec_from_aws({"DataType": "integer", "AllowedValues": "-5--1,1-10000"})
+    assert (spec.min, spec.max) == (-5, 10000)
+    spec = spec_from_aws({
+        "DataType": "string",
+        "AllowedValues": "yes,no",
+        "IsModifiable": False,
+        "ChangeType": "requires-reboot",
+    })
+    assert spec.allowed == ["yes", "no"]
+    assert spec.min is None
+    assert not spec.modifiable
+    assert spec.change_type == "requires-reboot"
+
+
+def test_unknown_parameters_are_warnings(
+    raw_input_data: dict, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test unknown parameters only warn, the catalog may miss valid ones."""
+    raw_input_data["data"]["parameter_group"]["parameters"].append({
+        "name": "maxmemory-polcy",
+        "value": "allkeys-lru",
+    })
+    parse_model(AppInterfaceInput, raw_input_data)
+    assert (
+        "Unknown parameter maxmemory-polcy for family redis6.x, did you mean maxmemory-policy?"
+        in caplog.text
+    )
@@ -0,0 +1,122 @@
+import json
+from pathlib import Path
+
+import pytest
+from external_resources_io.terraform import Action, TerraformJsonPlanParser
+
+from er_aws_elasticache.plan_reader import (
+    ResourceChangeIndex,
+    read_resource_changes,
+)
+
+RESOURCE_TYPES = (
+    "aws_elasticache_replication_group",
+    "aws_elasticache_parameter_group",
+)
+
+
+@pytest.fixture
+def plan_data() -> dict:
+    """Fixture to provide a plan with blocks the reader has to skip."""
+    return {
+        "format_version": "1.2",
+        "terraform_version": "1.6.6",
+        "planned_values": {"root_module": {"resources": [{"values": {"a": [1, {}]}}]}},
+        "prior_state": {
+            "values": {
+                "tricky": 'strings with "quotes", \\backslashes\\, {braces} and [brackets]',
+                "unicode": "ümlaut ☃",
+                "numbers": [1, -2.5e3, 0],
+                "literals": [True, False, None],
+            }
+        },
+        "resource_changes": [
+            {
+                "address": "random_password.password",
+                "type": "random_password",
+                "name": "password",
+                "change": {"actions": ["create"], "after": {}, "after_unknown": {}},
+            },
+            {
+                "address": "aws_elasticache_replication_group.example",
+                "type": "aws_elasticache_replication_group",
+                "name": "example",
+                "change": {
+                    "actions": ["delete", "create"],
+                    "before": {"description": "}]"},
+                    "after": {"replication_group_id": "example-01"},
+                    "after_unknown": {},
+                    "replace_paths": [["transit_encryption_enabled"]],
+                },
+            },
+            {
+                "address": "aws_elasticache_parameter_group.pg",
+                "type": "aws_elasticache_parameter_group",
+                "name": "pg",
+                "change": {"actions": ["update"], "after": {}, "after_unknown": {}},
+            },
+        ],
+        "configuration": {"root_module": {"resources": []}},
+        "complete": True,
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_resource_changes(
+    tmp_path: Path, plan_data: dict, chunk_size: int, indent: int | None
+) -> None:
+    """Test the reader keeps the same changes as the full plan parser."""
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps(plan_data, indent=indent, ensure_ascii=False))
+
+    changes = read_resource_changes(plan_file, RESOURCE_TYPES, chunk_size)
+
+    assert [c.model_dump(exclude={"change": {"replace_paths"}}) for c in changes] == [
+        c.model_dump()
+        for c in TerraformJsonPlanParser(plan_path=str(plan_file)).plan.resource_changes
+        if c.type in RESOURCE_TYPES
+    ]
+    assert [getattr(c.change, "replace_paths", None) for c in changes] == [
+        [["transit_encryption_enabled"]],
+        None,
+    ]
+
+
+@pytest.mark.parametrize(
+    "plan",
+    [{}, {"resource_changes": []}, {"format_version": "1.2", "resource_changes": None}],
+)
+def test_read_resource_changes_without_changes(tmp_path: Path, plan: dict) -> None:
+    """Test plans without resource changes."""
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps(plan))
+    assert read_resource_changes(plan_file, RESOURCE_TYPES) == []
+
+
+def test_read_resource_changes_truncated(tmp_path: Path, plan_data: dict) -> None:
+    """Test a truncated plan is an error."""
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps(plan_data)[:-10])
+    with pytest.raises(ValueError, match="Unexpected end"):
+        read_resource_changes(plan_file, RESOURCE_TYPES, chunk_size=16)
+
+
+def test_resource_change_index(tmp_path: Path, plan_data: dict) -> None:
+    """Test the changes are indexed by type and action."""
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps(plan_data))
+
+    index = ResourceChangeIndex.read(plan_file, RESOURCE_TYPES)
+
+    for action in (Action.ActionDelete, Action.ActionCreate):
+        assert [
+            c.name for c in index.get("aws_elasticache_replication_group", action)
+        ] == ["example"]
+    assert [
+        c.name
+        for c in index.get("aws_elasticache_parameter_group", Action.ActionUpdate)
+    ] == ["pg"]
+    assert not index.get("aws_elasticache_parameter_group", Action.ActionCreate)
+    assert not index.get("random_password", Action.ActionCreate)
+    assert [c.name for c in index.changes] == ["example", "pg"]
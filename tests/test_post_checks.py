@@ -2,42 +2,66 @@ import pytest
 from post_checks import check
 
 
+def cluster_outputs(prefix: str, **values: object) -> dict:
+    """Outputs of one cluster in the terraform output -json format."""
+    values = {
+        "db_auth_token": "token",
+        "db_endpoint": "hostname",
+        "db_port": 6379,
+        "db_reader_endpoint": "reader-hostname",
+        "db_member_clusters": "member-001,member-002",
+        "db_cluster_enabled": False,
+        "db_num_node_groups": 1,
+        "db_replicas_per_node_group": 1,
+    } | values
+    return {
+        f"{prefix}__{name}": {"sensitive": name == "db_auth_token", "value": value}
+        for name, value in values.items()
+        if value is not None
+    }
+
+
 @pytest.mark.parametrize(
     ("outputs", "expected"),
     [
+        (cluster_outputs("glitchtip-dev-elasticache"), True),
+        (cluster_outputs("glitchtip-dev-elasticache", db_port=None), False),
+        (cluster_outputs("glitchtip-dev-elasticache", db_reader_endpoint=None), False),
+        (cluster_outputs("glitchtip-dev-elasticache", db_reader_endpoint=""), False),
+        (cluster_outputs("glitchtip-dev-elasticache", db_member_clusters=""), False),
+        (cluster_outputs("glitchtip-dev-elasticache", db_endpoint=""), False),
+        (
+            cluster_outputs(
+                "glitchtip-dev-elasticache",
+                db_cluster_enabled=True,
+                db_reader_endpoint="",
+                db_num_node_groups=3,
+            ),
+            True,
+        ),
         (
-            {
-                "glitchtip-dev-elasticache__db_auth_token": {
-                    "sensitive": True,
-                    "type": "string",
-                    "value": "token",
-                },
-                "glitchtip-dev-elasticache__db_endpoint": {
-                    "sensitive": False,
-                    "type": "string",
-                    "value": "hostname",
-                },
-                "glitchtip-dev-elasticache__db_port": {
-                    "sensitive": False,
-                    "type": "number",
-                    "value": 6379,
-                },
-            },
+            cluster_outputs(
+                "serverless-elasticache",
+                db_serverless_cache_arn="arn",
+                db_member_clusters=None,
+                db_num_node_groups=None,
+                db_replicas_per_node_group=None,
+                db_auth_token=None,
+            ),
             True,
         ),
         (
-            {
-                "glitchtip-dev-elasticache__db_auth_token": {
-                    "sensitive": True,
-                    "type": "string",
-                    "value": "token",
-                },
-                "glitchtip-dev-elasticache__db_endpoint": {
-                    "sensitive": False,
-                    "type": "string",
-                    "value": "hostname",
-                },
-            },
+            cluster_outputs(
+                "serverless-elasticache",
+                db_serverless_cache_arn="arn",
+                db_member_clusters=None,
+                db_reader_endpoint="",
+            ),
+            False,
+        ),
+        (
+            cluster_outputs("shard-0-elasticache")
+            | cluster_outputs("shard-1-elasticache", db_member_clusters=""),
             False,
         ),
     ],
@@ -0,0 +1,303 @@
+import copy
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from cdktf import App, TerraformOutput, TerraformStack
+from external_resources_io.input import parse_model
+
+from er_aws_elasticache.__main__ import init_cdktf_app, main  # noqa: PLC2701
+from er_aws_elasticache.app_interface_input import (
+    AppInterfaceInput,
+    MultiClusterInput,
+    StackInput,
+)
+from er_aws_elasticache.renderer import (
+    required_providers,
+    stringify,
+    synth,
+    unique_id,
+)
+
+# Input variations, applied on top of the raw_input_data fixture
+CORPUS: dict[str, dict[str, Any]] = {
+    "default": {},
+    "no-parameter-group": {"parameter_group": None, "parameter_group_name": None},
+    "no-transit-encryption": {
+        "transit_encryption_enabled": False,
+        "transit_encryption_mode": None,
+    },
+    "reset-password": {"reset_password": "2024-01-01"},
+    "cluster-mode": {
+        "number_cache_clusters": None,
+        "num_node_groups": 3,
+        "replicas_per_node_group": 2,
+        "multi_az_enabled": True,
+        "port": 6380,
+    },
+    "log-delivery": {
+        "log_delivery_configuration": [
+            {
+                "destination": "my-log-group",
+                "destination_type": "cloudwatch-logs",
+                "log_format": "json",
+                "log_type": "slow-log",
+            },
+            {
+                "destination": "my-firehose",
+                "destination_type": "kinesis-firehose",
+                "log_format": "text",
+                "log_type": "engine-log",
+            },
+        ],
+        "notification_topic_arn": "arn:aws:sns:us-east-1:123456789012:topic",
+    },
+    "minimal": {
+        "tags": None,
+        "default_tags": None,
+        "auto_minor_version_upgrade": None,
+        "automatic_failover_enabled": None,
+        "at_rest_encryption_enabled": None,
+        "security_group_ids": None,
+        "maintenance_window": None,
+        "snapshot_window": None,
+        "snapshot_retention_limit": None,
+        "availability_zones": ["us-east-1a", "us-east-1b"],
+        "number_cache_clusters": 2,
+    },
+    "capacity": {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "capacity": {"dataset_gib": 20, "peak_ops_per_second": 300000},
+    },
+    "capacity-cluster-mode-disabled": {
+        "node_type": "cache.m6g.large",
+        "capacity": {
+            "dataset_gib": 1.5,
+            "peak_ops_per_second": 50000,
+            "read_ratio": 0.9,
+            "headroom_percent": 10,
+        },
+    },
+    "data-tiering": {
+        "node_type": "cache.r6gd.xlarge",
+        "data_tiering_enabled": True,
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+    },
+    "global-datastore": {
+        "node_type": "cache.r6g.large",
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "secondaries": [
+                {
+                    "region": "us-west-2",
+                    "replication_group_id": "elasticache-example-01-usw2",
+                    "subnet_group_name": "default",
+                    "security_group_ids": ["sg-987654321"],
+                },
+                {
+                    "region": "eu-west-1",
+                    "replication_group_id": "elasticache-example-01-euw1",
+                },
+            ],
+        },
+    },
+    "global-datastore-cluster-mode": {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "description": "sharded",
+            "secondaries": [
+                {
+                    "region": "us-west-2",
+                    "replication_group_id": "elasticache-example-01-usw2",
+                    "replicas_per_node_group": 2,
+                }
+            ],
+        },
+    },
+    "serverless": {
+        "node_type": None,
+        "automatic_failover_enabled": None,
+        "number_cache_clusters": None,
+        "parameter_group": None,
+        "parameter_group_name": None,
+        "maintenance_window": None,
+        "snapshot_window": None,
+        "subnet_group_name": None,
+        "engine_version": "7.1",
+        "serverless": {
+            "max_data_storage_gb": 10,
+            "min_ecpu_per_second": 1000,
+            "max_ecpu_per_second": 5000,
+            "daily_snapshot_time": "03:30",
+            "subnet_ids": ["subnet-1", "subnet-2"],
+            "user_group_id": "example-users",
+        },
+    },
+    "serverless-without-limits": {
+        "node_type": None,
+        "automatic_failover_enabled": None,
+        "number_cache_clusters": None,
+        "parameter_group": None,
+        "parameter_group_name": None,
+        "maintenance_window": None,
+        "snapshot_window": None,
+        "subnet_group_name": None,
+        "engine": "valkey",
+        "engine_version": "8.0",
+        "serverless": {},
+    },
+    "autoscaling": {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "autoscaling": {
+            "shards": {
+                "min_capacity": 1,
+                "max_capacity": 4,
+                "metric": "cpu",
+                "target_value": 60,
+            },
+            "replicas": {
+                "min_capacity": 1,
+                "max_capacity": 3,
+                "metric": "memory",
+                "target_value": 72.5,
+                "scale_in_cooldown": 600,
+                "scale_out_cooldown": 60,
+                "disable_scale_in": True,
+            },
+        },
+    },
+    "monitoring": {
+        "notification_topic_arn": "arn:aws:sns:us-east-1:123456789012:alerts",
+        "monitoring": {"cpu_percent": 75.5, "connections": None},
+    },
+    "monitoring-cluster-mode": {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "monitoring": {
+            "alarm_actions": ["arn:aws:sns:us-east-1:123456789012:pager"],
+            "period_seconds": 60,
+            "evaluation_periods": 5,
+            "dashboard": False,
+        },
+    },
+    "special-characters": {
+        "identifier": "example.elasticache ümlaut",
+        "output_prefix": "example.elasticache",
+        "replication_group_description": 'quotes " and \\ backslashes',
+        "tags": {"app": "ümlaut", "empty": ""},
+        "parameter_group": {
+            "family": "redis6.x",
+            "description": "many parameters",
+            "parameters": [
+                {"name": "maxmemory-policy", "value": "allkeys-lru"},
+                {"name": "activedefrag", "value": "yes"},
+                {"name": "maxmemory-samples", "value": 4},
+            ],
+            "name": "pg.with.dots",
+        },
+    },
+}
+
+
+def read_outdir(outdir: Path) -> dict[str, str]:
+    """Read all synthesized files."""
+    return {
+        str(f.relative_to(outdir)): f.read_text()
+        for f in sorted(outdir.rglob("*"))
+        if f.is_file()
+    }
+
+
+@pytest.fixture(params=CORPUS.keys())
+def corpus_input(request: pytest.FixtureRequest, raw_input_data: dict) -> dict:
+    """Fixture to provide the raw inputs of the parity corpus."""
+    data = copy.deepcopy(raw_input_data)
+    data["data"] |= CORPUS[request.param]
+    return data
+
+
+def assert_parity(tmp_path: Path, ai_input: StackInput) -> None:
+    """Assert the python engine renders the same files as CDKTF."""
+    init_cdktf_app(ai_input, outdir=str(tmp_path / "cdktf")).synth()
+    synth(ai_input, outdir=str(tmp_path / "python"))
+
+    expected = read_outdir(tmp_path / "cdktf")
+    rendered = read_outdir(tmp_path / "python")
+    assert rendered.keys() == expected.keys()
+    assert rendered["manifest.json"] == expected["manifest.json"]
+
+    stack = "stacks/CDKTF/cdk.tf.json"
+    expected_doc = json.loads(expected[stack])
+    rendered_doc = json.loads(rendered[stack])
+    # The provider source depends on how the bindings were generated; the
+    # pre-built PyPI packages use e.g. hashicorp/random instead of cdktf.json's random
+    for name, provider in rendered_doc["terraform"]["required_providers"].items():
+        provider["source"] = expected_doc["terraform"]["required_providers"][name][
+            "source"
+        ]
+    assert rendered_doc == expected_doc
+    assert stringify(rendered_doc) == expected[stack]
+
+
+def test_renderer_parity(tmp_path: Path, corpus_input: dict) -> None:
+    """Test the python engine renders the same files as CDKTF."""
+    assert_parity(tmp_path, parse_model(AppInterfaceInput, corpus_input))
+
+
+def test_renderer_parity_multi_cluster(
+    tmp_path: Path, raw_multi_cluster_input_data: dict
+) -> None:
+    """Test the python engine renders the same multi-cluster stack as CDKTF."""
+    raw_multi_cluster_input_data["data"][1] |= CORPUS["no-transit-encryption"]
+    assert_parity(
+        tmp_path, MultiClusterInput.model_validate(raw_multi_cluster_input_data)
+    )
+
+
+@pytest.mark.parametrize(
+    "id_", ["example-elasticache", "a.b_c", "x" * 255, "y" * 256, "z." * 200]
+)
+def test_unique_id(tmp_path: Path, id_: str) -> None:
+    """Test the logical IDs match the ones cdktf allocates, including long ones."""
+    stack = TerraformStack(App(outdir=str(tmp_path)), "CDKTF")
+    output = TerraformOutput(stack, id_, value="value")
+    assert unique_id(id_) == stack.get_logical_id(output)
+
+
+def test_required_providers_do_not_depend_on_the_cwd(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the providers are read from the project's cdktf.json from any directory."""
+    providers = required_providers()
+    monkeypatch.chdir(tmp_path)
+    assert required_providers() == providers
+    assert set(providers) == {"aws", "random"}
+
+
+def test_main_python_engine(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, raw_input_data: dict
+) -> None:
+    """Test ER_SYNTH_ENGINE selects the python engine."""
+    input_json = tmp_path / "input.json"
+    input_json.write_text(json.dumps(raw_input_data))
+    monkeypatch.setenv("ER_INPUT_FILE", str(input_json))
+    monkeypatch.setenv("ER_OUTDIR", str(tmp_path / "outdir"))
+    monkeypatch.setenv("ER_SYNTH_ENGINE", "python")
+
+    main()
+
+    assert (tmp_path / "outdir" / "stacks" / "CDKTF" / "cdk.tf.json").exists()
+    assert (tmp_path / "outdir" / "manifest.json").exists()
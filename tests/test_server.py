@@ -0,0 +1,75 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from er_aws_elasticache.__main__ import init_cdktf_app  # noqa: PLC2701
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.server import process_spool, serve_stream, synth
+
+
+def cdk_tf_json(outdir: Path) -> bytes:
+    """Read the synthesized stack."""
+    return (outdir / "stacks" / "CDKTF" / "cdk.tf.json").read_bytes()
+
+
+def test_serve_stream(
+    tmp_path: Path, raw_input_data: dict, ai_input: AppInterfaceInput
+) -> None:
+    """Test the stdin server synthesizes the same stack as a single run."""
+    init_cdktf_app(ai_input, outdir=str(tmp_path / "expected")).synth()
+    requests = io.StringIO(
+        "\n".join([
+            json.dumps({"input": raw_input_data, "outdir": str(tmp_path / "one")}),
+            "",
+            json.dumps({"input": raw_input_data, "outdir": str(tmp_path / "two")}),
+            json.dumps({"input": {}, "outdir": str(tmp_path / "three")}),
+        ])
+    )
+    responses = io.StringIO()
+
+    serve_stream(requests, responses)
+
+    results = [json.loads(line) for line in responses.getvalue().splitlines()]
+    assert results[:2] == [
+        {"outdir": str(tmp_path / "one"), "ok": True},
+        {"outdir": str(tmp_path / "two"), "ok": True},
+    ]
+    assert not results[2]["ok"]
+    assert results[2]["error"].startswith("ValidationError")
+    expected = cdk_tf_json(tmp_path / "expected")
+    assert cdk_tf_json(tmp_path / "one") == expected
+    assert cdk_tf_json(tmp_path / "two") == expected
+
+
+def test_process_spool(tmp_path: Path, raw_input_data: dict) -> None:
+    """Test the spool directory processing."""
+    (tmp_path / "good.json").write_text(json.dumps(raw_input_data))
+    (tmp_path / "bad.json").write_text("{}")
+
+    assert process_spool(tmp_path) == 2  # noqa: PLR2004
+    assert process_spool(tmp_path) == 0
+
+    assert (tmp_path / "good.json.done").exists()
+    assert cdk_tf_json(tmp_path / "good.out")
+    assert (tmp_path / "bad.json.failed").exists()
+    assert "ValidationError" in (tmp_path / "bad.error").read_text()
+
+
+def test_synth_uses_the_engine_and_the_synth_cache(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, raw_input_data: dict
+) -> None:
+    """Test the server synthesizes like a single run."""
+    monkeypatch.setenv("ER_SYNTH_ENGINE", "python")
+    monkeypatch.setenv("ER_SYNTH_CACHE_DIR", str(tmp_path / "cache"))
+    synth(raw_input_data, tmp_path / "one")
+
+    def no_synth(*_: object) -> None:
+        raise AssertionError("synth must not run on a cache hit")
+
+    monkeypatch.setattr("er_aws_elasticache.__main__.synth", no_synth)
+    synth(raw_input_data, tmp_path / "two")
+
+    assert cdk_tf_json(tmp_path / "two") == cdk_tf_json(tmp_path / "one")
+    assert any((tmp_path / "cache").iterdir())
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from cdktf import Testing
 from cdktf_cdktf_provider_aws.elasticache_parameter_group import (
@@ -8,8 +10,10 @@ from cdktf_cdktf_provider_aws.elasticache_replication_group import (
 )
 from cdktf_cdktf_provider_aws.provider import AwsProvider
 from cdktf_cdktf_provider_random.provider import RandomProvider
+from external_resources_io.input import parse_model
 
-from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.app_interface_input import AppInterfaceInput, MultiClusterInput
+from er_aws_elasticache.engine_catalog import engine_catalog
 from er_aws_elasticache.stack import ElasticacheStack as Stack
 
 
@@ -90,3 +94,179 @@ def test_stack_elasticache_parameter_group(synthesized: str) -> None:
             "parameter": [{"name": "tcp-keepalive", "value": "300"}],
         },
     )
+
+
+def test_stack_multi_cluster(raw_multi_cluster_input_data: dict) -> None:
+    """Test all clusters of a multi-cluster input share one stack and its providers."""
+    ai_input = MultiClusterInput.model_validate(raw_multi_cluster_input_data)
+    doc = json.loads(Testing.synth(Stack(Testing.app(), "CDKTF", ai_input)))
+
+    assert len(doc["provider"]["aws"]) == 1
+    assert sorted(doc["resource"]["aws_elasticache_replication_group"]) == [
+        c.identifier for c in ai_input.clusters
+    ]
+    assert sorted(doc["resource"]["aws_elasticache_parameter_group"]) == [
+        c.parameter_group_name for c in ai_input.clusters
+    ]
+    outputs = [
+        sorted(
+            key.removeprefix(f"{c.output_prefix}__")
+            for key in doc["output"]
+            if key.startswith(f"{c.output_prefix}__")
+        )
+        for c in ai_input.clusters
+    ]
+    assert outputs[0] == outputs[1]
+    assert {"db_endpoint", "db_port", "db_reader_endpoint"} <= set(outputs[0])
+    assert len(doc["output"]) == len(outputs[0]) * len(outputs)
+
+
+def test_stack_read_scaling_outputs(synthesized: str) -> None:
+    """Test the reader endpoint and the member clusters are published."""
+    outputs = json.loads(synthesized)["output"]
+    prefix = "example-elasticache-elasticache"
+    group = "aws_elasticache_replication_group.example-elasticache"
+    assert outputs[f"{prefix}__db_reader_endpoint"]["value"] == (
+        f"${{{group}.reader_endpoint_address}}"
+    )
+    assert outputs[f"{prefix}__db_member_clusters"]["value"] == (
+        f'${{join(",", tolist({group}.member_clusters))}}'
+    )
+    assert not outputs[f"{prefix}__db_cluster_enabled"]["sensitive"]
+
+
+def test_stack_data_tiering(raw_input_data: dict) -> None:
+    """Test data tiering is enabled and the memory and SSD of the shards are published."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6gd.xlarge",
+        "data_tiering_enabled": True,
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+    }
+    ai_input = parse_model(AppInterfaceInput, raw_input_data)
+    synthesized = Testing.synth(Stack(Testing.app(), "CDKTF", ai_input))
+    assert Testing.to_have_resource_with_properties(
+        synthesized,
+        ElasticacheReplicationGroup.TF_RESOURCE_TYPE,
+        {"data_tiering_enabled": True, "num_node_groups": 2},
+    )
+    node = engine_catalog().node_type("cache.r6gd.xlarge")
+    assert node
+    outputs = json.loads(synthesized)["output"]
+    prefix = ai_input.data.output_prefix
+    assert outputs[f"{prefix}__data_tiering_memory_gib"]["value"] == round(
+        2 * node.memory_gib, 2
+    )
+    assert outputs[f"{prefix}__data_tiering_ssd_gib"]["value"] == round(
+        2 * node.ssd_gib, 2
+    )
+
+
+def test_stack_without_data_tiering(synthesized: str) -> None:
+    """Test the data tiering outputs are only published for data tiering node types."""
+    assert not any(
+        "__data_tiering_" in key for key in json.loads(synthesized)["output"]
+    )
+
+
+def test_stack_global_datastore(raw_input_data: dict) -> None:
+    """Test the secondaries are created with their regional providers and endpoints."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "secondaries": [
+                {"region": "us-west-2", "replication_group_id": "example-usw2"}
+            ],
+        },
+    }
+    ai_input = parse_model(AppInterfaceInput, raw_input_data)
+    doc = json.loads(Testing.synth(Stack(Testing.app(), "CDKTF", ai_input)))
+
+    assert [p.get("alias") for p in doc["provider"]["aws"]] == [None, "us-west-2"]
+    groups = doc["resource"]["aws_elasticache_replication_group"]
+    secondary = groups["example-elasticache-us-west-2"]
+    assert secondary["provider"] == "aws.us-west-2"
+    assert secondary["num_cache_clusters"] == ai_input.data.number_cache_clusters
+    assert secondary["global_replication_group_id"] == (
+        "${aws_elasticache_global_replication_group.example-elasticache-global.global_replication_group_id}"
+    )
+    assert "engine" not in secondary
+    assert doc["resource"]["aws_elasticache_global_replication_group"][
+        "example-elasticache-global"
+    ]["primary_replication_group_id"] == (
+        "${aws_elasticache_replication_group.example-elasticache.id}"
+    )
+    prefix = ai_input.data.output_prefix
+    for region in ("us_east_1", "us_west_2"):
+        assert f"{prefix}__db_endpoint_{region}" in doc["output"]
+        assert f"{prefix}__db_reader_endpoint_{region}" in doc["output"]
+
+
+def test_stack_serverless(raw_input_data: dict) -> None:
+    """Test a serverless cache replaces the replication group."""
+    for attribute in ("node_type", "number_cache_clusters", "parameter_group"):
+        raw_input_data["data"].pop(attribute)
+    raw_input_data["data"] |= {
+        "automatic_failover_enabled": None,
+        "parameter_group_name": None,
+        "maintenance_window": None,
+        "snapshot_window": None,
+        "subnet_group_name": None,
+        "engine": "valkey",
+        "engine_version": "8.0",
+        "serverless": {"max_ecpu_per_second": 5000, "subnet_ids": ["subnet-1"]},
+    }
+    ai_input = parse_model(AppInterfaceInput, raw_input_data)
+    doc = json.loads(Testing.synth(Stack(Testing.app(), "CDKTF", ai_input)))
+
+    assert "aws_elasticache_replication_group" not in doc["resource"]
+    cache = doc["resource"]["aws_elasticache_serverless_cache"]["example-elasticache"]
+    assert cache["major_engine_version"] == "8"
+    assert cache["cache_usage_limits"] == [{"ecpu_per_second": [{"maximum": 5000}]}]
+    assert cache["subnet_ids"] == ["subnet-1"]
+    prefix = ai_input.data.output_prefix
+    assert doc["output"][f"{prefix}__db_endpoint"]["value"] == (
+        "${aws_elasticache_serverless_cache.example-elasticache.endpoint[0].address}"
+    )
+    assert f"{prefix}__db_auth_token" not in doc["output"]
+
+
+def test_stack_autoscaling(raw_input_data: dict) -> None:
+    """Test the scalable targets and policies, and terraform ignores the scaled attributes."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "number_cache_clusters": None,
+        "num_node_groups": 2,
+        "replicas_per_node_group": 1,
+        "autoscaling": {
+            "replicas": {
+                "min_capacity": 1,
+                "max_capacity": 3,
+                "metric": "cpu",
+                "target_value": 60,
+            }
+        },
+    }
+    ai_input = parse_model(AppInterfaceInput, raw_input_data)
+    doc = json.loads(Testing.synth(Stack(Testing.app(), "CDKTF", ai_input)))
+
+    group = doc["resource"]["aws_elasticache_replication_group"]["example-elasticache"]
+    assert group["lifecycle"] == {"ignore_changes": ["replicas_per_node_group"]}
+    target = doc["resource"]["aws_appautoscaling_target"][
+        "example-elasticache-replicas-target"
+    ]
+    assert target["scalable_dimension"] == "elasticache:replication-group:Replicas"
+    assert target["resource_id"] == (
+        "replication-group/${aws_elasticache_replication_group.example-elasticache.id}"
+    )
+    policy = doc["resource"]["aws_appautoscaling_policy"][
+        "example-elasticache-replicas-policy"
+    ]
+    assert policy["target_tracking_scaling_policy_configuration"] == {
+        "predefined_metric_specification": {
+            "predefined_metric_type": "ElastiCacheReplicaEngineCPUUtilization"
+        },
+        "target_value": 60,
+    }
@@ -0,0 +1,98 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from er_aws_elasticache import synth_cache
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.synth_cache import SynthCache, cache_key
+
+
+@pytest.fixture
+def outdir(tmp_path: Path) -> Path:
+    """Fixture to provide a synthesized output directory."""
+    outdir = tmp_path / "outdir"
+    (outdir / "stacks" / "CDKTF").mkdir(parents=True)
+    (outdir / "stacks" / "CDKTF" / "cdk.tf.json").write_text("{}")
+    (outdir / "manifest.json").write_text("{}")
+    return outdir
+
+
+def test_cache_key(ai_input: AppInterfaceInput) -> None:
+    """Test the cache key depends on the input and the engine."""
+    key = cache_key(ai_input, "cdktf")
+    assert key == cache_key(ai_input.model_copy(deep=True), "cdktf")
+    assert key != cache_key(ai_input, "python")
+    changed = ai_input.model_copy(deep=True)
+    changed.data.node_type = "cache.m6g.large"
+    assert key != cache_key(changed, "cdktf")
+
+
+def test_cache_key_depends_on_the_catalogs(
+    tmp_path: Path, ai_input: AppInterfaceInput, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test changing a catalog file changes the cache key."""
+    package = tmp_path / "er_aws_elasticache"
+    shutil.copytree(
+        synth_cache.PACKAGE,
+        package,
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    monkeypatch.setattr(synth_cache, "PACKAGE", package)
+    key = cache_key(ai_input, "cdktf")
+
+    catalog = package / "data" / "engine_catalog.json"
+    catalog.write_text(catalog.read_text() + "\n")
+
+    assert key != cache_key(ai_input, "cdktf")
+
+
+def test_synth_cache_store_and_restore(tmp_path: Path, outdir: Path) -> None:
+    """Test a stored output directory is restored."""
+    cache = SynthCache(tmp_path / "cache")
+    restored = tmp_path / "restored"
+    assert not cache.restore("key", restored)
+
+    cache.store("key", outdir)
+    # storing the same entry again is a no-op
+    cache.store("key", outdir)
+
+    assert cache.restore("key", restored)
+    assert (restored / "stacks" / "CDKTF" / "cdk.tf.json").read_text() == "{}"
+    assert (restored / "manifest.json").exists()
+    assert [e.name for e in (tmp_path / "cache").iterdir()] == ["key"]
+
+
+def test_synth_cache_restore_replaces_stale_stacks(
+    tmp_path: Path, outdir: Path
+) -> None:
+    """Test files of a previous synth don't survive a restore."""
+    cache = SynthCache(tmp_path / "cache")
+    cache.store("key", outdir)
+    restored = tmp_path / "restored"
+    stale = restored / "stacks" / "removed" / "cdk.tf.json"
+    stale.parent.mkdir(parents=True)
+    stale.write_text("{}")
+    (restored / "metrics.json").write_text("{}")
+
+    assert cache.restore("key", restored)
+
+    assert not stale.exists()
+    assert (restored / "stacks" / "CDKTF" / "cdk.tf.json").exists()
+    # not part of the synthesized output
+    assert (restored / "metrics.json").exists()
+
+
+def test_synth_cache_lru_eviction(tmp_path: Path, outdir: Path) -> None:
+    """Test the least recently used entries are evicted."""
+    cache = SynthCache(tmp_path / "cache", max_entries=2)
+    cache.store("a", outdir)
+    cache.store("b", outdir)
+    os.utime(tmp_path / "cache" / "a", (1, 1))
+    os.utime(tmp_path / "cache" / "b", (2, 2))
+    assert cache.restore("a", tmp_path / "restored")
+
+    cache.store("c", outdir)
+
+    assert sorted(e.name for e in (tmp_path / "cache").iterdir()) == ["a", "c"]
@@ -0,0 +1,845 @@
+import io
+import json
+import os
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from botocore.awsrequest import AWSPreparedRequest, AWSResponse, HTTPHeaders
+from botocore.stub import Stubber
+from external_resources_io.terraform import TerraformJsonPlanParser
+from validate_plan import (
+    AWSApi,
+    BatchValidator,
+    DiskCache,
+    ElasticachePlanValidator,
+    RetryPolicy,
+    TokenBucket,
+    find_plan_pairs,
+    main,
+)
+
+from er_aws_elasticache.app_interface_input import AppInterfaceInput
+
+
+@pytest.fixture
+def plan_data() -> dict:
+    """Fixture to provide a terraform plan creating a replication and a parameter group."""
+    return {
+        "format_version": "1.2",
+        "resource_changes": [
+            {
+                "address": "aws_elasticache_replication_group.example-elasticache",
+                "type": "aws_elasticache_replication_group",
+                "name": "example-elasticache",
+                "change": {
+                    "actions": ["create"],
+                    "after": {
+                        "replication_group_id": "elasticache-example-01",
+                        "subnet_group_name": "default",
+                        "security_group_ids": ["sg-123456789"],
+                    },
+                    "after_unknown": {},
+                },
+            },
+            {
+                "address": "aws_elasticache_parameter_group.elasticache-example-01-pg",
+                "type": "aws_elasticache_parameter_group",
+                "name": "elasticache-example-01-pg",
+                "change": {
+                    "actions": ["create"],
+                    "after": {"name": "elasticache-example-01-pg"},
+                    "after_unknown": {},
+                },
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def plan(tmp_path: Path, plan_data: dict) -> TerraformJsonPlanParser:
+    """Fixture to provide the parsed terraform plan."""
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(plan_data))
+    return TerraformJsonPlanParser(plan_path=str(plan_json))
+
+
+@pytest.fixture
+def aws_api() -> AWSApi:
+    """Fixture to provide an AWSApi instance."""
+    return AWSApi(config_options={"region_name": "us-east-1"})
+
+
+def add_valid_responses(
+    elasticache: Stubber, ec2: Stubber, security_group_vpc: str | None = "vpc-1"
+) -> None:
+    """Queue the responses of a successful validation run.
+
+    Without security_group_vpc, the security group is expected to be cached.
+    """
+    elasticache.add_client_error(
+        "describe_replication_groups",
+        service_error_code="ReplicationGroupNotFoundFault",
+        expected_params={"ReplicationGroupId": "elasticache-example-01"},
+    )
+    elasticache.add_response(
+        "describe_cache_subnet_groups",
+        {
+            "CacheSubnetGroups": [
+                {
+                    "CacheSubnetGroupName": "default",
+                    "Subnets": [
+                        {"SubnetIdentifier": "subnet-1"},
+                        {"SubnetIdentifier": "subnet-2"},
+                    ],
+                }
+            ]
+        },
+        expected_params={"CacheSubnetGroupName": "default"},
+    )
+    ec2.add_response(
+        "describe_subnets",
+        {
+            "Subnets": [
+                {"SubnetId": "subnet-1", "VpcId": "vpc-1"},
+                {"SubnetId": "subnet-2", "VpcId": "vpc-1"},
+            ]
+        },
+        expected_params={"SubnetIds": ["subnet-1", "subnet-2"]},
+    )
+    if security_group_vpc:
+        ec2.add_response(
+            "describe_security_groups",
+            {
+                "SecurityGroups": [
+                    {"GroupId": "sg-123456789", "VpcId": security_group_vpc}
+                ]
+            },
+            expected_params={"GroupIds": ["sg-123456789"]},
+        )
+    elasticache.add_client_error(
+        "describe_cache_parameter_groups",
+        service_error_code="CacheParameterGroupNotFound",
+        expected_params={"CacheParameterGroupName": "elasticache-example-01-pg"},
+    )
+
+
+def test_aws_api_reuses_clients(aws_api: AWSApi) -> None:
+    """Test that AWSApi creates one client per service."""
+    assert aws_api.client is aws_api.client
+    assert aws_api.ec2_client is aws_api.ec2_client
+
+
+def test_aws_api_memoizes_describe_calls(aws_api: AWSApi) -> None:
+    """Test that describe results are fetched only once."""
+    with Stubber(aws_api.ec2_client) as ec2:
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-1", "VpcId": "vpc-1"}]},
+            expected_params={"GroupIds": ["sg-1"]},
+        )
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-2", "VpcId": "vpc-1"}]},
+            expected_params={"GroupIds": ["sg-2"]},
+        )
+        assert [sg["GroupId"] for sg in aws_api.get_security_groups(["sg-1"])] == [
+            "sg-1"
+        ]
+        assert [
+            sg["GroupId"] for sg in aws_api.get_security_groups(["sg-1", "sg-2"])
+        ] == ["sg-1", "sg-2"]
+        assert [
+            sg["GroupId"] for sg in aws_api.get_security_groups(["sg-2", "sg-1"])
+        ] == ["sg-2", "sg-1"]
+        ec2.assert_no_pending_responses()
+
+    assert aws_api.calls["describe_security_groups"] == 2  # noqa: PLR2004
+    assert aws_api.cache_hits["describe_security_groups"] == 3  # noqa: PLR2004
+
+
+def test_aws_api_existence_index() -> None:
+    """Test the existence checks are answered from the paginated index."""
+    aws_api = AWSApi(config_options={"region_name": "us-east-1"}, use_index=True)
+    with Stubber(aws_api.client) as elasticache:
+        elasticache.add_response(
+            "describe_replication_groups",
+            {"ReplicationGroups": [{"ReplicationGroupId": "rg-1"}], "Marker": "m"},
+            expected_params={},
+        )
+        elasticache.add_response(
+            "describe_replication_groups",
+            {"ReplicationGroups": [{"ReplicationGroupId": "rg-2"}]},
+            expected_params={"Marker": "m"},
+        )
+        elasticache.add_response(
+            "describe_cache_parameter_groups",
+            {"CacheParameterGroups": [{"CacheParameterGroupName": "pg-1"}]},
+            expected_params={},
+        )
+        assert aws_api.replication_group_exists("rg-1")
+        assert aws_api.replication_group_exists("rg-2")
+        assert not aws_api.replication_group_exists("rg-3")
+        assert aws_api.parameter_group_exists("pg-1")
+        assert not aws_api.parameter_group_exists("pg-2")
+        elasticache.assert_no_pending_responses()
+
+    assert aws_api.calls["describe_replication_groups"] == 2  # noqa: PLR2004
+    assert aws_api.cache_hits["describe_replication_groups"] == 2  # noqa: PLR2004
+    assert aws_api.calls["describe_cache_parameter_groups"] == 1
+
+
+def test_aws_api_existence_index_is_rebuilt_when_stale() -> None:
+    """Test a stale index is rebuilt."""
+    aws_api = AWSApi(
+        config_options={"region_name": "us-east-1"}, use_index=True, index_max_age=0
+    )
+    with Stubber(aws_api.client) as elasticache:
+        elasticache.add_response(
+            "describe_replication_groups", {"ReplicationGroups": []}
+        )
+        elasticache.add_response(
+            "describe_replication_groups",
+            {"ReplicationGroups": [{"ReplicationGroupId": "rg-1"}]},
+        )
+        assert not aws_api.replication_group_exists("rg-1")
+        time.sleep(0.01)
+        assert aws_api.replication_group_exists("rg-1")
+        elasticache.assert_no_pending_responses()
+
+
+def test_validator_valid_plan(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput
+) -> None:
+    """Test a successful validation."""
+    validator = ElasticachePlanValidator(plan, ai_input)
+    with (
+        Stubber(validator.aws_api.client) as elasticache,
+        Stubber(validator.aws_api.ec2_client) as ec2,
+    ):
+        add_valid_responses(elasticache, ec2)
+        assert validator.validate()
+        elasticache.assert_no_pending_responses()
+        ec2.assert_no_pending_responses()
+    assert not validator.errors
+
+
+def test_validator_skips_global_datastore_secondaries(
+    tmp_path: Path, plan_data: dict, raw_input_data: dict
+) -> None:
+    """Test the secondaries in other regions aren't validated against the input region."""
+    raw_input_data["data"] |= {
+        "node_type": "cache.r6g.large",
+        "global_datastore": {
+            "global_replication_group_id_suffix": "example",
+            "secondaries": [
+                {"region": "us-west-2", "replication_group_id": "secondary"}
+            ],
+        },
+    }
+    plan_data["resource_changes"].append({
+        "address": "aws_elasticache_replication_group.example-elasticache-us-west-2",
+        "type": "aws_elasticache_replication_group",
+        "name": "example-elasticache-us-west-2",
+        "change": {
+            "actions": ["create"],
+            "after": {"replication_group_id": "secondary"},
+            "after_unknown": {},
+        },
+    })
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)),
+        AppInterfaceInput.model_validate(raw_input_data),
+    )
+    assert [u.name for u in validator.elasticache_replication_group_updates] == [
+        "example-elasticache"
+    ]
+
+
+def replace_replication_group(plan_data: dict) -> None:
+    """Turn the replication group create of the plan into a replace."""
+    change = plan_data["resource_changes"][0]["change"]
+    change |= {
+        "actions": ["delete", "create"],
+        "before": change["after"] | {"transit_encryption_enabled": False},
+    }
+    change["after"] |= {"transit_encryption_enabled": True}
+
+
+def test_validator_change_policy_fails_destroy(
+    tmp_path: Path, plan_data: dict, ai_input: AppInterfaceInput
+) -> None:
+    """Test a replace of the replication group fails with the default policy."""
+    replace_replication_group(plan_data)
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)), ai_input
+    )
+    assert validator._check_change_impacts() == [  # noqa: SLF001
+        "Disruptive change not allowed by the change_policy: "
+        "aws_elasticache_replication_group.example-elasticache: destroy "
+        "(replaced because of transit_encryption_enabled, the new cache starts empty)"
+    ]
+
+
+def test_validator_change_policy_warns(
+    tmp_path: Path, plan_data: dict, raw_input_data: dict
+) -> None:
+    """Test the change_policy can turn a failing impact into a warning."""
+    raw_input_data["data"]["change_policy"] = {"destroy": "warn"}
+    replace_replication_group(plan_data)
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)),
+        AppInterfaceInput.model_validate(raw_input_data),
+    )
+    assert not validator._check_change_impacts()  # noqa: SLF001
+    assert len(validator.warnings) == 1
+    assert "destroy" in validator.warnings[0]
+
+
+def test_validator_change_policy_allows_replace(
+    tmp_path: Path, plan_data: dict, raw_input_data: dict
+) -> None:
+    """Test a replace allowed by the change_policy isn't an existing resource."""
+    raw_input_data["data"]["change_policy"] = {"destroy": "allow"}
+    replace_replication_group(plan_data)
+    plan_data["resource_changes"][1]["change"] |= {
+        "actions": ["delete", "create"],
+        "before": {"name": "elasticache-example-01-pg"},
+    }
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)),
+        AppInterfaceInput.model_validate(raw_input_data),
+    )
+    with (
+        Stubber(validator.aws_api.client) as elasticache,
+        Stubber(validator.aws_api.ec2_client) as ec2,
+    ):
+        # only the network is checked
+        elasticache.add_response(
+            "describe_cache_subnet_groups",
+            {"CacheSubnetGroups": [{"Subnets": [{"SubnetIdentifier": "subnet-1"}]}]},
+        )
+        ec2.add_response(
+            "describe_subnets",
+            {"Subnets": [{"SubnetId": "subnet-1", "VpcId": "vpc-1"}]},
+        )
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-123456789", "VpcId": "vpc-1"}]},
+        )
+        assert validator.validate()
+        elasticache.assert_no_pending_responses()
+    assert validator.errors == []
+
+
+def test_validator_aws_stats(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput
+) -> None:
+    """Test the latency and retries of every AWS request are recorded."""
+    validator = ElasticachePlanValidator(plan, ai_input)
+    assert validator.aws_stats() == {}
+    with (
+        Stubber(validator.aws_api.client) as elasticache,
+        Stubber(validator.aws_api.ec2_client) as ec2,
+    ):
+        add_valid_responses(elasticache, ec2)
+        validator.validate()
+
+    stats = validator.aws_stats()
+    assert set(stats) == {
+        "describe_cache_parameter_groups",
+        "describe_cache_subnet_groups",
+        "describe_replication_groups",
+        "describe_security_groups",
+        "describe_subnets",
+    }
+    for operation_stats in stats.values():
+        assert operation_stats["calls"] == operation_stats["requests"] == 1
+        assert operation_stats["retries"] == 0
+        assert operation_stats["total_ms"] >= operation_stats["max_ms"] > 0
+
+
+def test_validator_existing_resources(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput
+) -> None:
+    """Test the validation fails for already existing resources."""
+    validator = ElasticachePlanValidator(plan, ai_input)
+    with (
+        Stubber(validator.aws_api.client) as elasticache,
+        Stubber(validator.aws_api.ec2_client) as ec2,
+    ):
+        elasticache.add_response("describe_replication_groups", {})
+        elasticache.add_response(
+            "describe_cache_subnet_groups",
+            {"CacheSubnetGroups": [{"Subnets": [{"SubnetIdentifier": "subnet-1"}]}]},
+        )
+        ec2.add_response(
+            "describe_subnets",
+            {"Subnets": [{"SubnetId": "subnet-1", "VpcId": "vpc-1"}]},
+        )
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-123456789", "VpcId": "vpc-2"}]},
+        )
+        elasticache.add_response("describe_cache_parameter_groups", {})
+        assert not validator.validate()
+
+    assert validator.errors == [
+        "Replication group ID elasticache-example-01 already exists!",
+        "Security group sg-123456789 does not belong to the same VPC as the subnets",
+        "Parameter group elasticache-example-01-pg already exists!",
+    ]
+
+
+@pytest.fixture
+def serverless_plan_data(plan_data: dict) -> dict:
+    """Fixture to provide a terraform plan creating a serverless cache instead."""
+    plan_data["resource_changes"][0] = {
+        "address": "aws_elasticache_serverless_cache.example-elasticache",
+        "type": "aws_elasticache_serverless_cache",
+        "name": "example-elasticache",
+        "change": {
+            "actions": ["create"],
+            "after": {
+                "name": "elasticache-example-01",
+                "security_group_ids": ["sg-123456789"],
+            },
+            "after_unknown": {},
+        },
+    }
+    return plan_data
+
+
+def test_validator_existing_serverless_cache(
+    tmp_path: Path, serverless_plan_data: dict, ai_input: AppInterfaceInput
+) -> None:
+    """Test the validation fails for an already existing serverless cache."""
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(serverless_plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)), ai_input
+    )
+    with Stubber(validator.aws_api.client) as elasticache:
+        elasticache.add_response(
+            "describe_serverless_caches",
+            {"ServerlessCaches": [{"ServerlessCacheName": "elasticache-example-01"}]},
+            expected_params={"ServerlessCacheName": "elasticache-example-01"},
+        )
+        elasticache.add_client_error(
+            "describe_cache_parameter_groups",
+            service_error_code="CacheParameterGroupNotFound",
+        )
+        assert not validator.validate()
+
+    assert validator.errors == [
+        "Serverless cache elasticache-example-01 already exists!"
+    ]
+
+
+def test_validator_change_policy_covers_serverless_caches(
+    tmp_path: Path, serverless_plan_data: dict, ai_input: AppInterfaceInput
+) -> None:
+    """Test a replace of a serverless cache fails with the default policy."""
+    change = serverless_plan_data["resource_changes"][0]["change"]
+    change |= {
+        "actions": ["delete", "create"],
+        "before": change["after"] | {"kms_key_id": None},
+    }
+    change["after"] |= {"kms_key_id": "key"}
+    plan_json = tmp_path / "plan.json"
+    plan_json.write_text(json.dumps(serverless_plan_data))
+    validator = ElasticachePlanValidator(
+        TerraformJsonPlanParser(plan_path=str(plan_json)), ai_input
+    )
+    assert validator._check_change_impacts() == [  # noqa: SLF001
+        "Disruptive change not allowed by the change_policy: "
+        "aws_elasticache_serverless_cache.example-elasticache: destroy "
+        "(replaced because of kms_key_id, the new cache starts empty)"
+    ]
+
+
+class FakeAWSApi(AWSApi):
+    """AWSApi with a slow in-memory backend."""
+
+    def __init__(self) -> None:
+        super().__init__(config_options={"region_name": "us-east-1"})
+        self.threads: set[int] = set()
+
+    def _backend_call(self) -> None:
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+
+    def replication_group_exists(self, replication_group_id: str) -> bool:  # noqa: ARG002
+        """Fake replication group lookup."""
+        self._backend_call()
+        return True
+
+    def parameter_group_exists(self, name: str) -> bool:  # noqa: ARG002
+        """Fake parameter group lookup."""
+        self._backend_call()
+        return True
+
+    def get_cache_group_subnets(self, cache_subnet_group_name: str) -> list:  # noqa: ARG002
+        """Fake subnet group lookup."""
+        self._backend_call()
+        return [{"SubnetIdentifier": "subnet-1"}]
+
+    def get_subnets(self, subnets: Sequence[str]) -> list:
+        """Fake subnet lookup."""
+        self._backend_call()
+        return [{"SubnetId": s, "VpcId": "vpc-1"} for s in subnets]
+
+    def get_security_groups(self, security_groups: Sequence[str]) -> list:
+        """Fake security group lookup."""
+        self._backend_call()
+        return [{"GroupId": sg, "VpcId": "vpc-2"} for sg in security_groups]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_validator_concurrent_errors_are_deterministic(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput, max_workers: int
+) -> None:
+    """Test the errors don't depend on the number of workers."""
+    fake_api = FakeAWSApi()
+    validator = ElasticachePlanValidator(
+        plan,
+        ai_input,
+        max_workers=max_workers,
+        aws_api=fake_api,
+    )
+    assert not validator.validate()
+    assert validator.errors == [
+        "Replication group ID elasticache-example-01 already exists!",
+        "Security group sg-123456789 does not belong to the same VPC as the subnets",
+        "Parameter group elasticache-example-01-pg already exists!",
+    ]
+    assert (len(fake_api.threads) > 1) == (max_workers > 1)
+
+
+def test_aws_api_concurrent_lookups_are_fetched_once(aws_api: AWSApi) -> None:
+    """Test that concurrent callers share one fetch of the same key."""
+    fetches = []
+
+    def fetch() -> str:
+        fetches.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda _: aws_api._memoized("op", "key", fetch),  # noqa: SLF001
+                range(8),
+            )
+        )
+    assert results == ["result"] * 8
+    assert len(fetches) == 1
+    assert aws_api.calls["op"] == 1
+    assert aws_api.cache_hits["op"] == 7  # noqa: PLR2004
+
+
+def test_aws_api_failed_lookups_are_not_cached(aws_api: AWSApi) -> None:
+    """Test that a failed fetch is retried on the next lookup."""
+
+    def fail() -> str:
+        raise RuntimeError("throttled")
+
+    with pytest.raises(RuntimeError):
+        aws_api._memoized("op", "key", fail)  # noqa: SLF001
+    assert aws_api._memoized("op", "key", lambda: "result") == "result"  # noqa: SLF001
+
+
+@pytest.fixture
+def batch_dir(tmp_path: Path, raw_input_data: dict, plan_data: dict) -> Path:
+    """Fixture to provide a directory with two resources to validate."""
+    for name in ("b", "a"):
+        resource_dir = tmp_path / "batch" / name
+        resource_dir.mkdir(parents=True)
+        (resource_dir / "input.json").write_text(json.dumps(raw_input_data))
+        (resource_dir / "plan.json").write_text(json.dumps(plan_data))
+    (tmp_path / "batch" / "no-plan").mkdir()
+    (tmp_path / "batch" / "no-plan" / "input.json").write_text("{}")
+    return tmp_path / "batch"
+
+
+def test_find_plan_pairs(batch_dir: Path) -> None:
+    """Test the batch arguments expansion."""
+    assert list(find_plan_pairs([str(batch_dir), "in.json:plan.json"])) == [
+        (batch_dir / "a" / "input.json", batch_dir / "a" / "plan.json"),
+        (batch_dir / "b" / "input.json", batch_dir / "b" / "plan.json"),
+        (Path("in.json"), Path("plan.json")),
+    ]
+
+
+def test_main_rejects_many_plans_without_batch(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture, batch_dir: Path
+) -> None:
+    """Test extra plans aren't silently ignored outside of batch mode."""
+    monkeypatch.setattr(
+        "sys.argv",
+        ["validate_plan.py", str(batch_dir / "a" / "plan.json"), str(batch_dir / "b")],
+    )
+    with pytest.raises(SystemExit, match="2"):
+        main()
+    assert "validate one plan at a time" in capsys.readouterr().err
+
+
+def test_batch_validator_shares_lookups(batch_dir: Path) -> None:
+    """Test the batch validation results and the shared AWS lookups."""
+    batch = BatchValidator(max_workers=2)
+    batch.aws_apis["us-east-1"] = fake_api = FakeAWSApi()
+    output = io.StringIO()
+    pairs = [*find_plan_pairs([str(batch_dir)]), (batch_dir / "missing", batch_dir)]
+
+    assert not batch.run(pairs, output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r["input"] for r in results] == [str(p[0]) for p in pairs]
+    assert results[0] == {
+        "input": str(batch_dir / "a" / "input.json"),
+        "plan": str(batch_dir / "a" / "plan.json"),
+        "identifier": "example-elasticache",
+        "valid": False,
+        "errors": [
+            "Replication group ID elasticache-example-01 already exists!",
+            "Security group sg-123456789 does not belong to the same VPC as the subnets",
+            "Parameter group elasticache-example-01-pg already exists!",
+        ],
+        "warnings": [],
+        "exit_code": 1,
+    }
+    assert results[1]["errors"] == results[0]["errors"]
+    assert results[2]["valid"] is False
+    assert results[2]["errors"][0].startswith("FileNotFoundError")
+    assert list(batch.aws_apis.values()) == [fake_api]
+
+
+@pytest.fixture
+def disk_cache(tmp_path: Path) -> DiskCache:
+    """Fixture to provide an empty disk cache."""
+    return DiskCache(tmp_path / "cache" / "validate_plan.sqlite3")
+
+
+def stub_account(aws_api: AWSApi) -> Stubber:
+    """Stub the caller identity lookup of the disk cache keys."""
+    sts = Stubber(aws_api._client("sts"))  # noqa: SLF001
+    sts.add_response("get_caller_identity", {"Account": "123456789012"})
+    sts.activate()
+    return sts
+
+
+def test_disk_cache_ttl_and_eviction(tmp_path: Path) -> None:
+    """Test expired and the oldest entries are dropped."""
+    cache = DiskCache(tmp_path / "cache.sqlite3", ttl=0.05, max_entries=2)
+    cache.set({"a": {"value": 1}})
+    cache.set({"b": 2})
+    cache.set({"c": 3})
+    assert cache.get("a") is None
+    assert cache.get("b") == 2  # noqa: PLR2004
+    assert cache.get("c") == 3  # noqa: PLR2004
+    assert DiskCache(tmp_path / "cache.sqlite3", bypass=True).get("c") is None
+    time.sleep(0.1)
+    assert cache.get("c") is None
+
+
+def test_aws_api_disk_cache_is_shared_across_runs(disk_cache: DiskCache) -> None:
+    """Test a second run reads the security groups from the disk cache."""
+    first = AWSApi(config_options={"region_name": "us-east-1"}, disk_cache=disk_cache)
+    stub_account(first)
+    with Stubber(first.ec2_client) as ec2:
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-1", "VpcId": "vpc-1"}]},
+        )
+        first.get_security_groups(["sg-1"])
+
+    second = AWSApi(config_options={"region_name": "us-east-1"}, disk_cache=disk_cache)
+    stub_account(second)
+    with Stubber(second.ec2_client) as ec2:
+        ec2.add_response(
+            "describe_security_groups",
+            {"SecurityGroups": [{"GroupId": "sg-2", "VpcId": "vpc-1"}]},
+            expected_params={"GroupIds": ["sg-2"]},
+        )
+        assert second.get_security_groups(["sg-1", "sg-2"]) == [
+            {"GroupId": "sg-1", "VpcId": "vpc-1"},
+            {"GroupId": "sg-2", "VpcId": "vpc-1"},
+        ]
+        ec2.assert_no_pending_responses()
+    assert second.disk_hits["describe_security_groups"] == 1
+    assert second.calls["describe_security_groups"] == 1
+
+
+def test_validator_rechecks_stale_disk_cache_entries(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput, disk_cache: DiskCache
+) -> None:
+    """Test an error caused by a stale disk cache entry is re-checked with fresh data."""
+    aws_api = AWSApi(config_options={"region_name": "us-east-1"}, disk_cache=disk_cache)
+    stub_account(aws_api)
+    # the security group moved to another VPC since it was cached
+    disk_cache.set({
+        "123456789012/us-east-1/describe_security_groups/sg-123456789": {
+            "GroupId": "sg-123456789",
+            "VpcId": "vpc-old",
+        }
+    })
+    validator = ElasticachePlanValidator(plan, ai_input, aws_api=aws_api)
+    with (
+        Stubber(aws_api.client) as elasticache,
+        Stubber(aws_api.ec2_client) as ec2,
+    ):
+        add_valid_responses(elasticache, ec2)
+        assert validator.validate()
+        elasticache.assert_no_pending_responses()
+        ec2.assert_no_pending_responses()
+    assert aws_api.disk_hits["describe_security_groups"] == 1
+
+
+def test_validator_trusts_disk_cache_passes(
+    plan: TerraformJsonPlanParser, ai_input: AppInterfaceInput, disk_cache: DiskCache
+) -> None:
+    """Test a pass based on a disk cache entry doesn't fetch it again."""
+    aws_api = AWSApi(config_options={"region_name": "us-east-1"}, disk_cache=disk_cache)
+    stub_account(aws_api)
+    disk_cache.set({
+        "123456789012/us-east-1/describe_security_groups/sg-123456789": {
+            "GroupId": "sg-123456789",
+            "VpcId": "vpc-1",
+        }
+    })
+    validator = ElasticachePlanValidator(plan, ai_input, aws_api=aws_api)
+    with (
+        Stubber(aws_api.client) as elasticache,
+        Stubber(aws_api.ec2_client) as ec2,
+    ):
+        add_valid_responses(elasticache, ec2, security_group_vpc=None)
+        assert validator.validate()
+        ec2.assert_no_pending_responses()
+    assert aws_api.disk_hits["describe_security_groups"] == 1
+    assert aws_api.calls["describe_security_groups"] == 0
+
+
+def test_aws_api_invalidates_only_the_tracked_disk_hits(
+    disk_cache: DiskCache,
+) -> None:
+    """Test a check only invalidates the disk hits it used itself."""
+    aws_api = AWSApi(config_options={"region_name": "us-east-1"}, disk_cache=disk_cache)
+    stub_account(aws_api)
+    disk_cache.set({
+        f"123456789012/us-east-1/describe_security_groups/{sg}": {
+            "GroupId": sg,
+            "VpcId": "vpc-1",
+        }
+        for sg in ("sg-1", "sg-2")
+    })
+    with aws_api.track_disk_hits() as other:
+        aws_api.get_security_groups(["sg-2"])
+    with aws_api.track_disk_hits() as disk_hits:
+        aws_api.get_security_groups(["sg-1"])
+    assert disk_hits == {("describe_security_groups", "sg-1")}
+
+    aws_api.invalidate_disk_hits(disk_hits)
+
+    with aws_api.track_disk_hits() as still_cached:
+        aws_api.get_security_groups(["sg-2"])
+    assert still_cached == other
+    assert aws_api.calls["describe_security_groups"] == 0
+
+
+def test_token_bucket_limits_the_rate() -> None:
+    """Test the bucket grants bursts and then waits for new tokens."""
+    rate, waiting = 100, 4
+    bucket = TokenBucket(rate=rate, burst=2)
+    assert bucket.acquire() == bucket.acquire() == 0
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=waiting) as executor:
+        waits = list(executor.map(lambda _: bucket.acquire(), range(waiting)))
+    assert all(waits)
+    assert time.monotonic() - start >= (waiting - 0.5) / rate
+
+
+def test_token_bucket_with_a_rate_below_one() -> None:
+    """Test a rate below one token per second still grants a first token."""
+    bucket = TokenBucket(rate=0.5)
+    assert bucket.burst == 1
+    assert bucket.acquire() == 0
+
+
+def test_retry_policy_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the retry policy configures the clients."""
+    monkeypatch.setenv("ER_VALIDATE_RETRY_MODE", "standard")
+    monkeypatch.setenv("ER_VALIDATE_RETRY_MAX_ATTEMPTS", "4")
+    monkeypatch.setenv("ER_VALIDATE_MAX_RPS", "5.0")
+    policy = RetryPolicy.from_env()
+    assert policy.rate_limiter
+    assert policy.rate_limiter.rate == float(os.environ["ER_VALIDATE_MAX_RPS"])
+
+    aws_api = AWSApi(config_options={"region_name": "us-east-1"}, retry_policy=policy)
+    assert aws_api.client.meta.config.retries == {  # type: ignore[attr-defined]
+        "mode": "standard",
+        "total_max_attempts": int(os.environ["ER_VALIDATE_RETRY_MAX_ATTEMPTS"]),
+    }
+
+
+class FakeRaw:
+    """Raw HTTP response body."""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def stream(self) -> list[bytes]:
+        """Stream the body."""
+        return [self.body]
+
+
+def test_aws_api_counts_throttles_and_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test throttled attempts are retried and counted."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # don't wait for the real exponential backoff
+    backoff, sleep = 0.01, time.sleep
+    monkeypatch.setattr(time, "sleep", lambda _: sleep(backoff))
+    throttled = [
+        (400, b"<ErrorResponse><Error><Code>Throttling</Code></Error></ErrorResponse>")
+    ] * 2
+    responses = [
+        *throttled,
+        (
+            200,
+            b"<DescribeReplicationGroupsResponse><DescribeReplicationGroupsResult>"
+            b"<ReplicationGroups/></DescribeReplicationGroupsResult>"
+            b"</DescribeReplicationGroupsResponse>",
+        ),
+    ]
+    aws_api = AWSApi(
+        config_options={"region_name": "us-east-1"},
+        retry_policy=RetryPolicy(
+            mode="standard",
+            max_attempts=len(responses),
+            rate_limiter=TokenBucket(rate=1000),
+        ),
+    )
+
+    def send(request: AWSPreparedRequest, **_: object) -> AWSResponse:
+        status, body = responses.pop(0)
+        return AWSResponse(request.url, status, HTTPHeaders(), FakeRaw(body))
+
+    aws_api.client.meta.events.register("before-send", send)  # type: ignore[arg-type]
+    assert aws_api.replication_group_exists("rg-1")
+
+    stats = aws_api.stats()["describe_replication_groups"]
+    assert stats["requests"] == 1
+    assert stats["retries"] == stats["throttles"] == len(throttled)
+    assert stats["backoff_ms"] >= len(throttled) * backoff * 1000
+    assert not responses
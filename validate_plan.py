@@ -1,12 +1,22 @@
+"""Validate the terraform plan of an Elasticache external resource"""
+
+import argparse
+import json
 import logging
 import os
+import sqlite3
 import sys
-from collections.abc import Mapping, Sequence
-from typing import TYPE_CHECKING, Any
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import starmap
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO, TypeVar
 
-from boto3 import Session
-from botocore.config import Config
-from external_resources_io.input import parse_model, read_input_from_file
 from external_resources_io.terraform import (
     Action,
     ResourceChange,
@@ -14,6 +24,7 @@ from external_resources_io.terraform import (
 )
 
 if TYPE_CHECKING:
+    from botocore.model import OperationModel
     from mypy_boto3_ec2.client import EC2Client
     from mypy_boto3_ec2.type_defs import SecurityGroupTypeDef
     from mypy_boto3_ec2.type_defs import SubnetTypeDef as EC2SubnetTypeDef
@@ -21,112 +32,800 @@ if TYPE_CHECKING:
     from mypy_boto3_elasticache.type_defs import (
         SubnetTypeDef as ElasticacheSubnetTypeDef,
     )
+
+    from er_aws_elasticache.app_interface_input import ChangePolicy, StackInput
 else:
     ElastiCacheClient = EC2Client = ElasticacheSubnetTypeDef = EC2SubnetTypeDef = (
         SecurityGroupTypeDef
-    ) = object
+    ) = OperationModel = object
 
-from er_aws_elasticache.app_interface_input import AppInterfaceInput
+from er_aws_elasticache.change_impact import ChangeAnalyzer, ChangeImpact
+from er_aws_elasticache.instrumentation import Metrics, metrics_enabled, profiling
+from er_aws_elasticache.plan_reader import ResourceChangeIndex
 
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("botocore").setLevel(logging.ERROR)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# boto3 defaults to 10 pooled connections per client
+MAX_POOL_CONNECTIONS = 20
+DEFAULT_VALIDATE_MAX_WORKERS = 4
+# seconds an existence index is trusted before it is rebuilt
+DEFAULT_INDEX_MAX_AGE = 300
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+DEFAULT_RETRY_MODE = "adaptive"
+DEFAULT_MAX_ATTEMPTS = 10
+# the error codes botocore's standard retry mode treats as throttling
+THROTTLING_ERROR_CODES = frozenset({
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "TransactionInProgressException",
+    "RequestLimitExceeded",
+    "BandwidthLimitExceeded",
+    "LimitExceededException",
+    "RequestThrottled",
+    "SlowDown",
+    "PriorRequestNotComplete",
+    "EC2ThrottledException",
+})
+# the only resource changes read from the plan
+VALIDATED_RESOURCE_TYPES = (
+    "aws_elasticache_replication_group",
+    "aws_elasticache_serverless_cache",
+    "aws_elasticache_parameter_group",
+)
+
+
+def is_replace(change: ResourceChange) -> bool:
+    """A create which replaces an existing resource, see the change_policy."""
+    return bool(change.change and Action.ActionDelete in change.change.actions)
+
+
+class DiskCache:
+    """Persistent cache for rarely changing AWS lookups, shared by parallel runs
+
+    Entries expire ttl seconds after they were written and the oldest entries are
+    evicted once more than max_entries are stored. SQLite serializes the writers of
+    concurrent runs. With bypass, entries are never read but still refreshed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        *,
+        bypass: bool = False,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)"
+            )
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Get a not expired entry"""
+        if self.bypass:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, items: Mapping[str, Any]) -> None:
+        """Store entries and evict the expired and the oldest ones"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                [(k, json.dumps(v, default=str), now) for k, v in items.items()],
+            )
+            self._db.execute(
+                "DELETE FROM cache WHERE created_at <= ?", (now - self.ttl,)
+            )
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, keys: Iterable[str]) -> None:
+        """Delete entries"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM cache WHERE key = ?", [(k,) for k in keys]
+            )
+
+    @classmethod
+    def from_env(cls, *, bypass: bool = False) -> "DiskCache | None":
+        """The cache configured by the ER_VALIDATE_CACHE_* environment variables"""
+        if not (cache_dir := os.environ.get("ER_VALIDATE_CACHE_DIR")):
+            return None
+        return cls(
+            Path(cache_dir) / "validate_plan.sqlite3",
+            ttl=float(os.environ.get("ER_VALIDATE_CACHE_TTL", DEFAULT_CACHE_TTL)),
+            max_entries=int(
+                os.environ.get(
+                    "ER_VALIDATE_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES
+                )
+            ),
+            bypass=bypass,
+        )
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter
+
+    Grants rate tokens per second with bursts of up to burst tokens. Waiting
+    callers reserve their token up front, so they are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("The rate must be positive")
+        self.rate = rate
+        # a burst below one token would make every caller wait
+        self.burst = max(1.0, burst or rate)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for it if needed; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            wait = max(0, -self._tokens / self.rate)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class RetryPolicy:
+    """How the AWS calls are retried and rate limited
+
+    mode and max_attempts, including the first attempt, configure the botocore
+    retries; in adaptive mode the
+    clients back off and slow down on their own when AWS throttles them. The
+    optional rate_limiter caps the request rate of all clients sharing it, e.g. all
+    threads and regions of a batch run.
+    """
+
+    def __init__(
+        self,
+        mode: str = DEFAULT_RETRY_MODE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        rate_limiter: TokenBucket | None = None,
+    ) -> None:
+        self.mode = mode
+        self.max_attempts = max_attempts
+        self.rate_limiter = rate_limiter
+
+    @property
+    def retries(self) -> dict[str, Any]:
+        """The retries option of the botocore Config"""
+        return {"mode": self.mode, "total_max_attempts": self.max_attempts}
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """The policy configured by the ER_VALIDATE_RETRY_* environment variables"""
+        max_rps = os.environ.get("ER_VALIDATE_MAX_RPS")
+        return cls(
+            mode=os.environ.get("ER_VALIDATE_RETRY_MODE", DEFAULT_RETRY_MODE),
+            max_attempts=int(
+                os.environ.get("ER_VALIDATE_RETRY_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+            ),
+            rate_limiter=TokenBucket(float(max_rps)) if max_rps else None,
+        )
+
 
 class AWSApi:
-    """AWS Api Class"""
+    """AWS Api Class
+
+    Boto3 clients are created once per service and reused for the lifetime of the
+    instance. The results of all describe calls are memoized, so the same subnet
+    group, subnet or security group is fetched at most once.
+
+    With use_index, the replication group, serverless cache and parameter group
+    existence checks are answered from an index of all of them in the region, built with a few paginated
+    describe calls. The index is rebuilt on the first check after it got older than
+    index_max_age seconds; a group created or deleted in the meantime is only seen
+    after that. Without use_index every check is a point lookup, which is cheaper
+    when only a single plan is validated.
+
+    With a disk_cache, the subnet group, subnet and security group lookups are also
+    persisted across runs, keyed by account, region and resource ID. Only found
+    resources are stored; see track_disk_hits and invalidate_disk_hits for stale
+    entries.
+
+    The retry_policy configures the retries and rate limiting of the clients; the
+    throttled responses, the time spent backing off before retries and waiting for
+    the rate limiter are counted per operation.
+    """
+
+    def __init__(
+        self,
+        config_options: Mapping[str, Any],
+        *,
+        use_index: bool = False,
+        index_max_age: float = DEFAULT_INDEX_MAX_AGE,
+        disk_cache: DiskCache | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.disk_cache = disk_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._from_disk: set[tuple[str, str]] = set()
+        # the disk hits of the check running in the thread, see track_disk_hits
+        self._tracked = threading.local()
+        self.use_index = use_index
+        self.index_max_age = index_max_age
+        self._indexes: dict[str, tuple[float, frozenset[str]]] = {}
+        self._index_lock = threading.Lock()
+        # boto3 takes a quarter of a second to import, only pay for it when needed
+        from boto3 import Session  # noqa: PLC0415
+        from botocore.config import Config  # noqa: PLC0415
 
-    def __init__(self, config_options: Mapping[str, Any]) -> None:
         self.session = Session()
-        self.config = Config(**config_options)
+        self.config = Config(**{
+            "max_pool_connections": MAX_POOL_CONNECTIONS,
+            "retries": self.retry_policy.retries,
+            **config_options,
+        })
+        self._clients: dict[str, Any] = {}
+        self._cache: dict[Hashable, Future] = {}
+        # boto3 sessions are not thread-safe, clients are
+        self._lock = threading.Lock()
+        self.calls: Counter[str] = Counter()
+        self.cache_hits: Counter[str] = Counter()
+        self.disk_hits: Counter[str] = Counter()
+        # latency of every AWS request, including retried ones, and their retries
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.retries: Counter[str] = Counter()
+        self.throttles: Counter[str] = Counter()
+        # seconds per operation
+        self.backoff: dict[str, float] = defaultdict(float)
+        self.rate_limited: dict[str, float] = defaultdict(float)
+        # end of the last failed attempt of the call running in the thread
+        self._attempts = threading.local()
+
+    def _client(self, service_name: str) -> Any:  # noqa: ANN401
+        with self._lock:
+            if service_name not in self._clients:
+                client = self.session.client(service_name, config=self.config)
+                client.meta.events.register("before-parameter-build", self._start_call)
+                client.meta.events.register("after-call", self._end_call)
+                client.meta.events.register("needs-retry", self._end_attempt)
+                client.meta.events.register("before-send", self._start_attempt)
+                self._clients[service_name] = client
+            return self._clients[service_name]
+
+    def _start_call(self, context: dict[str, Any], **_: Any) -> None:  # noqa: ANN401
+        context["started_at"] = time.perf_counter()
+        self._attempts.failed_at = None
+
+    @staticmethod
+    def _operation(event_name: str) -> str:
+        from botocore import xform_name  # noqa: PLC0415
+
+        return xform_name(event_name.rsplit(".", 1)[-1])
+
+    def _end_attempt(
+        self,
+        event_name: str,
+        response: tuple[Any, Mapping[str, Any]] | None,
+        **_: Any,  # noqa: ANN401
+    ) -> None:
+        """Count the throttled attempts, a retry sleeps before the next attempt"""
+        self._attempts.failed_at = time.perf_counter()
+        if response and response[1].get("Error", {}).get("Code") in (
+            THROTTLING_ERROR_CODES
+        ):
+            with self._lock:
+                self.throttles[self._operation(event_name)] += 1
+
+    def _start_attempt(self, event_name: str, **_: Any) -> None:  # noqa: ANN401
+        """Count the backoff before a retry and wait for the rate limiter"""
+        operation = self._operation(event_name)
+        if failed_at := getattr(self._attempts, "failed_at", None):
+            self._attempts.failed_at = None
+            with self._lock:
+                self.backoff[operation] += time.perf_counter() - failed_at
+        if self.retry_policy.rate_limiter:
+            waited = self.retry_policy.rate_limiter.acquire()
+            with self._lock:
+                self.rate_limited[operation] += waited
+
+    def _end_call(
+        self,
+        model: OperationModel,
+        parsed: Mapping[str, Any],
+        context: Mapping[str, Any],
+        **_: Any,  # noqa: ANN401
+    ) -> None:
+        operation = self._operation(model.name)
+        latency = time.perf_counter() - context["started_at"]
+        with self._lock:
+            self.latencies[operation].append(latency)
+            self.retries[operation] += parsed.get("ResponseMetadata", {}).get(
+                "RetryAttempts", 0
+            )
 
     @property
     def client(self) -> ElastiCacheClient:
-        """Gets a boto client"""
-        return self.session.client("elasticache", config=self.config)
+        """Gets the elasticache boto client"""
+        return self._client("elasticache")
 
     @property
     def ec2_client(self) -> EC2Client:
-        """Gets a boto client"""
-        return self.session.client("ec2", config=self.config)
+        """Gets the ec2 boto client"""
+        return self._client("ec2")
+
+    def _memoized(self, operation: str, key: Hashable, fetch: Callable[[], T]) -> T:
+        """Return the cached result for key or call fetch and cache it
+
+        Concurrent callers asking for the same key wait for the first fetch.
+        """
+        cache_key = (operation, key)
+        with self._lock:
+            future = self._cache.get(cache_key)
+            if owner := future is None:
+                future = self._cache[cache_key] = Future()
+                self.calls[operation] += 1
+            else:
+                self.cache_hits[operation] += 1
+        if owner:
+            self._resolve({cache_key: future}, lambda: {cache_key: fetch()})
+        return future.result()
+
+    def _memoized_by_id(
+        self,
+        operation: str,
+        ids: Sequence[str],
+        fetch: Callable[[list[str]], Iterable[tuple[str, R]]],
+        *,
+        persist: bool = False,
+    ) -> list[R]:
+        """Return the cached items for ids, fetching all unknown ones in one call"""
+        futures: dict[str, Future] = {}
+        missing: dict[Hashable, Future] = {}
+        with self._lock:
+            for i in dict.fromkeys(ids):
+                if (operation, i) not in self._cache:
+                    missing[operation, i] = self._cache[operation, i] = Future()
+                futures[i] = self._cache[operation, i]
+            self.cache_hits[operation] += len(futures) - len(missing)
+
+        def fetch_missing() -> dict[Hashable, R | None]:
+            found: dict[str, R] = {}
+            disk_cache = self.disk_cache if persist else None
+            if disk_cache:
+                for i in futures:
+                    if (operation, i) in missing and (
+                        item := disk_cache.get(self._disk_key(operation, i))
+                    ) is not None:
+                        found[i] = item
+            if remaining := [
+                i for i in futures if (operation, i) in missing and i not in found
+            ]:
+                with self._lock:
+                    self.calls[operation] += 1
+                fetched = dict(fetch(remaining))
+                if disk_cache:
+                    disk_cache.set({
+                        self._disk_key(operation, i): item
+                        for i, item in fetched.items()
+                    })
+            else:
+                fetched = {}
+            with self._lock:
+                self.disk_hits[operation] += len(found)
+                self._from_disk.update((operation, i) for i in found)
+            found |= fetched
+            # remember unknown ids too, they won't show up on a second call either
+            return {
+                (operation, i): found.get(i)
+                for i in futures
+                if (operation, i) in missing
+            }
+
+        if missing:
+            self._resolve(missing, fetch_missing)
+        items = [item for f in futures.values() if (item := f.result()) is not None]
+        self._track(operation, futures)
+        return items
+
+    def _track(self, operation: str, ids: Iterable[str]) -> None:
+        """Add the lookups served from disk to the disk hits tracked by the thread"""
+        if (tracked := getattr(self._tracked, "disk_hits", None)) is not None:
+            # also the entries another thread read from disk
+            with self._lock:
+                tracked.update(
+                    key for i in ids if (key := (operation, i)) in self._from_disk
+                )
+
+    def _disk_key(self, operation: str, resource_id: str) -> str:
+        return f"{self.account_id}/{self.client.meta.region_name}/{operation}/{resource_id}"
+
+    @property
+    def account_id(self) -> str:
+        """The AWS account ID of the credentials"""
+        return self._memoized(
+            "get_caller_identity",
+            None,
+            lambda: self._client("sts").get_caller_identity()["Account"],
+        )
+
+    @contextmanager
+    def track_disk_hits(self) -> Iterator[set[tuple[str, str]]]:
+        """Collect the lookups of the calling thread which were served from disk
+
+        A failed check uses it to re-check with fresh data, see
+        invalidate_disk_hits. The set is only complete when the block is left.
+        """
+        previous = getattr(self._tracked, "disk_hits", None)
+        disk_hits: set[tuple[str, str]] = set()
+        self._tracked.disk_hits = disk_hits
+        try:
+            yield disk_hits
+        finally:
+            self._tracked.disk_hits = previous
+
+    def invalidate_disk_hits(self, disk_hits: Iterable[tuple[str, str]]) -> None:
+        """Forget the given lookups served from the disk cache
+
+        The next lookups fetch them again. Entries already refreshed by another
+        check are kept.
+        """
+        with self._lock:
+            stale = self._from_disk.intersection(disk_hits)
+            self._from_disk -= stale
+            for key in stale:
+                self._cache.pop(key, None)
+        if stale and self.disk_cache:
+            self.disk_cache.delete(starmap(self._disk_key, stale))
+
+    def _resolve(
+        self,
+        futures: Mapping[Hashable, Future],
+        fetch: Callable[[], Mapping[Hashable, Any]],
+    ) -> None:
+        """Set the fetched results, failed fetches are not cached"""
+        try:
+            results = fetch()
+        except Exception as e:  # noqa: BLE001 - re-raised by future.result()
+            with self._lock:
+                for key in futures:
+                    del self._cache[key]
+            for future in futures.values():
+                future.set_exception(e)
+            return
+        for key, future in futures.items():
+            future.set_result(results[key])
+
+    def _index(self, operation: str, result_key: str, name_key: str) -> frozenset[str]:
+        """All names listed by a paginated describe operation, rebuilt when stale"""
+        with self._index_lock:
+            if (index := self._indexes.get(operation)) and (
+                time.monotonic() - index[0] <= self.index_max_age
+            ):
+                with self._lock:
+                    self.cache_hits[operation] += 1
+                return index[1]
+            names: set[str] = set()
+            for page in self.client.get_paginator(operation).paginate():  # type: ignore[call-overload]
+                with self._lock:
+                    self.calls[operation] += 1
+                names.update(item[name_key] for item in page[result_key])
+            self._indexes[operation] = (time.monotonic(), frozenset(names))
+            return self._indexes[operation][1]
+
+    def replication_group_exists(self, replication_group_id: str) -> bool:
+        """Check if the Elasticache replication group exists"""
+        if self.use_index:
+            return replication_group_id in self._index(
+                "describe_replication_groups", "ReplicationGroups", "ReplicationGroupId"
+            )
+
+        def fetch() -> bool:
+            try:
+                self.client.describe_replication_groups(
+                    ReplicationGroupId=replication_group_id
+                )
+            except self.client.exceptions.ReplicationGroupNotFoundFault:
+                return False
+            return True
+
+        return self._memoized(
+            "describe_replication_groups", replication_group_id, fetch
+        )
+
+    def serverless_cache_exists(self, name: str) -> bool:
+        """Check if the Elasticache serverless cache exists"""
+        if self.use_index:
+            return name in self._index(
+                "describe_serverless_caches", "ServerlessCaches", "ServerlessCacheName"
+            )
+
+        def fetch() -> bool:
+            try:
+                self.client.describe_serverless_caches(ServerlessCacheName=name)
+            except self.client.exceptions.ServerlessCacheNotFoundFault:
+                return False
+            return True
+
+        return self._memoized("describe_serverless_caches", name, fetch)
+
+    def parameter_group_exists(self, name: str) -> bool:
+        """Check if the Elasticache parameter group exists"""
+        if self.use_index:
+            return name in self._index(
+                "describe_cache_parameter_groups",
+                "CacheParameterGroups",
+                "CacheParameterGroupName",
+            )
+
+        def fetch() -> bool:
+            try:
+                # only the group itself, not all its parameters
+                self.client.describe_cache_parameter_groups(
+                    CacheParameterGroupName=name
+                )
+            except self.client.exceptions.CacheParameterGroupNotFoundFault:
+                return False
+            return True
+
+        return self._memoized("describe_cache_parameter_groups", name, fetch)
 
     def get_cache_group_subnets(
         self, cache_subnet_group_name: str
     ) -> list[ElasticacheSubnetTypeDef]:
         """Get the Elasticache subnet group"""
-        data = self.client.describe_cache_subnet_groups(
-            CacheSubnetGroupName=cache_subnet_group_name,
-        )["CacheSubnetGroups"]
+        data = self._memoized_by_id(
+            "describe_cache_subnet_groups",
+            [cache_subnet_group_name],
+            lambda names: (
+                (names[0], g)
+                for g in self.client.describe_cache_subnet_groups(
+                    CacheSubnetGroupName=names[0],
+                )["CacheSubnetGroups"]
+            ),
+            persist=True,
+        )
         if not data:
             raise ValueError(f"Cache subnet group {cache_subnet_group_name} not found")
         return data[0]["Subnets"]
 
     def get_subnets(self, subnets: Sequence[str]) -> list[EC2SubnetTypeDef]:
         """Get the subnet"""
-        data = self.ec2_client.describe_subnets(
-            SubnetIds=subnets,
+        return self._memoized_by_id(
+            "describe_subnets",
+            subnets,
+            lambda ids: (
+                (s["SubnetId"], s)
+                for s in self.ec2_client.describe_subnets(SubnetIds=ids)["Subnets"]
+            ),
+            persist=True,
         )
-        return data["Subnets"]
 
     def get_security_groups(
         self, security_groups: Sequence[str]
     ) -> list[SecurityGroupTypeDef]:
-        """Get the subnet"""
-        data = self.ec2_client.describe_security_groups(
-            GroupIds=security_groups,
+        """Get the security groups"""
+        return self._memoized_by_id(
+            "describe_security_groups",
+            security_groups,
+            lambda ids: (
+                (sg["GroupId"], sg)
+                for sg in self.ec2_client.describe_security_groups(GroupIds=ids)[
+                    "SecurityGroups"
+                ]
+            ),
+            persist=True,
         )
-        return data["SecurityGroups"]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """The calls, cache hits, latencies and retries per AWS operation"""
+        with self._lock:
+            return {
+                operation: {
+                    "calls": self.calls[operation],
+                    "cache_hits": self.cache_hits[operation],
+                    "disk_hits": self.disk_hits[operation],
+                    "requests": len(latencies := self.latencies.get(operation, [])),
+                    "retries": self.retries[operation],
+                    "total_ms": round(sum(latencies) * 1000, 3),
+                    "max_ms": round(max(latencies, default=0) * 1000, 3),
+                    "throttles": self.throttles[operation],
+                    "backoff_ms": round(self.backoff.get(operation, 0) * 1000, 3),
+                    "rate_limited_ms": round(
+                        self.rate_limited.get(operation, 0) * 1000, 3
+                    ),
+                }
+                for operation in sorted(
+                    self.calls.keys()
+                    | self.cache_hits.keys()
+                    | self.disk_hits.keys()
+                    | self.latencies.keys()
+                )
+            }
+
+    def log_stats(self) -> None:
+        """Log the number of AWS API calls, cache hits, latencies and retries"""
+        for operation, stats in self.stats().items():
+            logger.info(
+                f"AWS {operation}: {stats['calls']} call(s), {stats['cache_hits']} cache hit(s), {stats['disk_hits']} disk cache hit(s), {stats['requests']} request(s) in {stats['total_ms']:.1f} ms (max {stats['max_ms']:.1f} ms), {stats['retries']} retry(ies), {stats['throttles']} throttle(s), {stats['backoff_ms']:.1f} ms backoff, {stats['rate_limited_ms']:.1f} ms rate limited"
+            )
 
 
 class ElasticachePlanValidator:
-    """The plan validator class"""
+    """The plan validator class
+
+    The AWS checks are independent of each other, except for the subnet and
+    security group checks which need the VPC of the subnets. With max_workers > 1
+    they run concurrently; the errors are always reported in plan order.
+
+    Without an aws_api, one is created with the aws_api_options on the first AWS
+    check, so a plan without creates is validated without loading boto3.
+
+    The plan is either a parsed plan or the index of its validated resource changes,
+    as read by ResourceChangeIndex.read(plan_file, VALIDATED_RESOURCE_TYPES).
+    """
 
     def __init__(
-        self, plan: TerraformJsonPlanParser, app_interface_input: AppInterfaceInput
+        self,
+        plan: TerraformJsonPlanParser | ResourceChangeIndex,
+        app_interface_input: "StackInput",
+        max_workers: int = 1,
+        aws_api: AWSApi | None = None,
+        aws_api_options: Mapping[str, Any] | None = None,
     ) -> None:
         self.plan = plan
+        self.changes = (
+            plan
+            if isinstance(plan, ResourceChangeIndex)
+            else ResourceChangeIndex(plan.plan.resource_changes)
+        )
         self.input = app_interface_input
-        self.aws_api = AWSApi(config_options={"region_name": self.input.data.region})
+        self._aws_api = aws_api
+        self._aws_api_lock = threading.Lock()
+        self.aws_api_options = aws_api_options or {}
+        self.max_workers = max_workers
         self.errors: list[str] = []
+        self.warnings: list[str] = []
+
+    @property
+    def aws_api(self) -> AWSApi:
+        """The AWSApi of the checks"""
+        with self._aws_api_lock:
+            if self._aws_api is None:
+                self._aws_api = AWSApi(
+                    # the clusters of a multi-cluster input share the region
+                    config_options={"region_name": self.input.clusters[0].region},
+                    **self.aws_api_options,
+                )
+            return self._aws_api
+
+    def aws_stats(self) -> dict[str, dict[str, Any]]:
+        """The AWS API stats, if any check used the API"""
+        return self._aws_api.stats() if self._aws_api is not None else {}
+
+    def log_stats(self) -> None:
+        """Log the AWS API stats, if any check used the API"""
+        if self._aws_api is not None:
+            self._aws_api.log_stats()
 
     @property
     def elasticache_replication_group_updates(self) -> list[ResourceChange]:
-        """Get the elasticache replication group updates"""
+        """Get the elasticache replication group updates in the region of the input"""
+        # the global datastore secondaries are in other regions
+        secondaries = {
+            s.replication_group_id
+            for c in self.input.clusters
+            for s in (c.global_datastore.secondaries if c.global_datastore else [])
+        }
         return [
             c
-            for c in self.plan.plan.resource_changes
-            if c.type == "aws_elasticache_replication_group"
-            and c.change
+            for c in self.changes.get(
+                "aws_elasticache_replication_group", Action.ActionCreate
+            )
+            if c.change
             and c.change.after
-            and Action.ActionCreate in c.change.actions
+            and c.change.after.get("replication_group_id") not in secondaries
+        ]
+
+    @property
+    def elasticache_serverless_cache_updates(self) -> list[ResourceChange]:
+        """Get the elasticache serverless cache creates, without replaces"""
+        return [
+            c
+            for c in self.changes.get(
+                "aws_elasticache_serverless_cache", Action.ActionCreate
+            )
+            if not is_replace(c)
         ]
 
     @property
     def elasticache_parameter_group_updates(self) -> list[ResourceChange]:
-        """Get the elasticache parameter group updates"""
+        """Get the elasticache parameter group creates, without replaces"""
         return [
             c
-            for c in self.plan.plan.resource_changes
-            if c.type == "aws_elasticache_parameter_group"
-            and c.change
-            and Action.ActionCreate in c.change.actions
+            for c in self.changes.get(
+                "aws_elasticache_parameter_group", Action.ActionCreate
+            )
+            if not is_replace(c)
         ]
 
-    def _validate_replication_group_id(self, replication_group_id: str) -> None:
-        logger.info(f"Validating Elasticache replication group {replication_group_id}")
-        try:
-            self.aws_api.client.describe_replication_groups(
-                ReplicationGroupId=replication_group_id
+    @property
+    def change_impacts(self) -> list[ChangeImpact]:
+        """The impacts of the updates, deletes and replaces of the plan, in plan order"""
+        return ChangeAnalyzer(self.changes.changes).analyze()
+
+    def _check_change_impacts(self) -> list[str]:
+        """Apply the change_policy of the cluster a change belongs to"""
+        policies: dict[str, ChangePolicy] = {}
+        for data in self.input.clusters:
+            # also the name of a serverless cache
+            ids = [data.replication_group_id]
+            ids += (
+                [s.replication_group_id for s in data.global_datastore.secondaries]
+                if data.global_datastore
+                else []
             )
-            self.errors.append(
-                f"Replication group ID {replication_group_id} already exists!"
+            ids += [data.parameter_group.name] if data.parameter_group else []
+            policies |= dict.fromkeys(ids, data.change_policy)
+        errors = []
+        for impact in self.change_impacts:
+            policy = policies.get(impact.resource_id)
+            action = (
+                getattr(policy, impact.impact.name.lower())
+                if policy
+                # changes of resources which are not in the input anymore
+                else "warn"
             )
-        except self.aws_api.client.exceptions.ReplicationGroupNotFoundFault:
-            pass
+            if action == "fail":
+                errors.append(
+                    f"Disruptive change not allowed by the change_policy: {impact}"
+                )
+            elif action == "warn":
+                logger.warning(f"Disruptive change: {impact}")
+                self.warnings.append(str(impact))
+        return errors
 
-    def _validate_subnets(self, cache_subnet_group_name: str) -> str | None:
+    def _validate_replication_group_id(self, replication_group_id: str) -> list[str]:
+        logger.info(f"Validating Elasticache replication group {replication_group_id}")
+        if self.aws_api.replication_group_exists(replication_group_id):
+            return [f"Replication group ID {replication_group_id} already exists!"]
+        return []
+
+    def _validate_subnets(
+        self, cache_subnet_group_name: str
+    ) -> tuple[str | None, list[str]]:
         logger.info(f"Validating Elasticache subnet group {cache_subnet_group_name}")
 
+        errors: list[str] = []
         vpc_ids: set[str] = set()
         cache_group_subnets = self.aws_api.get_cache_group_subnets(
             cache_subnet_group_name
@@ -137,70 +836,303 @@ class ElasticachePlanValidator:
 
         for subnet in subnets:
             if "VpcId" not in subnet:
-                self.errors.append(
-                    f"VpcId not found for subnet {subnet.get('SubnetId')}"
-                )
+                errors.append(f"VpcId not found for subnet {subnet.get('SubnetId')}")
                 continue
             vpc_ids.add(subnet["VpcId"])
         if len(vpc_ids) > 1:
-            self.errors.append("All subnets must belong to the same VPC")
-        return vpc_ids.pop()
+            errors.append("All subnets must belong to the same VPC")
+        return (vpc_ids.pop() if vpc_ids else None), errors
 
     def _validate_security_groups(
         self, security_groups: Sequence[str], vpc_id: str
-    ) -> None:
+    ) -> list[str]:
         logger.info(f"Validating security group {security_groups}")
         data = self.aws_api.get_security_groups(security_groups)
         if missing := set(security_groups).difference({s.get("GroupId") for s in data}):
-            self.errors.append(f"Security group(s) {missing} not found")
-            return
+            return [f"Security group(s) {missing} not found"]
 
-        for sg in data:
-            if sg.get("VpcId") != vpc_id:
-                self.errors.append(
-                    f"Security group {sg.get('GroupId')} does not belong to the same VPC as the subnets"
-                )
+        return [
+            f"Security group {sg.get('GroupId')} does not belong to the same VPC as the subnets"
+            for sg in data
+            if sg.get("VpcId") != vpc_id
+        ]
+
+    def _validate_network(
+        self,
+        cache_subnet_group_name: str,
+        security_groups: Sequence[str],
+        *,
+        recheck_stale: bool = True,
+    ) -> list[str]:
+        with self.aws_api.track_disk_hits() as disk_hits:
+            vpc_id, errors = self._validate_subnets(cache_subnet_group_name)
+            if vpc_id:
+                errors += self._validate_security_groups(security_groups, vpc_id)
+        # entries within the TTL are trusted, only errors are re-checked in case
+        # they were caused by a stale entry
+        if errors and disk_hits and recheck_stale:
+            self.aws_api.invalidate_disk_hits(disk_hits)
+            logger.info("Re-validating the network with fresh data")
+            return self._validate_network(
+                cache_subnet_group_name, security_groups, recheck_stale=False
+            )
+        return errors
+
+    def _validate_serverless_cache_name(self, name: str) -> list[str]:
+        logger.info(f"Validating Elasticache serverless cache {name}")
+        if self.aws_api.serverless_cache_exists(name):
+            return [f"Serverless cache {name} already exists!"]
+        return []
 
-    def _validate_parameter_group(self, name: str) -> None:
+    def _validate_parameter_group(self, name: str) -> list[str]:
         logger.info(f"Validating Elasticache parameter group {name}")
-        try:
-            self.aws_api.client.describe_cache_parameters(CacheParameterGroupName=name)
-            self.errors.append(f"Parameter group {name} already exists!")
-        except self.aws_api.client.exceptions.CacheParameterGroupNotFoundFault:
-            pass
+        if self.aws_api.parameter_group_exists(name):
+            return [f"Parameter group {name} already exists!"]
+        return []
 
-    def validate(self) -> bool:
-        """Validate method"""
+    def _checks(self) -> list[Callable[[], list[str]]]:
+        """All checks of the plan, in the order their errors are reported"""
+        checks: list[Callable[[], list[str]]] = []
         for u in self.elasticache_replication_group_updates:
             assert u.change  # mypy
             assert u.change.after  # mypy
 
-            self._validate_replication_group_id(u.change.after["replication_group_id"])
-
-            if vpc_id := self._validate_subnets(
-                cache_subnet_group_name=u.change.after["subnet_group_name"]
-            ):
-                self._validate_security_groups(
+            # a replaced replication group exists, the change_policy decides
+            if not is_replace(u):
+                checks.append(
+                    partial(
+                        self._validate_replication_group_id,
+                        u.change.after["replication_group_id"],
+                    )
+                )
+            checks.append(
+                partial(
+                    self._validate_network,
+                    cache_subnet_group_name=u.change.after["subnet_group_name"],
                     security_groups=u.change.after["security_group_ids"],
-                    vpc_id=vpc_id,
                 )
-        for u in self.elasticache_parameter_group_updates:
-            self._validate_parameter_group(u.name)
+            )
+        checks += [
+            partial(self._validate_serverless_cache_name, u.change.after["name"])
+            for u in self.elasticache_serverless_cache_updates
+            if u.change and u.change.after
+        ]
+        checks += [
+            partial(self._validate_parameter_group, u.name)
+            for u in self.elasticache_parameter_group_updates
+        ]
+        return checks
+
+    def _prefetch(self) -> list[Callable[[], object]]:
+        """Lookups which don't depend on other lookups and can be started early"""
+        return [
+            partial(
+                self.aws_api.get_security_groups,
+                u.change.after["security_group_ids"],
+            )
+            for u in self.elasticache_replication_group_updates
+            if u.change and u.change.after
+        ]
+
+    def validate(self) -> bool:
+        """Validate method"""
+        self.errors += self._check_change_impacts()
+        checks = self._checks()
+        if self.max_workers > 1 and len(checks) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                prefetches = [executor.submit(p) for p in self._prefetch()]
+                results = list(executor.map(lambda check: check(), checks))
+                for p in prefetches:
+                    # surface lookup errors
+                    p.result()
+        else:
+            results = [check() for check in checks]
+        for errors in results:
+            self.errors += errors
         return not self.errors
 
 
-if __name__ == "__main__":
-    app_interface_input = parse_model(
-        AppInterfaceInput,
-        read_input_from_file(
-            file_path=os.environ.get("ER_INPUT_FILE", "/inputs/input.json"),
-        ),
+class BatchValidator:
+    """Validate many plans in one process
+
+    The AWSApi instances, and therefore the clients, the memoized lookups and the
+    replication group, serverless cache and parameter group existence indexes,
+    are shared by all plans of the
+    same region. All regions share the retry_policy and its rate limiter.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_VALIDATE_MAX_WORKERS,
+        index_max_age: float = DEFAULT_INDEX_MAX_AGE,
+        disk_cache: DiskCache | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.index_max_age = index_max_age
+        self.disk_cache = disk_cache
+        self.retry_policy = retry_policy
+        self.aws_apis: dict[str, AWSApi] = {}
+        self._lock = threading.Lock()
+
+    def aws_api(self, region: str) -> AWSApi:
+        """Get the shared AWSApi for a region"""
+        with self._lock:
+            if region not in self.aws_apis:
+                self.aws_apis[region] = AWSApi(
+                    config_options={"region_name": region},
+                    use_index=True,
+                    index_max_age=self.index_max_age,
+                    disk_cache=self.disk_cache,
+                    retry_policy=self.retry_policy,
+                )
+            return self.aws_apis[region]
+
+    def validate(self, input_file: Path, plan_file: Path) -> dict[str, Any]:
+        """Validate one plan and return its result record"""
+        result: dict[str, Any] = {"input": str(input_file), "plan": str(plan_file)}
+        try:
+            app_interface_input = read_app_interface_input(input_file)
+            validator = ElasticachePlanValidator(
+                ResourceChangeIndex.read(plan_file, VALIDATED_RESOURCE_TYPES),
+                app_interface_input,
+                aws_api=self.aws_api(app_interface_input.clusters[0].region),
+            )
+            result["identifier"] = ",".join(
+                c.identifier for c in app_interface_input.clusters
+            )
+            valid = validator.validate()
+            errors, warnings = validator.errors, validator.warnings
+        except Exception as e:  # noqa: BLE001 - a broken plan must not stop the batch
+            valid, errors, warnings = False, [f"{e.__class__.__name__}: {e}"], []
+        # the exit code a single validate_plan.py run would have returned
+        return result | {
+            "valid": valid,
+            "errors": errors,
+            "warnings": warnings,
+            "exit_code": int(not valid),
+        }
+
+    def run(self, pairs: Iterable[tuple[Path, Path]], output: TextIO) -> bool:
+        """Validate all plans and write one JSON line per plan in input order"""
+        valid = True
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in executor.map(lambda pair: self.validate(*pair), pairs):
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                valid &= result["valid"]
+        for aws_api in self.aws_apis.values():
+            aws_api.log_stats()
+        return valid
+
+
+def find_plan_pairs(paths: Iterable[str]) -> Iterator[tuple[Path, Path]]:
+    """Expand the batch arguments into (input.json, plan.json) pairs
+
+    An argument is either an INPUT:PLAN pair or a directory, which is searched
+    recursively for directories containing both an input.json and a plan.json.
+    """
+    for path in paths:
+        if ":" in path:
+            input_path, plan_path = path.split(":", 1)
+            yield Path(input_path), Path(plan_path)
+            continue
+        for input_file in sorted(Path(path).rglob("input.json")):
+            if (plan_file := input_file.with_name("plan.json")).is_file():
+                yield input_file, plan_file
+
+
+def read_app_interface_input(input_file: Path) -> "StackInput":
+    """Read and parse a single or multi-cluster app-interface input file"""
+    from er_aws_elasticache.app_interface_input import parse_input  # noqa: PLC0415
+
+    return parse_input(input_file.read_bytes())
+
+
+def main() -> None:
+    """Validate a single plan or, with --batch, many plans
+
+    ER_METRICS=1 writes the phase timings and AWS call stats of a single plan
+    validation to <plan>.metrics.json.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "plans",
+        nargs="+",
+        metavar="PLAN",
+        help="terraform plan JSON file. With --batch: INPUT:PLAN pairs or directories",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="validate many plans and write the results as JSON lines",
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="batch results file (default: stdout)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't read from the ER_VALIDATE_CACHE_DIR disk cache, only refresh it",
     )
-    logger.info("Running Elasticache terraform plan validation")
-    plan = TerraformJsonPlanParser(plan_path=sys.argv[1])
-    validator = ElasticachePlanValidator(plan, app_interface_input)
-    if not validator.validate():
+    args = parser.parse_args()
+    if not args.batch and len(args.plans) > 1:
+        parser.error("validate one plan at a time, or many with --batch")
+    max_workers = int(
+        os.environ.get("ER_VALIDATE_MAX_WORKERS", DEFAULT_VALIDATE_MAX_WORKERS)
+    )
+    disk_cache = DiskCache.from_env(bypass=args.no_cache)
+    retry_policy = RetryPolicy.from_env()
+
+    if args.batch:
+        logger.info("Running Elasticache terraform plan batch validation")
+        batch = BatchValidator(
+            max_workers,
+            index_max_age=float(
+                os.environ.get("ER_VALIDATE_INDEX_MAX_AGE", DEFAULT_INDEX_MAX_AGE)
+            ),
+            disk_cache=disk_cache,
+            retry_policy=retry_policy,
+        )
+        with profiling():
+            valid = batch.run(find_plan_pairs(args.plans), args.output)
+        if not valid:
+            sys.exit(1)
+        return
+
+    metrics = Metrics()
+    with profiling():
+        with metrics.span("parse_input"):
+            app_interface_input = read_app_interface_input(
+                Path(os.environ.get("ER_INPUT_FILE", "/inputs/input.json"))
+            )
+        logger.info("Running Elasticache terraform plan validation")
+        with metrics.span("parse_plan"):
+            plan = ResourceChangeIndex.read(
+                Path(args.plans[0]), VALIDATED_RESOURCE_TYPES
+            )
+        validator = ElasticachePlanValidator(
+            plan,
+            app_interface_input,
+            max_workers=max_workers,
+            aws_api_options={"disk_cache": disk_cache, "retry_policy": retry_policy},
+        )
+        with metrics.span("validate"):
+            valid = validator.validate()
+    validator.log_stats()
+    if metrics_enabled():
+        metrics.write(
+            Path(args.plans[0]).with_suffix(".metrics.json"), aws=validator.aws_stats()
+        )
+    if not valid:
         logger.error(validator.errors)
         sys.exit(1)
 
     logger.info("Validation ended succesfully")
+
+
+if __name__ == "__main__":
+    main()